@@ -1,7 +1,131 @@
+import json
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
\ No newline at end of file
+AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
+
+# Deployments to spread requests over, as a JSON list of objects with "name",
+# "endpoint" (the full chat-completions URL), "key" or "key_env" (the name of the
+# variable holding the key), and optional "weight", "region" and "tier" ("small" for
+# a faster, cheaper model; "large", the default, otherwise). Without it the single
+# AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_API_KEY deployment is used.
+AZURE_OPENAI_DEPLOYMENTS = [
+    {**deployment, "key": deployment.get("key") or os.getenv(deployment.get("key_env", ""))}
+    for deployment in json.loads(os.getenv("AZURE_OPENAI_DEPLOYMENTS") or "[]")
+] or [{"name": "default", "endpoint": AZURE_OPENAI_ENDPOINT, "key": AZURE_OPENAI_KEY}]
+# A request that fails with a timeout, connection error, 429 or 5xx is retried on
+# another deployment, up to this many deployments in total
+AZURE_MAX_ATTEMPTS = int(os.getenv("AZURE_MAX_ATTEMPTS", "3"))
+# An answer cut off at max_tokens is continued at most this many times
+AZURE_MAX_CONTINUATIONS = int(os.getenv("AZURE_MAX_CONTINUATIONS", "2"))
+# Passive health: a deployment failing this many requests in a row is taken out of
+# rotation for AZURE_EJECT_SECONDS, doubling on each repeat ejection
+AZURE_EJECT_AFTER_FAILURES = int(os.getenv("AZURE_EJECT_AFTER_FAILURES", "3"))
+AZURE_EJECT_SECONDS = float(os.getenv("AZURE_EJECT_SECONDS", "30"))
+
+# Responses smaller than this are sent uncompressed
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+
+# Users allowed to request per-task profiling and download the reports
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+
+# "inline" runs tasks in a thread of the API process; "queue" only enqueues them
+# for worker.py processes to claim
+TASK_EXECUTION_MODE = os.getenv("TASK_EXECUTION_MODE", "inline").lower()
+JOB_QUEUE_URL = os.getenv("JOB_QUEUE_URL", "sqlite:///./resume.db")
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Chunked uploads: parts are staged on disk until the client completes the upload
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(tempfile.gettempdir(), "resume-uploads"))
+UPLOAD_PART_MAX_BYTES = int(os.getenv("UPLOAD_PART_MAX_BYTES", str(16 * 1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+
+# How long an Idempotency-Key keeps returning the task it created
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+# Inline-mode scheduler: worker threads, lane weights, slots only interactive work
+# may use, and optional per-user weights ("alice=2,bob=0.5")
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+SCHEDULER_INTERACTIVE_WEIGHT = float(os.getenv("SCHEDULER_INTERACTIVE_WEIGHT", "4"))
+SCHEDULER_BULK_WEIGHT = float(os.getenv("SCHEDULER_BULK_WEIGHT", "1"))
+SCHEDULER_RESERVED_INTERACTIVE = int(os.getenv("SCHEDULER_RESERVED_INTERACTIVE", "1"))
+SCHEDULER_USER_WEIGHTS = {
+    name.strip(): float(weight)
+    for name, _, weight in (item.partition("=") for item in os.getenv("SCHEDULER_USER_WEIGHTS", "").split(","))
+    if name.strip() and weight.strip()
+}
+
+# Near-duplicate detection: a resume whose text is at least DEDUP_THRESHOLD similar
+# (estimated Jaccard over word shingles) to one processed before reuses that parse,
+# re-parsing only the changed lines. DEDUP_SCOPE "user" only matches the uploader's
+# own history; "global" matches anyone's.
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_SCOPE = os.getenv("DEDUP_SCOPE", "user").lower()
+DEDUP_MAX_CHANGED_LINES = int(os.getenv("DEDUP_MAX_CHANGED_LINES", "40"))
+
+# Page-level re-parse: a new version of a multi-page PDF that differs from a stored
+# one on at most this many pages only sends the changed pages to Azure (0 disables)
+PAGE_REPARSE_MAX_CHANGED_PAGES = int(os.getenv("PAGE_REPARSE_MAX_CHANGED_PAGES", "2"))
+# A stored resume with a different file name only counts as the previous version
+# when the two documents' texts are at least this similar (estimated Jaccard)
+PAGE_REPARSE_MIN_SIMILARITY = float(os.getenv("PAGE_REPARSE_MIN_SIMILARITY", "0.5"))
+
+# Complexity routing: when a "small" tier deployment is configured, documents within
+# all of these limits are parsed by it with the smaller output budget below
+COMPLEXITY_ROUTING_ENABLED = os.getenv("COMPLEXITY_ROUTING_ENABLED", "true").lower() in ("1", "true", "yes")
+SIMPLE_MAX_PAGES = int(os.getenv("SIMPLE_MAX_PAGES", "2"))
+SIMPLE_MAX_TEXT_CHARS = int(os.getenv("SIMPLE_MAX_TEXT_CHARS", "6000"))
+SIMPLE_MAX_TABLES = int(os.getenv("SIMPLE_MAX_TABLES", "1"))
+# max_tokens per tier for text and vision requests
+TIER_MAX_TOKENS = {
+    "small": {"text": int(os.getenv("SMALL_TEXT_MAX_TOKENS", "3000")), "vision": int(os.getenv("SMALL_VISION_MAX_TOKENS", "4000"))},
+    "large": {"text": 6000, "vision": 12000},
+}
+# USD per 1000 prompt / completion tokens of each tier, for the cost metric
+TIER_PRICES = json.loads(os.getenv("TIER_PRICES") or "null") or {
+    "small": {"prompt": 0.00015, "completion": 0.0006},
+    "large": {"prompt": 0.0025, "completion": 0.01},
+}
+
+# Hedging (opt-in): when the vision request of a file with a text layer hasn't
+# answered by the HEDGE_QUANTILE of recent vision call durations, the text parse is
+# started alongside it and whichever returns a valid result first is kept. Until
+# HEDGE_MIN_SAMPLES calls have been observed, HEDGE_DEFAULT_DEADLINE_SECONDS is used.
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DEADLINE_SECONDS = float(os.getenv("HEDGE_DEFAULT_DEADLINE_SECONDS", "30"))
+
+# Email, mobile and links are extracted locally (link annotations, mailto:/tel:
+# targets, patterns in the text) and only the ones not found are asked of Azure
+LOCAL_CONTACTS_ENABLED = os.getenv("LOCAL_CONTACTS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Section mode (opt-in): large-tier parses are split into concurrent section
+# prompts (profile, skills, experience, certifications) whose JSON is merged
+SECTION_EXTRACTION_ENABLED = os.getenv("SECTION_EXTRACTION_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Codec for parsed payloads in resume_payloads: "zstd" (needs the zstandard
+# package; zlib is used without it) or "zlib"
+PAYLOAD_COMPRESSION = os.getenv("PAYLOAD_COMPRESSION", "zstd").lower()
+
+# Content-addressed archive of uploaded originals, for reprocessing without a
+# re-upload. Identical files are stored once. A file is removed when no upload
+# of it has been seen for ARCHIVE_RETENTION_DAYS, and the least recently seen
+# files go first once the archive is over ARCHIVE_MAX_BYTES (0: no limit).
+# With TASK_EXECUTION_MODE=queue, point ARCHIVE_DIR at storage every node shares.
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_RETENTION_DAYS = float(os.getenv("ARCHIVE_RETENTION_DAYS", "180"))
+ARCHIVE_MAX_BYTES = int(os.getenv("ARCHIVE_MAX_BYTES", "0"))
+
+# Reprocess jobs re-parse archived originals one file at a time in the bulk
+# lane, at most one every REPROCESS_INTERVAL_SECONDS, up to REPROCESS_MAX_FILES per job
+REPROCESS_INTERVAL_SECONDS = float(os.getenv("REPROCESS_INTERVAL_SECONDS", "2"))
+REPROCESS_MAX_FILES = int(os.getenv("REPROCESS_MAX_FILES", "500"))
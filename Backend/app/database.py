@@ -1,6 +1,6 @@
 # app/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./resume.db"
@@ -13,10 +13,31 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+# Columns added to existing tables after they were first created: table -> {column: DDL}
+_ADDED_COLUMNS = {
+    "resume_history": {
+        "processing_method": "VARCHAR(20) DEFAULT 'text'",
+        "file_sha256": "VARCHAR(64)",
+        "prompt_version": "VARCHAR(20)",
+        "reprocessed_from": "INTEGER",
+    },
+}
+
+
 def init_db():
     from app import models
     Base.metadata.create_all(bind=engine)
 
+    # create_all() doesn't alter existing tables, so add missing columns here once at
+    # startup instead of inspecting the schema on every import of the router
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
 
 def get_db():
     db = SessionLocal()
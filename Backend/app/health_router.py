@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services import azure_pool, warmup
+
+# Unauthenticated so load balancers can probe it
+router = APIRouter()
+
+@router.get("/ready")
+async def get_readiness():
+    """200 once the warm-up has finished, 503 (with per-component progress) until then.
+
+    Also lists the Azure deployments with their load and health, for information;
+    an ejected deployment doesn't make the API unready.
+    """
+    state = warmup.status()
+    state["deployments"] = azure_pool.pool.snapshot()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
@@ -1,8 +1,98 @@
 #models
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, DateTime, JSON, LargeBinary, Text
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.database import Base
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
\ No newline at end of file
+    hashed_password = Column(String, nullable=False)
+
+
+class ResumeHistory(Base):
+    __tablename__ = "resume_history"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String(255), nullable=False)
+    processed_at = Column(DateTime(timezone=True), server_default=func.now())
+    user_id = Column(String(255), nullable=True)  # Can be linked to user authentication
+    # Parsed JSON of rows written before it moved to resume_payloads; {} otherwise
+    inline_data = Column("resume_data", JSON, nullable=False)
+    file_size = Column(Integer, nullable=True)
+    status = Column(String(50), default="completed")
+    original_file_type = Column(String(10), nullable=True)
+    processing_method = Column(String(20), default="text")
+    file_sha256 = Column(String(64), nullable=True)  # the original in the file archive
+    prompt_version = Column(String(20), nullable=True)  # resume_parser.PROMPT_VERSION of the parse
+    reprocessed_from = Column(Integer, nullable=True)  # resume_history.id of the row this one re-parsed
+    payload = relationship("ResumePayload", uselist=False, lazy="select", cascade="all, delete-orphan")
+
+    @property
+    def resume_data(self):
+        """The parsed JSON, decompressed from resume_payloads on first access and kept on the instance.
+
+        Changes made to the returned value in place are seen by later reads of
+        this instance but not saved; assign resume_data to store them.
+        """
+        from app.services import payloads
+
+        if self.payload is None:
+            return self.inline_data
+        cached = self.__dict__.get("_decoded_payload")
+        if cached is None or cached[0] is not self.payload.data:  # decoded from a payload since replaced or refreshed
+            cached = self._decoded_payload = (self.payload.data, payloads.decode(self.payload.codec, self.payload.data))
+        return cached[1]
+
+    @resume_data.setter
+    def resume_data(self, value):
+        from app.services import payloads
+
+        codec, data, raw_size = payloads.encode(value)
+        if self.payload is None:
+            self.payload = ResumePayload(codec=codec, data=data, raw_size=raw_size)
+        else:
+            self.payload.codec, self.payload.data, self.payload.raw_size = codec, data, raw_size
+        self.inline_data = {}
+        self.__dict__.pop("_decoded_payload", None)
+
+
+class ResumePayload(Base):
+    """Compressed parsed JSON of a resume_history row (see app/services/payloads.py)"""
+    __tablename__ = "resume_payloads"
+
+    resume_id = Column(Integer, ForeignKey("resume_history.id"), primary_key=True)
+    codec = Column(String(10), nullable=False)
+    raw_size = Column(Integer, nullable=False)  # bytes of JSON before compression
+    data = Column(LargeBinary, nullable=False)
+
+
+class ResumeFingerprint(Base):
+    """MinHash signature and cleaned text of a processed resume, for near-duplicate lookups"""
+    __tablename__ = "resume_fingerprints"
+
+    resume_id = Column(Integer, primary_key=True)  # resume_history.id
+    user_id = Column(String(255), nullable=True, index=True)
+    signature = Column(LargeBinary, nullable=False)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ResumeLshBucket(Base):
+    """One row per LSH band of a fingerprint; resumes sharing a bucket are candidate duplicates"""
+    __tablename__ = "resume_lsh_buckets"
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(Integer, nullable=False, index=True)
+    resume_id = Column(Integer, nullable=False, index=True)
+
+
+class ResumePage(Base):
+    """Content fingerprint and text of one page of a processed PDF, for page-level re-parses"""
+    __tablename__ = "resume_pages"
+
+    id = Column(Integer, primary_key=True)
+    resume_id = Column(Integer, nullable=False, index=True)  # resume_history.id
+    page_number = Column(Integer, nullable=False)  # 0-based
+    fingerprint = Column(String(40), nullable=False, index=True)
+    text = Column(Text, nullable=False, default="")
@@ -1,44 +1,88 @@
-from auth.auth import JWTBearer
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
-from sqlalchemy.orm import Session
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, inspect
-from sqlalchemy.sql import func
+from auth.auth import JWTBearer, jwt_bearer
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Request, Header
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, selectinload
 from app.services.resume_parser import (
-    extract_text_from_pdf, 
-    extract_text_from_docx,
     extract_resume_details_with_azure, 
     clean_json_string,
-    convert_pdf_to_images,
     extract_resume_details_with_azure_vision,
-    convert_docx_to_pdf,
+    extract_resume_sections_with_azure,
+    update_resume_details_with_azure,
+    update_resume_pages_with_azure_vision,
     validate_professional_experience_length,
-    process_multiple_files
+    process_multiple_files,
+    PROMPT_VERSION
 )
-from app.database import get_db, Base, engine
+from app.database import get_db, SessionLocal
+from app.models import ResumeHistory
+from app.config import (
+    ADMIN_USERNAMES,
+    ARCHIVE_ENABLED,
+    COMPLEXITY_ROUTING_ENABLED,
+    DEDUP_ENABLED,
+    DEDUP_MAX_CHANGED_LINES,
+    HEDGE_DEFAULT_DEADLINE_SECONDS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_QUANTILE,
+    HEDGING_ENABLED,
+    LOCAL_CONTACTS_ENABLED,
+    SECTION_EXTRACTION_ENABLED,
+    PAGE_REPARSE_MAX_CHANGED_PAGES,
+    REPROCESS_INTERVAL_SECONDS,
+    REPROCESS_MAX_FILES,
+    TASK_EXECUTION_MODE,
+    UPLOAD_PART_MAX_BYTES
+)
+from app.services import (
+    artifacts,
+    azure_pool,
+    cancellation,
+    chunked_upload,
+    file_archive,
+    hedging,
+    idempotency,
+    job_queue,
+    near_duplicate,
+    page_index
+)
+from app.services.cancellation import TaskCancelled
+from app.services.chunked_upload import UploadSessionNotFound
+from app.services.idempotency import IdempotencyConflict
+from app.services.metrics import (
+    TASKS_QUEUED,
+    TASKS_IN_FLIGHT,
+    TASKS_FINISHED,
+    WORK_CANCELLED,
+    LOCAL_CONTACT_FIELDS,
+    NEAR_DUPLICATES,
+    STAGE_DURATION,
+    STRATEGY_FALLBACKS,
+    TIER_ROUTING,
+    record_cache_lookup,
+    stage_timer
+)
+from app.services.profiling import TaskProfiler
+from app.services.scheduler import BULK, INTERACTIVE, scheduler
+from utils.json_response import build_json_body, json_response
+from utils.logger import get_logger
 import tempfile
+import threading
+import csv
+import hashlib
+import io
+import json
 import os
-import traceback
 import uuid
 import time
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import asyncio
 
-# Check if processing_method column exists in resume_history table
-def column_exists(table_name, column_name):
-    try:
-        inspector = inspect(engine)
-        columns = inspector.get_columns(table_name)
-        return any(col['name'] == column_name for col in columns)
-    except Exception:
-        # Table doesn't exist yet or other error
-        return False
-
-# Flag to track if processing_method column exists
-HAS_PROCESSING_METHOD_COLUMN = column_exists('resume_history', 'processing_method')
-
 router = APIRouter(dependencies=[Depends(JWTBearer())])
+logger = get_logger("router")
 
 # In-memory task storage (replace with Redis or DB in production)
 TASKS = {}
@@ -48,23 +92,57 @@ class TaskStatus:
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
-# Database model for resume history
-class ResumeHistory(Base):
-    __tablename__ = "resume_history"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String(255), nullable=False)
-    processed_at = Column(DateTime(timezone=True), server_default=func.now())
-    user_id = Column(String(255), nullable=True)  # Can be linked to user authentication
-    resume_data = Column(JSON, nullable=False)
-    file_size = Column(Integer, nullable=True)
-    status = Column(String(50), default="completed")
-    original_file_type = Column(String(10), nullable=True)
+FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+# Job status -> task status as reported by /progress
+JOB_TASK_STATUS = {
+    job_queue.JobStatus.QUEUED: TaskStatus.PENDING,
+    job_queue.JobStatus.RUNNING: TaskStatus.PROCESSING,
+    job_queue.JobStatus.COMPLETED: TaskStatus.COMPLETED,
+    job_queue.JobStatus.FAILED: TaskStatus.FAILED,
+    job_queue.JobStatus.CANCELLED: TaskStatus.CANCELLED,
+}
+
+if TASK_EXECUTION_MODE == "queue":
+    TASKS_QUEUED.set_function(lambda: job_queue.count_by_status().get(job_queue.JobStatus.QUEUED, 0))
+    TASKS_IN_FLIGHT.set_function(lambda: job_queue.count_by_status().get(job_queue.JobStatus.RUNNING, 0))
+else:
+    TASKS_QUEUED.set_function(lambda: sum(1 for task in list(TASKS.values()) if task["status"] == TaskStatus.PENDING))
+    TASKS_IN_FLIGHT.set_function(lambda: sum(1 for task in list(TASKS.values()) if task["status"] == TaskStatus.PROCESSING))
+
+def enqueue_task(task_id: str, kind: str, lane: str = INTERACTIVE):
+    """Hand a task to the worker tier; its state is read back from the job queue"""
+    job_queue.enqueue(task_id, kind, TASKS.pop(task_id), lane)
+
+def get_task(task_id: str) -> Optional[dict]:
+    """Look a task up in this process, falling back to the durable job queue"""
+    task = TASKS.get(task_id)
+    if task is not None or TASK_EXECUTION_MODE != "queue":
+        return task
     
-    # Only add this column to the model if it exists in the database
-    if HAS_PROCESSING_METHOD_COLUMN:
-        processing_method = Column(String(20), default="text")
+    job = job_queue.get_job(task_id)
+    if job is None:
+        return None
+    result = job["result"] or {}
+    task = dict(job["payload"])
+    task.update({
+        "status": JOB_TASK_STATUS[job["status"]],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "data": result.get("data"),
+        "error": job["error"],
+        "profile_report": result.get("profile_report"),
+    })
+    # Batch files finished so far (published by the worker while it runs)
+    if "completed_order" in result:
+        task["completed_order"] = result["completed_order"]
+        if "results" in result:
+            task["results"] = result["results"]
+    if job["processed_files"] is not None:
+        task["processed_files"] = job["processed_files"]
+    return task
 
 # Pydantic model for response
 class ResumeHistoryResponse(BaseModel):
@@ -75,72 +153,157 @@ class ResumeHistoryResponse(BaseModel):
     status: str
     original_file_type: Optional[str]
     processing_method: Optional[str] = "text"
+    prompt_version: Optional[str] = None
+    reprocessed_from: Optional[int] = None
 
 def update_task_progress(task_id: str, stage: str, progress: int):
     """Helper function to update task progress"""
     if task_id in TASKS:
-        TASKS[task_id]["stage"] = stage
-        TASKS[task_id]["progress"] = progress
-        print(f"Task {task_id}: {stage} - {progress}%")
+        task = TASKS[task_id]
+        now = time.perf_counter()
+        previous_stage = task.get("stage")
+        if previous_stage != stage:
+            # Log how long the stage we are leaving took
+            if "stage_started_at" in task:
+                logger.info("Stage finished", extra={
+                    "task_id": task_id,
+                    "stage": previous_stage,
+                    "duration_ms": round((now - task["stage_started_at"]) * 1000, 1)
+                })
+            task["stage_started_at"] = now
+        task["stage"] = stage
+        task["progress"] = progress
+        logger.debug("Progress update", extra={"task_id": task_id, "stage": stage, "progress": progress})
+
+def require_admin(payload: dict):
+    """Raise 403 unless the token belongs to a configured admin"""
+    if payload.get("sub") not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+ALLOWED_EXTENSIONS = ['.pdf', '.doc', '.docx']
+ALLOWED_MIME_TYPES = [
+    'application/pdf',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+]
+
+async def upload_fingerprint(file: UploadFile) -> str:
+    """Name, size and sha256 of an upload, so a reused Idempotency-Key with different content is a conflict"""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        block = await file.read(1024 * 1024)
+        if not block:
+            break
+        digest.update(block)
+        size += len(block)
+    await file.seek(0)
+    return f"{file.filename}:{size}:{digest.hexdigest()}"
+
+def reserve_idempotency_key(user_id: str, key: Optional[str], fingerprint: str) -> Optional[dict]:
+    """Return the recorded response for a repeated Idempotency-Key, or None to proceed"""
+    if not key:
+        return None
+    try:
+        return idempotency.reserve(user_id, key, fingerprint)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+def start_single_task(
+    tmp_path: str,
+    filename: str,
+    file_extension: str,
+    file_size: int,
+    use_vision: bool,
+    profile: bool,
+    user_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session
+) -> str:
+    """Register a task for an uploaded file and start (or enqueue) its processing"""
+    # Generate a unique task ID
+    task_id = str(uuid.uuid4())
+    
+    # Initialize task status
+    TASKS[task_id] = {
+        "status": TaskStatus.PENDING,
+        "stage": "upload",
+        "progress": 10,  # Start at 10% after upload
+        "data": None,
+        "error": None,
+        "file_path": tmp_path,
+        "file_extension": file_extension,
+        "filename": filename,
+        "file_size": file_size,
+        "user_id": user_id,
+        "use_vision": use_vision,  # Store whether to use vision-based processing
+        "profile": profile,
+        "started_at": time.perf_counter()
+    }
+    
+    logger.info("Created task with initial progress 10%", extra={"task_id": task_id, "stage": "upload"})
+    
+    # Start processing in background, or leave it to the worker tier
+    if TASK_EXECUTION_MODE == "queue":
+        enqueue_task(task_id, "single")
+    else:
+        background_tasks.add_task(process_resume, task_id, db)
+    return task_id
 
 @router.post("/upload")
 async def upload_resume(
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db),
-    use_vision: bool = True  # New parameter to toggle between text and image processing
+    use_vision: bool = True,  # New parameter to toggle between text and image processing
+    profile: bool = False,  # Admin-only: capture a sampling profile and allocation summary
+    payload: dict = Depends(jwt_bearer),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
+    if profile:
+        require_admin(payload)
+    user_id = payload.get("sub")
+    
+    # A retried submission returns the task created by the first one
+    fingerprint = f"single:{await upload_fingerprint(file)}:{use_vision}" if idempotency_key else ""
+    replay = reserve_idempotency_key(user_id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+    
     try:
-        # Generate a unique task ID
-        task_id = str(uuid.uuid4())
-        
         # Validate file type
-        allowed_extensions = ['.pdf', '.doc', '.docx']
-        allowed_mime_types = [
-            'application/pdf',
-            'application/msword',
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        ]
         file_extension = f".{file.filename.split('.')[-1].lower()}"
-        if file_extension not in allowed_extensions or file.content_type not in allowed_mime_types:
+        if file_extension not in ALLOWED_EXTENSIONS or file.content_type not in ALLOWED_MIME_TYPES:
             raise HTTPException(status_code=400, detail="Only PDF, DOC, or DOCX files are supported.")
 
         # Create temporary file with appropriate suffix
         suffix = file_extension
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(file_content)
-            tmp_path = tmp.name
-        
-        # Initialize task status
-        TASKS[task_id] = {
-            "status": TaskStatus.PENDING,
-            "stage": "upload",
-            "progress": 10,  # Start at 10% after upload
-            "data": None,
-            "error": None,
-            "file_path": tmp_path,
-            "file_extension": file_extension,
-            "filename": file.filename,
-            "file_size": file_size,
-            "user_id": None,  # Can be populated from auth
-            "use_vision": use_vision  # Store whether to use vision-based processing
-        }
-        
-        print(f"Created task {task_id} with initial progress 10%")
+        with stage_timer("upload", "vision" if use_vision else "text"):
+            file_content = await file.read()
+            file_size = len(file_content)
+            
+            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+                tmp.write(file_content)
+                tmp_path = tmp.name
         
-        # Start processing in background
-        background_tasks.add_task(process_resume, task_id, db)
+        task_id = start_single_task(
+            tmp_path, file.filename, file_extension, file_size, use_vision, profile, user_id, background_tasks, db
+        )
         
         # Return the task ID immediately
-        return {"task_id": task_id, "status": "processing", "method": "vision" if use_vision else "text"}
+        response = {"task_id": task_id, "status": "processing", "method": "vision" if use_vision else "text"}
+        if idempotency_key:
+            idempotency.store(user_id, idempotency_key, response)
+        return response
 
     except HTTPException as http_exc:
+        if idempotency_key:
+            idempotency.release(user_id, idempotency_key)
         raise http_exc
     except Exception as e:
-        traceback.print_exc()
+        if idempotency_key:
+            idempotency.release(user_id, idempotency_key)
+        logger.exception("Upload failed")
         raise HTTPException(status_code=500, detail=f"Unexpected error occurred: {str(e)}")
 
 # New endpoint for multiple file upload
@@ -149,35 +312,41 @@ async def upload_multiple_resumes(
     files: List[UploadFile] = File(...),
     background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db),
-    use_vision: bool = True
+    use_vision: bool = True,
+    profile: bool = False,
+    payload: dict = Depends(jwt_bearer),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
+    if profile:
+        require_admin(payload)
+    user_id = payload.get("sub")
+    
+    fingerprint = "batch:" + "|".join([await upload_fingerprint(file) for file in files]) + f":{use_vision}" if idempotency_key else ""
+    replay = reserve_idempotency_key(user_id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+    
     try:
         # Generate a unique task ID for the batch
         task_id = str(uuid.uuid4())
         
         # Validate all files first
-        allowed_extensions = ['.pdf', '.doc', '.docx']
-        allowed_mime_types = [
-            'application/pdf',
-            'application/msword',
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        ]
-        
         file_paths = []
         file_info = []
         
         for file in files:
             file_extension = f".{file.filename.split('.')[-1].lower()}"
-            if file_extension not in allowed_extensions or file.content_type not in allowed_mime_types:
+            if file_extension not in ALLOWED_EXTENSIONS or file.content_type not in ALLOWED_MIME_TYPES:
                 raise HTTPException(status_code=400, detail=f"File {file.filename}: Only PDF, DOC, or DOCX files are supported.")
             
             # Create temporary file
-            file_content = await file.read()
-            file_size = len(file_content)
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp:
-                tmp.write(file_content)
-                tmp_path = tmp.name
+            with stage_timer("upload", "vision" if use_vision else "text"):
+                file_content = await file.read()
+                file_size = len(file_content)
+                
+                with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp:
+                    tmp.write(file_content)
+                    tmp_path = tmp.name
             
             file_paths.append(tmp_path)
             file_info.append({
@@ -196,57 +365,280 @@ async def upload_multiple_resumes(
             "error": None,
             "file_paths": file_paths,
             "file_info": file_info,
-            "user_id": None,
+            "user_id": user_id,
             "use_vision": use_vision,
+            "profile": profile,
             "total_files": len(files),
-            "processed_files": 0
+            "processed_files": 0,
+            "started_at": time.perf_counter()
         }
         
-        print(f"Created batch task {task_id} for {len(files)} files with initial progress 10%")
+        logger.info(f"Created batch task for {len(files)} files with initial progress 10%", extra={"task_id": task_id, "stage": "upload"})
         
-        # Start processing in background
-        background_tasks.add_task(process_multiple_resumes, task_id, db)
+        # Start processing in background, or leave it to the worker tier
+        if TASK_EXECUTION_MODE == "queue":
+            enqueue_task(task_id, "batch", BULK)
+        else:
+            background_tasks.add_task(process_multiple_resumes, task_id, db)
         
-        return {
+        response = {
             "task_id": task_id, 
             "status": "processing", 
             "method": "vision" if use_vision else "text",
             "total_files": len(files)
         }
+        if idempotency_key:
+            idempotency.store(user_id, idempotency_key, response)
+        return response
 
     except HTTPException as http_exc:
+        if idempotency_key:
+            idempotency.release(user_id, idempotency_key)
         raise http_exc
     except Exception as e:
-        traceback.print_exc()
+        if idempotency_key:
+            idempotency.release(user_id, idempotency_key)
+        logger.exception("Batch upload failed")
         raise HTTPException(status_code=500, detail=f"Unexpected error occurred: {str(e)}")
 
+class ChunkedUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    total_size: int
+    sha256: Optional[str] = None  # Optional checksum of the whole file, verified on completion
+    use_vision: bool = True
+
+@router.post("/upload/chunked")
+async def initiate_chunked_upload(
+    upload: ChunkedUploadRequest,
+    profile: bool = False,
+    payload: dict = Depends(jwt_bearer)
+):
+    """Start a resumable upload; send parts with PUT .../parts/{n}, then POST .../complete"""
+    if profile:
+        require_admin(payload)
+    
+    file_extension = f".{upload.filename.split('.')[-1].lower()}"
+    if file_extension not in ALLOWED_EXTENSIONS or upload.content_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(status_code=400, detail="Only PDF, DOC, or DOCX files are supported.")
+    
+    try:
+        session = chunked_upload.create_session(
+            payload.get("sub"),
+            upload.filename,
+            file_extension,
+            upload.total_size,
+            sha256=upload.sha256,
+            options={"use_vision": upload.use_vision, "profile": profile}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"upload_id": session["upload_id"], "max_part_size": UPLOAD_PART_MAX_BYTES}
+
+@router.get("/upload/chunked/{upload_id}")
+async def get_chunked_upload(upload_id: str, payload: dict = Depends(jwt_bearer)):
+    """Parts received so far, so an interrupted client knows what to resend"""
+    try:
+        session = chunked_upload.get_session(upload_id, payload.get("sub"))
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return {
+        "upload_id": upload_id,
+        "filename": session["filename"],
+        "total_size": session["total_size"],
+        "received_bytes": session["received_bytes"],
+        "parts": [{"part_number": number, "size": size} for number, size in session["parts"].items()],
+        "task_id": session["task_id"]
+    }
+
+@router.put("/upload/chunked/{upload_id}/parts/{part_number}")
+async def upload_chunk(upload_id: str, part_number: int, request: Request, payload: dict = Depends(jwt_bearer)):
+    """Upload one part as the raw request body"""
+    try:
+        with stage_timer("upload", "chunked"):
+            return await chunked_upload.write_part(upload_id, payload.get("sub"), part_number, request.stream())
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/upload/chunked/{upload_id}/complete")
+async def complete_chunked_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(jwt_bearer)
+):
+    """Assemble the parts and start processing; repeated calls return the same task"""
+    user_id = payload.get("sub")
+    
+    def start_task(session: dict, tmp_path: str, file_size: int) -> str:
+        options = session["options"]
+        return start_single_task(
+            tmp_path, session["filename"], session["file_extension"], file_size,
+            options["use_vision"], options["profile"], user_id, background_tasks, db
+        )
+    
+    try:
+        task_id, created = await run_in_threadpool(chunked_upload.complete, upload_id, user_id, start_task)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if created:
+        logger.info("Assembled chunked upload", extra={"task_id": task_id, "upload_id": upload_id})
+    return {"task_id": task_id, "status": "processing", "created": created}
+
+@router.delete("/upload/chunked/{upload_id}")
+async def abort_chunked_upload(upload_id: str, payload: dict = Depends(jwt_bearer)):
+    try:
+        chunked_upload.abort(upload_id, payload.get("sub"))
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"message": "Upload aborted"}
+
+def batch_results_since(task: dict, since: int):
+    """Results of the batch files that finished after the first `since`, in finishing order"""
+    with BATCH_LOCK:
+        order = list(task.get("completed_order") or [])
+        results = task.get("results")
+        if results is None:
+            results = task.get("data") or []
+        return [results[index] for index in order[since:]], len(order)
+
 @router.get("/progress/{task_id}")
-async def get_progress(task_id: str):
-    if task_id not in TASKS:
+async def get_progress(task_id: str, request: Request, since: Optional[int] = None):
+    """Task status; for batches, `since=N` also returns the per-file results finished after the first N"""
+    task = get_task(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = TASKS[task_id]
-    
-    print(f"Progress check for task {task_id}: {task['stage']} - {task['progress']}%")
+    logger.debug("Progress check", extra={"task_id": task_id, "stage": task["stage"], "progress": task["progress"]})
     
     # Clean up completed tasks after some time (optional)
-    if task["status"] in [TaskStatus.COMPLETED, TaskStatus.FAILED] and "cleanup_time" not in task:
+    if task["status"] in FINISHED_STATUSES and "cleanup_time" not in task:
         task["cleanup_time"] = time.time() + 3600  # Clean up after 1 hour
     
-    response = {
-        "status": task["status"],
-        "stage": task["stage"],
-        "progress": task["progress"],
-        "data": task["data"] if task["status"] == TaskStatus.COMPLETED else None,
-        "error": task["error"] if task["status"] == TaskStatus.FAILED else None
-    }
+    # Reuse the serialized body while the task state is unchanged, so repeated
+    # polls of a finished task don't re-encode the whole parsed resume
+    since = max(since, 0) if since is not None and "total_files" in task else None
+    cache_key = (task["status"], task["stage"], task["progress"], task.get("processed_files"), since)
+    cached = task.get("response_cache")
+    record_cache_lookup("progress_response", bool(cached) and cached["key"] == cache_key)
+    if not cached or cached["key"] != cache_key:
+        response = {
+            "status": task["status"],
+            "stage": task["stage"],
+            "progress": task["progress"],
+            "data": task["data"] if task["status"] in (TaskStatus.COMPLETED, TaskStatus.CANCELLED) else None,
+            "error": task["error"] if task["status"] == TaskStatus.FAILED else None
+        }
+        
+        # Add batch processing info if available
+        if "total_files" in task:
+            response["total_files"] = task["total_files"]
+            response["processed_files"] = task.get("processed_files", 0)
+        
+        # Incremental results: poll again with since=next_since for the next ones
+        if since is not None:
+            response["results"], response["next_since"] = batch_results_since(task, since)
+        
+        body, etag = build_json_body(response)
+        cached = {"key": cache_key, "body": body, "etag": etag, "compressed": {}}
+        task["response_cache"] = cached
+    
+    return json_response(request, cached["body"], cached["etag"], cached["compressed"])
+
+def remove_task_files(task: dict, file_index: Optional[int] = None):
+    paths = task.get("file_paths") or [task.get("file_path")]
+    if file_index is not None:
+        paths = [paths[file_index]]
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def cancel_local_task(task_id: str, file_index: Optional[int] = None):
+    """Cancel a task (or one file of a batch) owned by this process"""
+    task = TASKS[task_id]
     
-    # Add batch processing info if available
-    if "total_files" in task:
-        response["total_files"] = task["total_files"]
-        response["processed_files"] = task.get("processed_files", 0)
+    # Running work stops at its next cancellation point; an in-flight Azure call is aborted
+    cancellation.token_for(task_id, file_index).cancel()
     
-    return response
+    # Work still waiting in the scheduler is taken out and finished off here
+    if file_index is not None:
+        tags = {(task_id, file_index)}
+    else:
+        tags = {task_id} | {(task_id, index) for index in range(task.get("total_files", 0))}
+    for tag in scheduler.withdraw(tags):
+        if isinstance(tag, tuple):
+            index = tag[1]
+            WORK_CANCELLED.inc(kind="file", state="queued")
+            remove_task_files(task, index)
+            if record_batch_file(task_id, index, cancelled_file_result(task["file_info"][index])):
+                finish_batch(task_id)
+        else:
+            mark_cancelled(task_id, "queued")
+            remove_task_files(task)
+            cancellation.discard(task_id)
+
+def cancel_work(task_id: str, file_index: Optional[int], payload: dict) -> dict:
+    task = get_task(task_id)
+    user_id = payload.get("sub")
+    if task is None or (task.get("user_id") != user_id and user_id not in ADMIN_USERNAMES):
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task["status"] in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Task is already {task['status']}")
+    if file_index is not None:
+        if not 0 <= file_index < task.get("total_files", 0):
+            raise HTTPException(status_code=404, detail="File not found in this task")
+        results = task.get("results")
+        if results and results[file_index] is not None:
+            raise HTTPException(status_code=409, detail="File is already processed")
+    
+    if task_id in TASKS:
+        cancel_local_task(task_id, file_index)
+    elif job_queue.request_cancel(task_id, file_index) == job_queue.JobStatus.CANCELLED and file_index is None:
+        # Cancelled before any worker claimed it; the upload files are on this node
+        TASKS_FINISHED.inc(status=TaskStatus.CANCELLED)
+        WORK_CANCELLED.inc(kind="task", state="queued")
+        remove_task_files(task)
+    
+    logger.info("Cancellation requested", extra={"task_id": task_id, "file_index": file_index})
+    task = get_task(task_id)
+    return {"task_id": task_id, "file_index": file_index, "status": task["status"]}
+
+@router.post("/cancel/{task_id}")
+async def cancel_task(task_id: str, payload: dict = Depends(jwt_bearer)):
+    """Cancel a task; queued work is dropped and running work is aborted"""
+    return await run_in_threadpool(cancel_work, task_id, None, payload)
+
+@router.post("/cancel/{task_id}/files/{file_index}")
+async def cancel_task_file(task_id: str, file_index: int, payload: dict = Depends(jwt_bearer)):
+    """Cancel one file (0-based, in upload order) of a batch; the rest of the batch continues"""
+    return await run_in_threadpool(cancel_work, task_id, file_index, payload)
+
+@router.get("/profile/{task_id}")
+async def get_task_profile(task_id: str, format: str = "json", payload: dict = Depends(jwt_bearer)):
+    """Download the profile captured for a task uploaded with profile=true (admin only)"""
+    require_admin(payload)
+    task = get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not task.get("profile"):
+        raise HTTPException(status_code=404, detail="Task was not profiled")
+    report = task.get("profile_report")
+    if report is None:
+        raise HTTPException(status_code=409, detail="Profile is not available until the task finishes")
+    
+    if format == "collapsed":
+        return PlainTextResponse(
+            report["collapsed_stacks"],
+            headers={"Content-Disposition": f'attachment; filename="{task_id}.collapsed.txt"'}
+        )
+    return report
 
 @router.get("/history", response_model=List[ResumeHistoryResponse])
 async def get_resume_history(db: Session = Depends(get_db), limit: int = 10, skip: int = 0):
@@ -258,8 +650,98 @@ async def get_resume_history(db: Session = Depends(get_db), limit: int = 10, ski
     
     return history
 
+# Number of rows fetched per round trip while streaming an export
+EXPORT_CHUNK_SIZE = 500
+
+EXPORT_CSV_COLUMNS = [
+    "id", "filename", "processed_at", "file_size", "status",
+    "original_file_type", "processing_method", "resume_data", "prompt_version", "reprocessed_from"
+]
+
+def history_row_to_dict(resume) -> dict:
+    """Flatten a ResumeHistory row into a JSON-serializable dict"""
+    return {
+        "id": resume.id,
+        "filename": resume.filename,
+        "processed_at": resume.processed_at.isoformat() if resume.processed_at else None,
+        "file_size": resume.file_size,
+        "status": resume.status,
+        "original_file_type": resume.original_file_type,
+        "processing_method": resume.processing_method or "text",
+        "resume_data": resume.resume_data,
+        "prompt_version": resume.prompt_version,
+        "reprocessed_from": resume.reprocessed_from
+    }
+
+def iter_history_export(export_format: str, status: Optional[str], start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Yield export chunks for all matching history rows.
+
+    Rows are read through a streaming cursor EXPORT_CHUNK_SIZE at a time (the
+    session's identity map only holds weak references, so streamed rows are
+    released as we go) and memory stays flat no matter how many rows match. The generator owns its
+    own session because the request-scoped one is closed before streaming starts.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(ResumeHistory)
+        if status:
+            query = query.filter(ResumeHistory.status == status)
+        if start_date:
+            query = query.filter(ResumeHistory.processed_at >= start_date)
+        if end_date:
+            query = query.filter(ResumeHistory.processed_at <= end_date)
+        # Payloads are loaded one IN query per chunk rather than one query per row
+        query = query.options(selectinload(ResumeHistory.payload)).order_by(ResumeHistory.id).yield_per(EXPORT_CHUNK_SIZE)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(EXPORT_CSV_COLUMNS)
+
+        pending = 0
+        for resume in query:
+            row = history_row_to_dict(resume)
+            if export_format == "csv":
+                row["resume_data"] = json.dumps(row["resume_data"])
+                writer.writerow([row[column] for column in EXPORT_CSV_COLUMNS])
+            else:
+                buffer.write(json.dumps(row))
+                buffer.write("\n")
+
+            pending += 1
+            if pending >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                pending = 0
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+@router.get("/history/export")
+async def export_resume_history(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+):
+    """Stream every matching resume history row as NDJSON or CSV"""
+    export_format = format.lower()
+    if export_format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Export format must be 'ndjson' or 'csv'.")
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"resume_history.{export_format}"
+    return StreamingResponse(
+        iter_history_export(export_format, status, start_date, end_date),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/history/{resume_id}", response_model=dict)
-async def get_resume_details(resume_id: int, db: Session = Depends(get_db)):
+async def get_resume_details(resume_id: int, request: Request, db: Session = Depends(get_db)):
     """Get a specific resume from history by ID"""
     resume = db.query(ResumeHistory).filter(ResumeHistory.id == resume_id).first()
     if not resume:
@@ -273,16 +755,14 @@ async def get_resume_details(resume_id: int, db: Session = Depends(get_db)):
         "file_size": resume.file_size,
         "status": resume.status,
         "original_file_type": resume.original_file_type,
-        "resume_data": resume.resume_data
+        "resume_data": resume.resume_data,
+        "processing_method": resume.processing_method or "text",
+        "prompt_version": resume.prompt_version,
+        "reprocessed_from": resume.reprocessed_from
     }
     
-    # Only add processing_method if the column exists
-    if HAS_PROCESSING_METHOD_COLUMN:
-        result["processing_method"] = getattr(resume, "processing_method", "text")
-    else:
-        result["processing_method"] = "text"  # Default value
-    
-    return result
+    body, etag = build_json_body(result)
+    return json_response(request, body, etag)
 
 @router.delete("/history/{resume_id}")
 async def delete_resume(resume_id: int, db: Session = Depends(get_db)):
@@ -291,131 +771,480 @@ async def delete_resume(resume_id: int, db: Session = Depends(get_db)):
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
+    sha256, file_extension = resume.file_sha256, f".{resume.original_file_type}"
+    near_duplicate.remove_resume(db, resume_id)
+    page_index.remove_pages(db, resume_id)
     db.delete(resume)
     db.commit()
     
+    # The original goes too, unless another row (another upload or version) still uses it
+    if sha256 and not db.query(ResumeHistory.id).filter(ResumeHistory.file_sha256 == sha256).first():
+        file_archive.remove(sha256, file_extension)
+    
     return {"message": "Resume deleted successfully"}
 
+class ReprocessRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    status: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    outdated_only: bool = True  # skip resumes already parsed with the current prompt version
+    use_vision: bool = True
+    limit: int = REPROCESS_MAX_FILES
+
+def start_reprocess_task(resumes: list, use_vision: bool, user_id: str, background_tasks: BackgroundTasks, db: Session) -> dict:
+    """Start a throttled batch that re-parses the archived originals of `resumes`.
+
+    Each file is saved as a new history row with reprocessed_from pointing at
+    the row it re-parses, which is kept. Resumes whose original is no longer
+    archived are skipped.
+    """
+    file_paths = []
+    file_info = []
+    for resume in resumes:
+        file_extension = f".{resume.original_file_type}"
+        if not resume.file_sha256 or file_extension not in ALLOWED_EXTENSIONS:
+            continue
+        path = file_archive.checkout(resume.file_sha256, file_extension)
+        if path is None:
+            continue
+        file_paths.append(path)
+        file_info.append({
+            "filename": resume.filename,
+            "file_size": resume.file_size,
+            "file_extension": file_extension,
+            "file_path": path,
+            "resume_id": resume.id,
+            "user_id": resume.user_id,
+            "sha256": resume.file_sha256
+        })
+    
+    response = {"total_files": len(file_paths), "skipped": len(resumes) - len(file_paths)}
+    if not file_paths:
+        return response
+    
+    task_id = str(uuid.uuid4())
+    TASKS[task_id] = {
+        "status": TaskStatus.PENDING,
+        "stage": "upload",
+        "progress": 10,
+        "data": [],
+        "error": None,
+        "file_paths": file_paths,
+        "file_info": file_info,
+        "user_id": user_id,
+        "use_vision": use_vision,
+        "profile": False,
+        "total_files": len(file_paths),
+        "processed_files": 0,
+        "started_at": time.perf_counter()
+    }
+    logger.info(f"Created reprocess task for {len(file_paths)} files with prompt version {PROMPT_VERSION}", extra={"task_id": task_id, "stage": "upload"})
+    
+    if TASK_EXECUTION_MODE == "queue":
+        enqueue_task(task_id, "reprocess", BULK)
+    else:
+        background_tasks.add_task(process_reprocess, task_id, db)
+    return {"task_id": task_id, "status": "processing", "method": "vision" if use_vision else "text",
+            "prompt_version": PROMPT_VERSION, **response}
+
+@router.post("/history/reprocess")
+async def reprocess_history(
+    request: ReprocessRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(jwt_bearer)
+):
+    """Re-parse the stored resumes matching a filter from their archived originals (admin only).
+
+    Only the latest version of each resume is picked, oldest first, up to
+    `limit` (at most REPROCESS_MAX_FILES). Poll /progress/{task_id} as for a batch.
+    """
+    require_admin(payload)
+    superseded = select(ResumeHistory.reprocessed_from).where(ResumeHistory.reprocessed_from.isnot(None))
+    query = db.query(ResumeHistory).filter(ResumeHistory.file_sha256.isnot(None), ResumeHistory.id.not_in(superseded))
+    if request.ids:
+        query = query.filter(ResumeHistory.id.in_(request.ids))
+    if request.status:
+        query = query.filter(ResumeHistory.status == request.status)
+    if request.start_date:
+        query = query.filter(ResumeHistory.processed_at >= request.start_date)
+    if request.end_date:
+        query = query.filter(ResumeHistory.processed_at <= request.end_date)
+    if request.outdated_only:
+        query = query.filter(or_(ResumeHistory.prompt_version.is_(None), ResumeHistory.prompt_version != PROMPT_VERSION))
+    resumes = query.order_by(ResumeHistory.id).limit(max(1, min(request.limit, REPROCESS_MAX_FILES))).all()
+    
+    response = start_reprocess_task(resumes, request.use_vision, payload.get("sub"), background_tasks, db)
+    if not response["total_files"]:
+        raise HTTPException(status_code=404, detail="No matching resumes with an archived original")
+    return response
+
+@router.post("/history/{resume_id}/reprocess")
+async def reprocess_resume(
+    resume_id: int,
+    background_tasks: BackgroundTasks,
+    use_vision: bool = True,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(jwt_bearer)
+):
+    """Re-parse one stored resume from its archived original with the current prompt version"""
+    user_id = payload.get("sub")
+    resume = db.query(ResumeHistory).filter(ResumeHistory.id == resume_id).first()
+    if not resume or (resume.user_id != user_id and user_id not in ADMIN_USERNAMES):
+        raise HTTPException(status_code=404, detail="Resume not found")
+    
+    response = start_reprocess_task([resume], use_vision, user_id, background_tasks, db)
+    if not response["total_files"]:
+        raise HTTPException(status_code=409, detail="The original file of this resume is not in the archive")
+    return response
+
+# Keys the pipeline adds to a parse; dropped before the parse is reused for another upload
+RESULT_METADATA_KEYS = ("filename", "processing_method", "file_index", "fallbacks")
+
+def local_text(files, log_extra: dict) -> Optional[str]:
+    """The file's locally extracted text for the reuse checks, or None if it can't be read"""
+    try:
+        return files.text()
+    except Exception as e:
+        logger.warning(f"Local text extraction failed: {str(e)}", extra=log_extra)
+        return None
+
+def reuse_near_duplicate(task_id: str, text: str, user_id: Optional[str], db: Session, cancel_token,
+                         tier: str = "large") -> Optional[tuple]:
+    """(parsed, processing_method) built from a near-duplicate processed earlier, or None.
+
+    An identical text reuses the earlier parse as is ("reused"); a near-duplicate
+    sends only the changed lines to Azure ("delta"). Returns None, so the caller
+    does a full parse, when there is no match, too much changed, or the delta
+    parse fails.
+    """
+    with stage_timer("dedup_lookup", "none"):
+        match = near_duplicate.find_match(db, text, user_id)
+    if match is None:
+        NEAR_DUPLICATES.inc(outcome="miss")
+        return None
+    
+    previous = {key: value for key, value in match.resume.resume_data.items() if key not in RESULT_METADATA_KEYS}
+    log_extra = {"task_id": task_id, "resume_id": match.resume.id, "similarity": round(match.similarity, 3)}
+    if match.identical:
+        NEAR_DUPLICATES.inc(outcome="reused")
+        logger.info("Reusing the parse of an identical resume", extra=log_extra)
+        return previous, "reused"
+    
+    removed, added = near_duplicate.changed_lines(match.text, text)
+    if len(removed) + len(added) > DEDUP_MAX_CHANGED_LINES:
+        NEAR_DUPLICATES.inc(outcome="too_different")
+        return None
+    
+    try:
+        extracted = update_resume_details_with_azure(previous, removed, added, cancel_token, tier)
+        with stage_timer("json_cleanup", "delta"):
+            parsed = clean_json_string(extracted)
+            parsed = validate_professional_experience_length(parsed)
+    except Exception as e:
+        NEAR_DUPLICATES.inc(outcome="delta_failed")
+        logger.warning(f"Delta parse failed, doing a full parse: {str(e)}", extra=log_extra)
+        return None
+    
+    NEAR_DUPLICATES.inc(outcome="delta")
+    logger.info(f"Re-parsed {len(removed)} removed and {len(added)} added lines of a near-duplicate resume", extra=log_extra)
+    return parsed, "delta"
+
+def page_fingerprints(files, log_extra: dict) -> Optional[list]:
+    """Page fingerprints of the file's PDF, or None when page-level re-parse is off or the PDF can't be read"""
+    if not PAGE_REPARSE_MAX_CHANGED_PAGES:
+        return None
+    try:
+        return files.pages()
+    except Exception as e:
+        logger.warning(f"Could not fingerprint PDF pages: {str(e)}", extra=log_extra)
+        return None
+
+def reparse_changed_pages(task_id: str, pdf_path: str, pages: Optional[list], user_id: Optional[str], db: Session, cancel_token,
+                          filename: Optional[str] = None, tier: str = "large") -> Optional[tuple]:
+    """(parsed, processing_method) for a page-wise edit of a stored resume, or None.
+    
+    Only the changed pages are rendered and sent, along with the previous parse
+    ("page_delta"); a document with no changed pages reuses the parse ("reused").
+    """
+    if not pages:
+        return None
+    previous_version = page_index.find_previous_version(db, pages, user_id, PAGE_REPARSE_MAX_CHANGED_PAGES, filename)
+    if previous_version is None:
+        return None
+    
+    resume = previous_version.resume
+    previous = {key: value for key, value in resume.resume_data.items() if key not in RESULT_METADATA_KEYS}
+    changed = previous_version.changed_pages
+    log_extra = {"task_id": task_id, "resume_id": resume.id, "changed_pages": [page_num + 1 for page_num in changed]}
+    if not changed:
+        NEAR_DUPLICATES.inc(outcome="reused")
+        logger.info("Reusing the parse of a resume with identical pages", extra=log_extra)
+        return previous, "reused"
+    
+    try:
+        extracted = update_resume_pages_with_azure_vision(
+            pdf_path, previous, changed, previous_version.page_texts, cancel_token, tier
+        )
+        with stage_timer("json_cleanup", "vision_pages"):
+            parsed = clean_json_string(extracted)
+            parsed = validate_professional_experience_length(parsed)
+    except Exception as e:
+        NEAR_DUPLICATES.inc(outcome="page_delta_failed")
+        logger.warning(f"Page-level re-parse failed, parsing every page: {str(e)}", extra=log_extra)
+        return None
+    
+    NEAR_DUPLICATES.inc(outcome="page_delta")
+    logger.info(f"Re-parsed {len(changed)} of {len(pages)} pages", extra=log_extra)
+    return parsed, "page_delta"
+
+def index_for_reuse(db: Session, resume_id: int, user_id: Optional[str], files, log_extra: dict):
+    """Add a saved parse to the near-duplicate and page indexes; failures only cost future reuse"""
+    try:
+        text = files.cached("text")
+        if DEDUP_ENABLED and text:
+            near_duplicate.index_resume(db, resume_id, user_id, text)
+        # A DOCX that was never converted isn't converted just to be indexed
+        pages = page_fingerprints(files, log_extra) if files.has_pdf() else None
+        if pages:
+            page_index.index_pages(db, resume_id, pages)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not index resume for reuse: {str(e)}", extra=log_extra)
+
+def archive_original(file_path: str, file_extension: str, log_extra: dict) -> Optional[str]:
+    """sha256 of an uploaded file after keeping it in the archive; None if archiving is off or fails"""
+    if not ARCHIVE_ENABLED:
+        return None
+    try:
+        with stage_timer("archive"):
+            return file_archive.store(file_path, file_extension)
+    except Exception as e:
+        logger.warning(f"Could not archive the original file: {str(e)}", extra=log_extra)
+        return None
+
+def local_contacts(files, log_extra: dict) -> dict:
+    """Contact fields extracted locally, left out of the Azure prompt; empty if disabled or unreadable"""
+    if not LOCAL_CONTACTS_ENABLED:
+        return {}
+    try:
+        with stage_timer("contact_extraction"):
+            contacts = files.contacts()
+    except Exception as e:
+        logger.warning(f"Local contact extraction failed: {str(e)}", extra=log_extra)
+        return {}
+    for field in contacts:
+        LOCAL_CONTACT_FIELDS.inc(field=field)
+    return contacts
+
+def route_tier(files, log_extra: dict) -> str:
+    """The deployment tier for a file: small for simple documents when that tier exists, else large"""
+    if not COMPLEXITY_ROUTING_ENABLED or not azure_pool.pool.has_tier("small"):
+        return "large"
+    try:
+        with stage_timer("complexity_estimate"):
+            estimate = files.complexity()
+    except Exception as e:
+        logger.warning(f"Complexity estimate failed, using the large tier: {str(e)}", extra=log_extra)
+        return "large"
+    TIER_ROUTING.inc(tier=estimate.tier)
+    logger.info(
+        f"Routing to the {estimate.tier} tier: {estimate.pages} pages, {estimate.text_chars} characters, {estimate.tables} tables",
+        extra={**log_extra, "stage": "routing"}
+    )
+    return estimate.tier
+
+def hedged_parse(parse_vision: Callable, parse_text: Callable, cancel_token, log_extra: dict) -> tuple:
+    """Vision parse that also starts the text parse if vision is slower than the HEDGE_QUANTILE of recent calls.
+
+    Returns (parsed, processing_method) of whichever succeeds first; the other
+    request is cancelled. Errors are raised only when both fail (or vision
+    fails before the deadline), and the caller falls back to text as usual.
+    """
+    delay = hedging.deadline(
+        STAGE_DURATION, HEDGE_QUANTILE, HEDGE_MIN_SAMPLES, HEDGE_DEFAULT_DEADLINE_SECONDS,
+        stage="azure_call", method="vision"
+    )
+    parsed, winner = hedging.run(parse_vision, parse_text, delay, cancel_token)
+    if winner == "backup":
+        logger.info(f"Vision took over {delay:.1f}s; the hedged text parse answered first", extra={**log_extra, "stage": "hedging"})
+        return parsed, "text"
+    return parsed, "vision"
+
+def record_fallback(fallbacks: list, step: str, error: Exception, log_extra: dict, to: str = "text-based processing"):
+    """Note that `step` failed for this file, which continues on the text path (or `to`)"""
+    fallbacks.append({"step": step, "error": str(error)})
+    STRATEGY_FALLBACKS.inc(step=step)
+    logger.warning(f"{step} failed, falling back to {to}: {str(error)}", extra={**log_extra, "stage": step})
+
+def parse_file(task_id: str, files, use_vision: bool, user_id: Optional[str], db: Session, cancel_token,
+               fallbacks: list, progress: Callable, log_extra: dict, reuse: bool = True,
+               filename: Optional[str] = None) -> tuple:
+    """Run one file through the processing strategy; returns (parsed, processing_method).
+    
+    The strategy is decided per file: reuse of an earlier parse, then vision
+    (converting a DOC/DOCX first), then text. A failed step only moves this file
+    to the next one and is appended to `fallbacks`. Every step takes the
+    converted PDF, text and page fingerprints from `files`, so none is produced
+    twice. `progress(stage, percent, pause=True)` is called between steps and
+    is where cancellation is checked. Reprocessing passes reuse=False, since
+    the earlier parse it would find is the one being replaced.
+    
+    Email, mobile and links found locally are filled in rather than asked of
+    Azure. Full parses go to the deployment tier picked by route_tier; a parse
+    that fails on the small tier is retried on the large one before falling
+    back. With SECTION_EXTRACTION_ENABLED, large-tier parses are split into
+    concurrent section prompts.
+    With HEDGING_ENABLED, a vision parse slower than usual is raced against the
+    text parse (see hedged_parse).
+    """
+    tier = None
+    
+    def routed_tier() -> str:
+        nonlocal tier
+        if tier is None:
+            tier = route_tier(files, log_extra)
+        return tier
+    
+    def on_tier(parse: Callable) -> dict:
+        nonlocal tier
+        if routed_tier() == "small":
+            try:
+                return parse("small")
+            except Exception as e:
+                record_fallback(fallbacks, "small_tier", e, log_extra, to="the large tier")
+                tier = "large"
+        return parse("large")
+    
+    contacts = None
+    
+    def known_contacts() -> dict:
+        nonlocal contacts
+        if contacts is None:
+            contacts = local_contacts(files, log_extra)
+        return contacts
+    
+    def parse_vision(pdf_path: str, tier: str, token=cancel_token) -> dict:
+        known = known_contacts()
+        if SECTION_EXTRACTION_ENABLED and tier == "large":
+            parsed = extract_resume_sections_with_azure(pdf_path, True, token, tier, tuple(known))
+        else:
+            extracted = extract_resume_details_with_azure_vision(pdf_path, token, tier, tuple(known))
+            with stage_timer("json_cleanup", "vision"):
+                parsed = clean_json_string(extracted)
+        return {**validate_professional_experience_length(parsed), **known}
+    
+    def parse_text(text: str, tier: str, token=cancel_token) -> dict:
+        known = known_contacts()
+        if SECTION_EXTRACTION_ENABLED and tier == "large":
+            parsed = extract_resume_sections_with_azure(text, False, token, tier, tuple(known))
+        else:
+            extracted = extract_resume_details_with_azure(text, token, tier, tuple(known))
+            with stage_timer("json_cleanup", "text"):
+                parsed = clean_json_string(extracted)
+        return {**validate_professional_experience_length(parsed), **known}
+    
+    if DEDUP_ENABLED and reuse:
+        # A resubmitted resume reuses the earlier parse instead of a full Azure call
+        progress("checking_duplicates", 18, pause=False)
+        text = local_text(files, log_extra)
+        if text:
+            reused = reuse_near_duplicate(task_id, text, user_id, db, cancel_token, routed_tier())
+            if reused:
+                return reused
+    
+    # For DOC/DOCX files, convert to PDF first if using vision processing
+    if use_vision and not files.has_pdf():
+        progress("converting_docx_to_pdf", 20)
+        logger.info(f"Converting {files.file_extension} to PDF for vision processing", extra={**log_extra, "stage": "converting_docx_to_pdf"})
+        try:
+            files.pdf_path()
+            progress("converting_docx_to_pdf", 30)
+        except Exception as e:
+            record_fallback(fallbacks, "docx_conversion", e, log_extra)
+            use_vision = False
+            progress("extraction", 25)
+    
+    if use_vision:
+        try:
+            # Pages (ALL of them, for complete table extraction) are rendered and encoded
+            # one at a time while the request body is written, so no list of
+            # full-resolution images is kept
+            progress("conversion_to_image_all_pages", 50)
+            progress("parsing_all_pages_with_vision", 55)
+            logger.debug("Starting vision-based parsing", extra={**log_extra, "stage": "parsing_all_pages_with_vision"})
+            
+            # A new version of a stored resume only sends the pages that changed
+            pdf_path = files.pdf_path()
+            reused = reuse and reparse_changed_pages(
+                task_id, pdf_path, page_fingerprints(files, log_extra), user_id, db, cancel_token, filename,
+                routed_tier()
+            )
+            if reused:
+                parsed, processing_method = reused
+            elif HEDGING_ENABLED and local_text(files, log_extra):
+                routed_tier()
+                parsed, processing_method = hedged_parse(
+                    lambda token: on_tier(lambda tier: parse_vision(pdf_path, tier, token)),
+                    lambda token: on_tier(lambda tier: parse_text(files.text(), tier, token)),
+                    cancel_token, log_extra
+                )
+            else:
+                parsed = on_tier(lambda tier: parse_vision(pdf_path, tier))
+                processing_method = "vision"
+            
+            # Log the number of experience entries found
+            experience_data = parsed.get('experience_data', [])
+            logger.info(f"Extracted {len(experience_data)} experience entries", extra={**log_extra, "stage": "parsing_all_pages_with_vision"})
+            progress("parsing_all_pages_with_vision", 85)
+            return parsed, processing_method
+        except Exception as e:
+            record_fallback(fallbacks, "vision", e, log_extra)
+            progress("extraction", 50)
+    
+    # Vision failed, wasn't requested, or the DOCX couldn't be converted: use the text
+    # of the original file (already extracted if the reuse check read it)
+    progress("extraction", 55)
+    text = files.text()
+    logger.info(f"Extracted {len(text)} characters from {files.file_extension.lstrip('.').upper()}", extra={**log_extra, "stage": "extraction"})
+    progress("extraction", 70)
+    
+    progress("parsing", 75)
+    parsed = on_tier(lambda tier: parse_text(text, tier))
+    progress("parsing", 85)
+    return parsed, "text"
+
 def process_resume_sync(task_id: str, db: Session):
     """Synchronous version of process_resume for background task"""
     task = TASKS[task_id]
-    tmp_path = task["file_path"]
-    file_extension = task["file_extension"]
     use_vision = task.get("use_vision", True)
-    converted_pdf_path = None  # Track converted PDF for cleanup
+    cancel_token = cancellation.token_for(task_id)
+    files = artifacts.for_file(task_id, 0, task["file_path"], task["file_extension"])
+    fallbacks = []
+    log_extra = {"task_id": task_id}
+    # Kept for reprocessing before the finally block below removes the upload
+    file_sha256 = archive_original(task["file_path"], task["file_extension"], log_extra)
+    
+    def progress(stage: str, percent: int, pause: bool = True):
+        update_task_progress(task_id, stage, percent)
+        if pause:
+            cancel_token.sleep(0.5)  # Small delay to ensure frontend sees the update; also a cancellation point
+        else:
+            cancel_token.check()
     
     try:
         # Update status to processing
         task["status"] = TaskStatus.PROCESSING
-        update_task_progress(task_id, "processing", 15)
-        time.sleep(0.5)  # Small delay to ensure frontend sees the update
+        progress("processing", 15)
         
-        # For DOC/DOCX files, convert to PDF first if using vision processing
-        if file_extension in ['.doc', '.docx'] and use_vision:
-            try:
-                # Step 1: Convert DOCX to PDF for vision processing
-                update_task_progress(task_id, "converting_docx_to_pdf", 20)
-                time.sleep(0.5)
-                
-                print(f"Converting {file_extension} to PDF for comprehensive vision processing...")
-                
-                # Convert DOCX to PDF using Aspose.Words
-                converted_pdf_path = convert_docx_to_pdf(tmp_path)
-                update_task_progress(task_id, "converting_docx_to_pdf", 30)
-                time.sleep(0.5)
-                
-                # Update file extension and path for further processing
-                file_extension = '.pdf'
-                tmp_path = converted_pdf_path
-                
-                print(f"Successfully converted to PDF for comprehensive table extraction: {converted_pdf_path}")
-                
-            except Exception as e:
-                print(f"DOCX to PDF conversion failed, falling back to text-based processing: {str(e)}")
-                use_vision = False
-                update_task_progress(task_id, "extraction", 25)
-                time.sleep(0.5)
-        
-        # Process using either vision-based or text-based approach
-        processing_method = "text"  # Default to text in case of fallback
-        
-        if use_vision and file_extension == '.pdf':
-            try:
-                # Step 1: Convert PDF to images (ALL pages for complete table extraction)
-                update_task_progress(task_id, "conversion_to_image_all_pages", 35)
-                time.sleep(0.5)
-                
-                print("Converting ALL pages to images for comprehensive table extraction...")
-                
-                # Convert PDF to images (all pages)
-                images = convert_pdf_to_images(tmp_path)
-                print(f"Converted all {len(images)} pages to images for complete table analysis")
-                update_task_progress(task_id, "conversion_to_image_all_pages", 50)
-                time.sleep(0.5)
-                
-                # Step 2: Extract structured resume details (via Azure with vision - ALL pages)
-                update_task_progress(task_id, "parsing_all_pages_with_vision", 55)
-                time.sleep(0.5)
-                
-                print("Starting comprehensive vision-based parsing of all pages and table rows...")
-                
-                extracted = extract_resume_details_with_azure_vision(images)
-                parsed = clean_json_string(extracted)
-                parsed = validate_professional_experience_length(parsed)
-                
-                # Log the number of experience entries found
-                experience_data = parsed.get('experience_data', [])
-                print(f"Successfully extracted {len(experience_data)} experience entries from all table rows")
-                
-                update_task_progress(task_id, "parsing_all_pages_with_vision", 85)
-                time.sleep(0.5)
-                processing_method = "vision"
-                
-            except Exception as e:
-                print(f"Comprehensive vision-based processing failed, falling back to text-based: {str(e)}")
-                # Fall back to text-based processing
-                use_vision = False
-                update_task_progress(task_id, "extraction", 50)
-                time.sleep(0.5)
-        
-        # If vision processing failed, wasn't requested, or file is DOCX, use text-based processing
-        if not use_vision:
-            # Step 1: Extract text from file
-            update_task_progress(task_id, "extraction", 55)
-            time.sleep(0.5)
-            
-            # Extract text based on file type (use original file for text extraction)
-            original_file_extension = task["file_extension"]
-            original_file_path = task["file_path"]
-            
-            if original_file_extension == '.pdf':
-                text = extract_text_from_pdf(original_file_path)
-                print(f"Extracted {len(text)} characters from PDF")
-            elif original_file_extension in ['.doc', '.docx']:
-                # Use the new DOCX extraction function
-                text = extract_text_from_docx(original_file_path)
-                print(f"Extracted {len(text)} characters from DOCX")
-            else:
-                raise Exception(f"Unsupported file type: {original_file_extension}")
-                
-            update_task_progress(task_id, "extraction", 70)
-            time.sleep(0.5)
-            
-            # Step 2: Extract structured resume details (via Azure)
-            update_task_progress(task_id, "parsing", 75)
-            time.sleep(0.5)
-                
-            extracted = extract_resume_details_with_azure(text)
-            parsed = clean_json_string(extracted)
-            parsed = validate_professional_experience_length(parsed)
-            update_task_progress(task_id, "parsing", 85)
-            time.sleep(0.5)
-            
-            processing_method = "text"
+        parsed, processing_method = parse_file(
+            task_id, files, use_vision, task["user_id"], db, cancel_token, fallbacks, progress, log_extra,
+            filename=task["filename"]
+        )
 
         # Set completed status and store the parsed data
-        update_task_progress(task_id, "completion", 95)
-        time.sleep(0.5)
+        progress("completion", 95)
         
         task["status"] = TaskStatus.COMPLETED
         task["data"] = parsed
@@ -423,7 +1252,10 @@ def process_resume_sync(task_id: str, db: Session):
         
         # Log final results
         experience_data = parsed.get('experience_data', [])
-        print(f"Final result: Successfully processed resume with {len(experience_data)} experience entries using {processing_method} method")
+        logger.info(
+            f"Processed resume with {len(experience_data)} experience entries using {processing_method} method",
+            extra={"task_id": task_id, "stage": "completed", "duration_ms": round((time.perf_counter() - task["started_at"]) * 1000, 1)}
+        )
         
         # Create resume history object with basic fields
         resume_history = ResumeHistory(
@@ -431,19 +1263,25 @@ def process_resume_sync(task_id: str, db: Session):
             resume_data=parsed,
             file_size=task["file_size"],
             original_file_type=task["file_extension"].lstrip('.'),  # Use original file extension
-            user_id=task["user_id"]
+            user_id=task["user_id"],
+            file_sha256=file_sha256,
+            prompt_version=PROMPT_VERSION
         )
         
-        # Only set processing_method if the column exists
-        if HAS_PROCESSING_METHOD_COLUMN:
-            resume_history.processing_method = processing_method
+        resume_history.processing_method = processing_method
         
-        db.add(resume_history)
-        db.commit()
-        db.refresh(resume_history)
+        with stage_timer("db_write", processing_method):
+            db.add(resume_history)
+            db.commit()
+            db.refresh(resume_history)
+        index_for_reuse(db, resume_history.id, task["user_id"], files, log_extra)
+        TASKS_FINISHED.inc(status=TaskStatus.COMPLETED)
 
+    except TaskCancelled:
+        mark_cancelled(task_id, "running")
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Resume processing failed", extra={"task_id": task_id, "stage": task.get("stage")})
+        TASKS_FINISHED.inc(status=TaskStatus.FAILED)
         task["status"] = TaskStatus.FAILED
         task["error"] = str(e)
         update_task_progress(task_id, "failed", 0)
@@ -457,218 +1295,270 @@ def process_resume_sync(task_id: str, db: Session):
                 file_size=task["file_size"],
                 original_file_type=task["file_extension"].lstrip('.'),
                 user_id=task["user_id"],
-                status="failed"
+                status="failed",
+                file_sha256=file_sha256,
+                prompt_version=PROMPT_VERSION
             )
             
-            # Only set processing_method if the column exists
-            if HAS_PROCESSING_METHOD_COLUMN:
-                resume_history.processing_method = "vision" if use_vision else "text"
+            resume_history.processing_method = "vision" if use_vision else "text"
             
             db.add(resume_history)
             db.commit()
         except:
             pass
     finally:
-        # Clean up temporary files
+        # Clean up temporary files (release removes a converted PDF)
+        artifacts.release(task_id)
         try:
             if os.path.exists(task["file_path"]):
                 os.remove(task["file_path"])
-            # Also clean up converted PDF if it was created
-            if converted_pdf_path and os.path.exists(converted_pdf_path) and converted_pdf_path != task["file_path"]:
-                os.remove(converted_pdf_path)
         except:
             pass
+        cancellation.discard(task_id)
 
-def process_multiple_resumes_sync(task_id: str, db: Session):
-    """Process multiple resumes synchronously"""
+# Guards per-file bookkeeping of batches whose files run concurrently
+BATCH_LOCK = threading.Lock()
+
+def cancelled_file_result(info: dict) -> dict:
+    return {'filename': info['filename'], 'error': 'Cancelled', 'processing_method': 'cancelled'}
+
+def mark_cancelled(task_id: str, state: str):
+    """Record a task as cancelled; `state` is "queued" or "running", for the metrics"""
     task = TASKS[task_id]
-    file_paths = task["file_paths"]
-    file_info = task["file_info"]
-    use_vision = task.get("use_vision", True)
+    task["status"] = TaskStatus.CANCELLED
+    TASKS_FINISHED.inc(status=TaskStatus.CANCELLED)
+    WORK_CANCELLED.inc(kind="task", state=state)
+    update_task_progress(task_id, "cancelled", task["progress"])
+    logger.info("Task cancelled", extra={"task_id": task_id, "stage": "cancelled"})
+
+def start_batch(task_id: str):
+    task = TASKS[task_id]
+    task["status"] = TaskStatus.PROCESSING
+    task["results"] = [None] * len(task["file_paths"])
+    task["completed_order"] = []  # file indexes in the order they finished, for ?since=N
+    update_task_progress(task_id, "processing_multiple", 15)
+    update_task_progress(task_id, f"processing_file_1_of_{task['total_files']}", 15)
+
+def process_batch_file_sync(task_id: str, index: int, db: Optional[Session] = None) -> dict:
+    """Process one file of a batch and save it to history; returns its result entry.
+    
+    Without `db` the file gets its own session, so files of a batch can run on
+    different threads. The strategy is the file's own: another file falling back
+    to text doesn't change how this one is processed.
+    """
+    task = TASKS[task_id]
+    file_path = task["file_paths"][index]
+    info = task["file_info"][index]
+    cancel_token = cancellation.token_for(task_id, index)
+    if cancel_token.cancelled:
+        # Cancelled before it started
+        WORK_CANCELLED.inc(kind="file", state="queued")
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        return cancelled_file_result(info)
+    
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    files = artifacts.for_file(task_id, index, file_path, info["file_extension"])
+    fallbacks = []
+    log_extra = {"task_id": task_id, "file_index": index}
+    # A reprocessed file is saved for the owner of the row it replaces
+    user_id = info.get("user_id", task["user_id"])
+    reprocessed_from = info.get("resume_id")
+    file_sha256 = info.get("sha256") or archive_original(file_path, info["file_extension"], log_extra)
     
     try:
-        task["status"] = TaskStatus.PROCESSING
-        update_task_progress(task_id, "processing_multiple", 15)
+        cancel_token.check()
         
-        results = []
-        total_files = len(file_paths)
+        parsed, processing_method = parse_file(
+            task_id, files, task.get("use_vision", True), user_id, db, cancel_token, fallbacks,
+            lambda stage, percent, pause=True: cancel_token.check(), log_extra, reuse=reprocessed_from is None,
+            filename=info["filename"]
+        )
         
-        for i, (file_path, info) in enumerate(zip(file_paths, file_info)):
-            try:
-                # Update progress for current file
-                file_progress = int((i / total_files) * 80) + 15  # 15-95% range
-                update_task_progress(task_id, f"processing_file_{i+1}_of_{total_files}", file_progress)
-                
-                # Process single file
-                file_extension = info["file_extension"]
-                converted_pdf_path = None
-                
-                # Convert DOCX to PDF if using vision processing
-                if file_extension in ['.doc', '.docx'] and use_vision:
-                    try:
-                        converted_pdf_path = convert_docx_to_pdf(file_path)
-                        file_extension = '.pdf'
-                        processing_path = converted_pdf_path
-                    except Exception as e:
-                        print(f"DOCX to PDF conversion failed for {info['filename']}, falling back to text-based processing: {str(e)}")
-                        use_vision = False
-                        processing_path = file_path
-                else:
-                    processing_path = file_path
-                
-                # Process using vision or text-based approach
-                processing_method = "text"
-                if use_vision and file_extension == '.pdf':
-                    try:
-                        images = convert_pdf_to_images(processing_path)
-                        extracted = extract_resume_details_with_azure_vision(images)
-                        parsed = clean_json_string(extracted)
-                        parsed = validate_professional_experience_length(parsed)
-                        processing_method = "vision"
-                    except Exception as e:
-                        print(f"Vision processing failed for {info['filename']}, falling back to text-based: {str(e)}")
-                        use_vision = False
-                
-                if not use_vision:
-                    if file_extension == '.pdf':
-                        text = extract_text_from_pdf(file_path)
-                    elif file_extension in ['.doc', '.docx']:
-                        text = extract_text_from_docx(file_path)
-                    else:
-                        raise Exception(f"Unsupported file type: {file_extension}")
-                    
-                    extracted = extract_resume_details_with_azure(text)
-                    parsed = clean_json_string(extracted)
-                    parsed = validate_professional_experience_length(parsed)
-                    processing_method = "text"
-                
-                # Add filename and processing method to result
-                parsed['filename'] = info['filename']
-                parsed['processing_method'] = processing_method
-                results.append(parsed)
-                
-                # Save to database
-                resume_history = ResumeHistory(
-                    filename=info['filename'],
-                    resume_data=parsed,
-                    file_size=info['file_size'],
-                    original_file_type=info['file_extension'].lstrip('.'),
-                    user_id=task["user_id"]
-                )
-                
-                if HAS_PROCESSING_METHOD_COLUMN:
-                    resume_history.processing_method = processing_method
-                
-                db.add(resume_history)
-                
-                # Clean up converted PDF if it was created
-                if converted_pdf_path and os.path.exists(converted_pdf_path) and converted_pdf_path != file_path:
-                    os.remove(converted_pdf_path)
-                
-                # Update processed files count
-                task["processed_files"] = i + 1
-                
-            except Exception as e:
-                print(f"Error processing file {info['filename']}: {str(e)}")
-                error_result = {
-                    'filename': info['filename'],
-                    'error': str(e),
-                    'processing_method': 'failed'
-                }
-                results.append(error_result)
-                
-                # Save failed job to history
-                try:
-                    resume_history = ResumeHistory(
-                        filename=info['filename'],
-                        resume_data=error_result,
-                        file_size=info['file_size'],
-                        original_file_type=info['file_extension'].lstrip('.'),
-                        user_id=task["user_id"],
-                        status="failed"
-                    )
-                    
-                    if HAS_PROCESSING_METHOD_COLUMN:
-                        resume_history.processing_method = "failed"
-                    
-                    db.add(resume_history)
-                except:
-                    pass
+        cancel_token.check()
+        
+        # Add filename and processing method to result
+        parsed['filename'] = info['filename']
+        parsed['processing_method'] = processing_method
+        if fallbacks:
+            parsed['fallbacks'] = fallbacks
+        
+        # Save to database
+        resume_history = ResumeHistory(
+            filename=info['filename'],
+            resume_data=parsed,
+            file_size=info['file_size'],
+            original_file_type=info['file_extension'].lstrip('.'),
+            user_id=user_id,
+            file_sha256=file_sha256,
+            prompt_version=PROMPT_VERSION,
+            reprocessed_from=reprocessed_from
+        )
+        
+        resume_history.processing_method = processing_method
+        
+        with stage_timer("db_write", processing_method):
+            db.add(resume_history)
+            db.commit()
+        index_for_reuse(db, resume_history.id, user_id, files, log_extra)
+        
+        return parsed
+        
+    except TaskCancelled:
+        logger.info(f"Cancelled file {info['filename']}", extra=log_extra)
+        WORK_CANCELLED.inc(kind="file", state="running")
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        return cancelled_file_result(info)
+    except Exception as e:
+        logger.error(f"Error processing file {info['filename']}: {str(e)}", extra={"task_id": task_id, "stage": task.get("stage")})
+        error_result = {
+            'filename': info['filename'],
+            'error': str(e),
+            'processing_method': 'failed'
+        }
+        
+        # Save failed job to history
+        try:
+            db.rollback()
+            resume_history = ResumeHistory(
+                filename=info['filename'],
+                resume_data=error_result,
+                file_size=info['file_size'],
+                original_file_type=info['file_extension'].lstrip('.'),
+                user_id=user_id,
+                status="failed",
+                file_sha256=file_sha256,
+                prompt_version=PROMPT_VERSION,
+                reprocessed_from=reprocessed_from
+            )
+            
+            resume_history.processing_method = "failed"
+            
+            db.add(resume_history)
+            db.commit()
+        except:
+            pass
+        return error_result
+    finally:
+        # Removes the converted PDF, if any
+        artifacts.release(task_id, index)
+        if own_session:
+            db.close()
+
+def record_batch_file(task_id: str, index: int, result: dict) -> bool:
+    """Publish a file's result and advance progress; True once every file is done"""
+    task = TASKS[task_id]
+    result["file_index"] = index
+    with BATCH_LOCK:
+        task["results"][index] = result
+        task["completed_order"].append(index)
+        task["processed_files"] += 1
+        processed = task["processed_files"]
+        total_files = task["total_files"]
+    
+    if processed < total_files:
+        # Update progress for the files finished so far
+        update_task_progress(task_id, f"processing_file_{processed + 1}_of_{total_files}", int((processed / total_files) * 80) + 15)  # 15-95% range
+    return processed == total_files
+
+def finish_batch(task_id: str):
+    task = TASKS[task_id]
+    try:
+        # Swapped under the lock, so a ?since=N poll never sees neither list
+        with BATCH_LOCK:
+            results = task.pop("results")
+            task["data"] = results  # Store all results in the task data
         
-        # Commit all database changes
-        db.commit()
+        if cancellation.is_cancelled(task_id):
+            # Files finished before the cancel keep their results
+            mark_cancelled(task_id, "running")
+            return
         
         # Set completed status
         task["status"] = TaskStatus.COMPLETED
-        task["data"] = results  # Store all results in the task data
+        TASKS_FINISHED.inc(status=TaskStatus.COMPLETED)
         update_task_progress(task_id, "completed", 100)
         
-        print(f"Successfully processed {len(results)} files in batch")
-        
+        logger.info(
+            f"Processed {len(results)} files in batch",
+            extra={"task_id": task_id, "stage": "completed", "duration_ms": round((time.perf_counter() - task["started_at"]) * 1000, 1)}
+        )
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Batch processing failed", extra={"task_id": task_id, "stage": task.get("stage")})
+        TASKS_FINISHED.inc(status=TaskStatus.FAILED)
         task["status"] = TaskStatus.FAILED
         task["error"] = str(e)
         update_task_progress(task_id, "failed", 0)
     finally:
         # Clean up all temporary files
         try:
-            for file_path in file_paths:
+            for file_path in task["file_paths"]:
                 if os.path.exists(file_path):
                     os.remove(file_path)
         except:
             pass
+        cancellation.discard(task_id)
 
-async def process_resume(task_id: str, db: Session):
-    """Async wrapper for the synchronous processing function"""
-    # Run the synchronous function in a thread pool to avoid blocking
-    import concurrent.futures
-    import threading
-    
-    def run_sync():
-        process_resume_sync(task_id, db)
-    
-    # Run in a separate thread
-    thread = threading.Thread(target=run_sync)
-    thread.start()
-
-async def process_multiple_resumes(task_id: str, db: Session):
-    """Async wrapper for the synchronous multiple processing function"""
-    import concurrent.futures
-    import threading
-    
-    def run_sync():
-        process_multiple_resumes_sync(task_id, db)
-    
-    # Run in a separate thread
-    thread = threading.Thread(target=run_sync)
-    thread.start()
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+def run_batch_file(task_id: str, index: int):
+    """Scheduler work item for one file; the last file to finish completes the batch"""
+    try:
+        result = process_batch_file_sync(task_id, index)
+    except Exception as e:
+        result = {'filename': TASKS[task_id]["file_info"][index]['filename'], 'error': str(e), 'processing_method': 'failed'}
+    if record_batch_file(task_id, index, result):
+        finish_batch(task_id)
 
+def process_multiple_resumes_sync(task_id: str, db: Session):
+    """Process the files of a batch one after another on the calling thread"""
+    start_batch(task_id)
+    for index in range(len(TASKS[task_id]["file_paths"])):
+        record_batch_file(task_id, index, process_batch_file_sync(task_id, index, db))
+    finish_batch(task_id)
 
+def process_reprocess_sync(task_id: str, db: Session):
+    """Re-parse the files of a reprocess task one after another, REPROCESS_INTERVAL_SECONDS apart"""
+    start_batch(task_id)
+    cancel_token = cancellation.token_for(task_id)
+    for index in range(len(TASKS[task_id]["file_paths"])):
+        if index:
+            try:
+                cancel_token.sleep(REPROCESS_INTERVAL_SECONDS)
+            except TaskCancelled:
+                pass  # the remaining files are recorded as cancelled
+        record_batch_file(task_id, index, process_batch_file_sync(task_id, index, db))
+    finish_batch(task_id)
 
+def run_task(process, task_id: str, db: Session):
+    """Run a processing function, under the profiler if the task asked for it"""
+    task = TASKS[task_id]
+    if not task.get("profile"):
+        process(task_id, db)
+        return
+    
+    with TaskProfiler() as profiler:
+        process(task_id, db)
+    task["profile_report"] = profiler.report()
+    logger.info("Captured task profile", extra={"task_id": task_id, "samples": profiler.samples})
 
+async def process_resume(task_id: str, db: Session):
+    """Queue a single upload in the scheduler's interactive lane"""
+    scheduler.submit(INTERACTIVE, TASKS[task_id]["user_id"], run_task, process_resume_sync, task_id, db, tag=task_id)
 
+async def process_multiple_resumes(task_id: str, db: Session):
+    """Queue each file of a batch as its own item in the scheduler's bulk lane"""
+    task = TASKS[task_id]
+    if task.get("profile"):
+        # The profiler samples a single thread, so profiled batches run their files in one item
+        scheduler.submit(BULK, task["user_id"], run_task, process_multiple_resumes_sync, task_id, db, tag=task_id)
+        return
+    
+    start_batch(task_id)
+    for index in range(task["total_files"]):
+        scheduler.submit(BULK, task["user_id"], run_batch_file, task_id, index, tag=(task_id, index))
 
+async def process_reprocess(task_id: str, db: Session):
+    """Queue a reprocess task as a single item in the scheduler's bulk lane, so it holds at most one slot"""
+    scheduler.submit(BULK, TASKS[task_id]["user_id"], run_task, process_reprocess_sync, task_id, db, tag=task_id)
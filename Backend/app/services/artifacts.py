@@ -0,0 +1,127 @@
+"""Per-task cache of the intermediate artifacts of each file: converted PDF, extracted text, page fingerprints, contacts, complexity.
+
+The reuse checks, the vision parse and the text fallback need the same
+artifacts. Each one is produced at most once per file, the first time it's
+asked for, even when several threads ask at once (a hedged parse). A failure is remembered too, so a DOCX that can't be converted isn't
+converted again by a later step. Converted PDFs are removed when the file's
+artifacts are released.
+"""
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from app.services.metrics import stage_timer
+
+_MISSING = object()
+
+
+class FileArtifacts:
+    def __init__(self, file_path: str, file_extension: str):
+        self.file_path = file_path
+        self.file_extension = file_extension
+        self.converted_pdf_path = None
+        self._values = {}
+        self._errors = {}
+        # One lock per artifact: a thread waits only for the artifact it asked for, and
+        # a producer may ask for another artifact (contacts need the text) without deadlock
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _get(self, name: str, produce: Callable):
+        with self._locks_lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name in self._errors:
+                raise self._errors[name]
+            value = self._values.get(name, _MISSING)
+            if value is _MISSING:
+                try:
+                    value = self._values[name] = produce()
+                except Exception as e:
+                    self._errors[name] = e
+                    raise
+            return value
+
+    def cached(self, name: str):
+        """An artifact produced earlier, or None; never produces one"""
+        return self._values.get(name)
+
+    def has_pdf(self) -> bool:
+        """True if a PDF is available without (another) conversion attempt"""
+        return self.file_extension == ".pdf" or "pdf" in self._values
+
+    def pdf_path(self) -> str:
+        """The file as a PDF, converting a DOC/DOCX the first time"""
+        if self.file_extension == ".pdf":
+            return self.file_path
+        return self._get("pdf", self._convert)
+
+    def _convert(self) -> str:
+        from app.services.resume_parser import convert_docx_to_pdf
+
+        with stage_timer("docx_conversion", "vision"):
+            self.converted_pdf_path = convert_docx_to_pdf(self.file_path)
+        return self.converted_pdf_path
+
+    def text(self) -> str:
+        """Text of the original file, extracted locally"""
+        return self._get("text", self._extract_text)
+
+    def _extract_text(self) -> str:
+        from app.services.resume_parser import extract_text_from_docx, extract_text_from_pdf
+
+        with stage_timer("text_extraction", "text"):
+            if self.file_extension == ".pdf":
+                return extract_text_from_pdf(self.file_path)
+            elif self.file_extension in [".doc", ".docx"]:
+                return extract_text_from_docx(self.file_path)
+            else:
+                raise Exception(f"Unsupported file type: {self.file_extension}")
+
+    def pages(self) -> list:
+        """Page fingerprints of the PDF (see page_index)"""
+        from app.services import page_index
+
+        return self._get("pages", lambda: page_index.fingerprint_pages(self.pdf_path()))
+
+    def contacts(self) -> dict:
+        """Contact fields found locally (see contact_extraction)"""
+        from app.services import contact_extraction
+
+        return self._get("contacts", lambda: contact_extraction.extract(self.file_path, self.file_extension, self.text()))
+
+    def complexity(self):
+        """Estimated complexity and the tier it routes to (see complexity)"""
+        from app.services import complexity
+
+        return self._get("complexity", lambda: complexity.estimate(self))
+
+    def cleanup(self):
+        path = self.converted_pdf_path
+        if path and path != self.file_path and os.path.exists(path):
+            os.remove(path)
+
+
+# (task_id, file_index) -> artifacts; single uploads use file index 0
+_files: Dict[Tuple[str, int], FileArtifacts] = {}
+_lock = threading.Lock()
+
+
+def for_file(task_id: str, file_index: int, file_path: str, file_extension: str) -> FileArtifacts:
+    with _lock:
+        artifacts = _files.get((task_id, file_index))
+        if artifacts is None:
+            artifacts = _files[(task_id, file_index)] = FileArtifacts(file_path, file_extension)
+        return artifacts
+
+
+def release(task_id: str, file_index: Optional[int] = None):
+    """Forget a file's artifacts (or every file's, without `file_index`) and remove converted PDFs"""
+    with _lock:
+        keys = [key for key in _files if key[0] == task_id and (file_index is None or key[1] == file_index)]
+        released = [_files.pop(key) for key in keys]
+    for artifacts in released:
+        try:
+            artifacts.cleanup()
+        except OSError:
+            pass
@@ -0,0 +1,169 @@
+"""Routing of Azure OpenAI requests across several deployments.
+
+Each request goes to the least-loaded healthy deployment: the one with the
+fewest requests in flight relative to its weight, then the fastest recently.
+Health is tracked passively from the requests themselves:
+- A 429 takes a deployment out of rotation for its Retry-After.
+- AZURE_EJECT_AFTER_FAILURES consecutive failures (timeouts, connection
+  errors, 5xx) take it out for AZURE_EJECT_SECONDS, doubled for each repeat.
+- Any success puts it back.
+If every deployment is out, the one due back first is still tried rather
+than failing outright.
+
+A request can ask for a tier ("small" or "large"). It goes to a deployment of
+that tier while one is left to try, and to any other deployment after that.
+"""
+import random
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from app.config import (
+    AZURE_EJECT_AFTER_FAILURES,
+    AZURE_EJECT_SECONDS,
+    AZURE_OPENAI_DEPLOYMENTS
+)
+from app.services.metrics import Counter, Gauge
+from utils.logger import get_logger
+
+logger = get_logger("azure_pool")
+
+DEPLOYMENT_IN_FLIGHT = Gauge("azure_deployment_in_flight", "Azure OpenAI requests in flight per deployment", ("deployment",))
+DEPLOYMENT_HEALTHY = Gauge("azure_deployment_healthy", "1 while a deployment is in rotation, 0 while it is ejected", ("deployment",))
+DEPLOYMENT_REQUESTS = Counter(
+    "azure_deployment_requests_total",
+    "Azure OpenAI requests per deployment by outcome (ok, throttled, failed, rejected, cancelled)",
+    ("deployment", "outcome"),
+)
+
+# Weight of the newest latency sample in the moving average
+_LATENCY_ALPHA = 0.2
+
+
+class Deployment:
+    def __init__(self, name: str, endpoint: str, key: str, weight: float = 1.0, region: Optional[str] = None,
+                 tier: str = "large"):
+        self.name = name
+        self.endpoint = endpoint
+        self.key = key
+        self.weight = weight
+        self.region = region
+        self.tier = tier
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejections = 0  # consecutive ejections, for the backoff
+        self.ejected_until = 0.0
+        self.latency = None  # moving average of successful request seconds
+
+    def healthy(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+
+class DeploymentPool:
+    def __init__(self, deployments: Iterable[dict], eject_after: int, eject_seconds: float):
+        self.deployments: List[Deployment] = [
+            Deployment(item["name"], item["endpoint"], item["key"], float(item.get("weight", 1.0)), item.get("region"),
+                       item.get("tier", "large"))
+            for item in deployments
+        ]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        for deployment in self.deployments:
+            DEPLOYMENT_IN_FLIGHT.set(0, deployment=deployment.name)
+            DEPLOYMENT_HEALTHY.set(1, deployment=deployment.name)
+
+    def acquire(self, exclude: Iterable[str] = (), tier: Optional[str] = None) -> Optional[Deployment]:
+        """Pick a deployment for one request and count it in flight; None if all are excluded"""
+        exclude = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            for deployment in self.deployments:
+                DEPLOYMENT_HEALTHY.set(1 if deployment.healthy(now) else 0, deployment=deployment.name)
+            candidates = [deployment for deployment in self.deployments if deployment.name not in exclude]
+            if not candidates:
+                return None
+            in_tier = [deployment for deployment in candidates if deployment.tier == tier]
+            if in_tier:
+                candidates = in_tier
+            healthy = [deployment for deployment in candidates if deployment.healthy(now)]
+            if healthy:
+                chosen = min(healthy, key=lambda deployment: (
+                    (deployment.in_flight + 1) / deployment.weight,
+                    deployment.latency if deployment.latency is not None else 0.0,
+                    random.random(),
+                ))
+            else:
+                # Everything is out of rotation: probe the one due back first
+                chosen = min(candidates, key=lambda deployment: deployment.ejected_until)
+            chosen.in_flight += 1
+            DEPLOYMENT_IN_FLIGHT.set(chosen.in_flight, deployment=chosen.name)
+            return chosen
+
+    def has_tier(self, tier: str) -> bool:
+        return any(deployment.tier == tier for deployment in self.deployments)
+
+    def has_alternative(self, exclude: Iterable[str]) -> bool:
+        exclude = set(exclude)
+        return any(deployment.name not in exclude for deployment in self.deployments)
+
+    def release(self, deployment: Deployment, outcome: str, seconds: Optional[float] = None,
+                retry_after: Optional[float] = None):
+        """Record how a request went.
+
+        `outcome` is one of:
+        - "ok": the request succeeded
+        - "throttled": a 429
+        - "failed": a timeout, connection error or 5xx
+        - "rejected": another 4xx, which says nothing about the deployment's health
+        - "cancelled"
+        """
+        now = time.monotonic()
+        with self._lock:
+            deployment.in_flight -= 1
+            DEPLOYMENT_IN_FLIGHT.set(deployment.in_flight, deployment=deployment.name)
+            DEPLOYMENT_REQUESTS.inc(deployment=deployment.name, outcome=outcome)
+
+            if outcome == "ok":
+                deployment.consecutive_failures = 0
+                deployment.ejections = 0
+                deployment.ejected_until = 0.0
+                if seconds is not None:
+                    deployment.latency = seconds if deployment.latency is None else (
+                        _LATENCY_ALPHA * seconds + (1 - _LATENCY_ALPHA) * deployment.latency
+                    )
+            elif outcome == "throttled":
+                self._eject(deployment, now, retry_after if retry_after else self.eject_seconds, "throttled")
+            elif outcome == "failed":
+                deployment.consecutive_failures += 1
+                if deployment.consecutive_failures >= self.eject_after:
+                    self._eject(deployment, now, self.eject_seconds * 2 ** min(deployment.ejections, 4), "failing")
+            DEPLOYMENT_HEALTHY.set(1 if deployment.healthy(now) else 0, deployment=deployment.name)
+
+    def _eject(self, deployment: Deployment, now: float, seconds: float, reason: str):
+        deployment.ejected_until = max(deployment.ejected_until, now + seconds)
+        deployment.ejections += 1
+        deployment.consecutive_failures = 0
+        logger.warning(
+            f"Taking deployment {deployment.name} out of rotation for {seconds:.0f}s",
+            extra={"deployment": deployment.name, "reason": reason},
+        )
+
+    def snapshot(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": deployment.name,
+                    "region": deployment.region,
+                    "tier": deployment.tier,
+                    "weight": deployment.weight,
+                    "in_flight": deployment.in_flight,
+                    "healthy": deployment.healthy(now),
+                    "latency_seconds": round(deployment.latency, 3) if deployment.latency is not None else None,
+                }
+                for deployment in self.deployments
+            ]
+
+
+pool = DeploymentPool(AZURE_OPENAI_DEPLOYMENTS, AZURE_EJECT_AFTER_FAILURES, AZURE_EJECT_SECONDS)
@@ -0,0 +1,127 @@
+"""Cooperative cancellation for tasks and for individual files of a batch.
+
+Processing code calls `token.check()` between steps (pages, stages, files).
+HTTP calls that pass the token to `http_client.shared_client()` are aborted as
+soon as the token is cancelled (see app/services/http_client.py).
+"""
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class TaskCancelled(BaseException):
+    """Raised at a cancellation point.
+
+    Derives from BaseException (like asyncio.CancelledError) so the pipeline's
+    `except Exception` fallbacks (vision -> text, per-file error results) don't
+    swallow it and carry on doing the work that was cancelled.
+    """
+
+
+class CancelToken:
+    def __init__(self, parent: Optional["CancelToken"] = None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        if parent is not None:
+            parent.on_cancel(self.cancel)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> bool:
+        """Cancel and run the registered callbacks; False if it was already cancelled"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+        return True
+
+    def check(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+    def sleep(self, seconds: float):
+        """time.sleep() that wakes up and raises TaskCancelled as soon as the token is cancelled"""
+        self._event.wait(seconds)
+        self.check()
+
+    def on_cancel(self, callback: Callable[[], None]):
+        """Run `callback` when the token is cancelled (immediately if it already is)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+def gather(calls: Dict[str, Callable[["CancelToken"], Any]], cancel_token: CancelToken) -> Dict[str, Any]:
+    """Run `calls` concurrently, each in its own thread with a child of `cancel_token`; returns their results by key.
+
+    The first failure cancels the other calls and is raised once they have all
+    stopped, so no request is left running. Cancelling `cancel_token` cancels all of them.
+    """
+    results = queue.Queue()
+    tokens = {key: CancelToken(parent=cancel_token) for key in calls}
+
+    def target(key: str):
+        try:
+            results.put((key, calls[key](tokens[key]), None))
+        except BaseException as e:  # TaskCancelled too: it is re-raised by the caller
+            results.put((key, None, e))
+
+    for key in calls:
+        threading.Thread(target=target, args=(key,), name=f"gather-{key}", daemon=True).start()
+
+    values, error = {}, None
+    for _ in calls:
+        key, value, failure = results.get()
+        if failure is None:
+            values[key] = value
+        elif error is None:
+            error = failure
+            for token in tokens.values():
+                token.cancel()
+    if error is not None:
+        cancel_token.check()
+        raise error
+    return values
+
+
+# task_id -> token, and (task_id, file_index) -> token for files of a batch
+_tokens: Dict[object, CancelToken] = {}
+_tokens_lock = threading.Lock()
+
+
+def token_for(task_id: str, file_index: Optional[int] = None) -> CancelToken:
+    """The token for a task or one of its files; file tokens are cancelled with their task"""
+    with _tokens_lock:
+        task_token = _tokens.get(task_id)
+        if task_token is None:
+            task_token = _tokens[task_id] = CancelToken()
+        if file_index is None:
+            return task_token
+        file_token = _tokens.get((task_id, file_index))
+        if file_token is None:
+            file_token = _tokens[(task_id, file_index)] = CancelToken(parent=task_token)
+        return file_token
+
+
+def is_cancelled(task_id: str, file_index: Optional[int] = None) -> bool:
+    with _tokens_lock:
+        token = _tokens.get(task_id if file_index is None else (task_id, file_index))
+    return token is not None and token.cancelled
+
+
+def discard(task_id: str):
+    """Forget the tokens of a finished task"""
+    with _tokens_lock:
+        for key in [key for key in _tokens if key == task_id or (isinstance(key, tuple) and key[0] == task_id)]:
+            del _tokens[key]
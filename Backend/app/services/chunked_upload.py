@@ -0,0 +1,196 @@
+"""Resumable chunked uploads: initiate a session, upload numbered parts, then assemble.
+
+Each session is a directory under UPLOAD_SESSION_DIR holding session.json and
+one file per part. A part is written to a temporary name and renamed into
+place, so an interrupted part upload never counts as received and the client
+can simply send it again.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Optional, Tuple
+
+from app.config import UPLOAD_MAX_BYTES, UPLOAD_PART_MAX_BYTES, UPLOAD_SESSION_DIR, UPLOAD_SESSION_TTL_SECONDS
+
+SESSION_FILE = "session.json"
+
+# Serializes completion so two concurrent /complete calls can't both assemble
+_complete_lock = threading.Lock()
+
+
+class UploadSessionNotFound(LookupError):
+    pass
+
+
+def _session_dir(upload_id: str) -> str:
+    # upload ids are server-generated hex; reject anything that could escape the directory
+    if not upload_id.isalnum():
+        raise UploadSessionNotFound(upload_id)
+    return os.path.join(UPLOAD_SESSION_DIR, upload_id)
+
+
+def _part_path(upload_id: str, part_number: int) -> str:
+    return os.path.join(_session_dir(upload_id), f"part-{part_number:05d}")
+
+
+def _write_session(session: dict):
+    path = os.path.join(_session_dir(session["upload_id"]), SESSION_FILE)
+    with open(path + ".tmp", "w") as handle:
+        json.dump(session, handle)
+    os.replace(path + ".tmp", path)
+
+
+def _received_parts(upload_id: str) -> dict:
+    directory = _session_dir(upload_id)
+    parts = {}
+    for name in os.listdir(directory):
+        if name.startswith("part-") and not name.endswith(".tmp"):
+            parts[int(name[5:])] = os.path.getsize(os.path.join(directory, name))
+    return dict(sorted(parts.items()))
+
+
+def create_session(user_id: str, filename: str, file_extension: str, total_size: int,
+                   sha256: Optional[str] = None, options: Optional[dict] = None) -> dict:
+    if total_size <= 0 or total_size > UPLOAD_MAX_BYTES:
+        raise ValueError(f"total_size must be between 1 and {UPLOAD_MAX_BYTES} bytes")
+
+    purge_expired()
+    upload_id = uuid.uuid4().hex
+    os.makedirs(_session_dir(upload_id), exist_ok=True)
+    session = {
+        "upload_id": upload_id,
+        "user_id": user_id,
+        "filename": filename,
+        "file_extension": file_extension,
+        "total_size": total_size,
+        "sha256": sha256.lower() if sha256 else None,
+        "options": options or {},
+        "task_id": None,
+        "created_at": time.time(),
+    }
+    _write_session(session)
+    return session
+
+
+def get_session(upload_id: str, user_id: str) -> dict:
+    """Session metadata plus the parts received so far; raises UploadSessionNotFound"""
+    path = os.path.join(_session_dir(upload_id), SESSION_FILE)
+    try:
+        with open(path) as handle:
+            session = json.load(handle)
+    except (FileNotFoundError, json.JSONDecodeError):
+        raise UploadSessionNotFound(upload_id)
+    if session["user_id"] != user_id:
+        raise UploadSessionNotFound(upload_id)
+
+    parts = _received_parts(upload_id)
+    session["parts"] = parts
+    session["received_bytes"] = sum(parts.values())
+    return session
+
+
+async def write_part(upload_id: str, user_id: str, part_number: int, chunks: AsyncIterator[bytes]) -> dict:
+    """Stream one part to disk; re-sending a part number replaces the earlier copy"""
+    session = get_session(upload_id, user_id)
+    if session["task_id"]:
+        raise ValueError("Upload is already complete")
+    if part_number < 1:
+        raise ValueError("Part numbers start at 1")
+
+    final_path = _part_path(upload_id, part_number)
+    temp_path = final_path + ".tmp"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as handle:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > UPLOAD_PART_MAX_BYTES:
+                    raise ValueError(f"Parts may be at most {UPLOAD_PART_MAX_BYTES} bytes")
+                digest.update(chunk)
+                handle.write(chunk)
+        if size == 0:
+            raise ValueError("Part is empty")
+
+        other_parts = sum(part_size for number, part_size in session["parts"].items() if number != part_number)
+        if other_parts + size > session["total_size"]:
+            raise ValueError("Parts exceed the declared total_size")
+        os.replace(temp_path, final_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return {"part_number": part_number, "size": size, "sha256": digest.hexdigest()}
+
+
+def complete(upload_id: str, user_id: str, start_task) -> Tuple[str, bool]:
+    """Assemble the parts into one temp file and hand it to `start_task(session, path, size)`.
+
+    Returns (task_id, created). Completing an upload twice returns the task
+    created the first time instead of starting another one.
+    """
+    with _complete_lock:
+        session = get_session(upload_id, user_id)
+        if session["task_id"]:
+            return session["task_id"], False
+
+        parts = session["parts"]
+        if list(parts) != list(range(1, len(parts) + 1)):
+            raise ValueError(f"Missing parts; received {list(parts)}")
+        if session["received_bytes"] != session["total_size"]:
+            raise ValueError(f"Received {session['received_bytes']} of {session['total_size']} bytes")
+
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=session["file_extension"]) as assembled:
+            for part_number in parts:
+                with open(_part_path(upload_id, part_number), "rb") as part:
+                    while True:
+                        block = part.read(1024 * 1024)
+                        if not block:
+                            break
+                        digest.update(block)
+                        assembled.write(block)
+            assembled_path = assembled.name
+
+        if session["sha256"] and digest.hexdigest() != session["sha256"]:
+            os.remove(assembled_path)
+            raise ValueError("Checksum of the assembled file does not match sha256")
+
+        try:
+            task_id = start_task(session, assembled_path, session["total_size"])
+        except Exception:
+            os.remove(assembled_path)
+            raise
+
+        # Keep only the metadata, so a retried /complete finds the task
+        for part_number in parts:
+            os.remove(_part_path(upload_id, part_number))
+        session.pop("parts")
+        session.pop("received_bytes")
+        session["task_id"] = task_id
+        _write_session(session)
+        return task_id, True
+
+
+def abort(upload_id: str, user_id: str):
+    get_session(upload_id, user_id)
+    shutil.rmtree(_session_dir(upload_id), ignore_errors=True)
+
+
+def purge_expired():
+    """Remove sessions older than UPLOAD_SESSION_TTL_SECONDS"""
+    if not os.path.isdir(UPLOAD_SESSION_DIR):
+        return
+    cutoff = time.time() - UPLOAD_SESSION_TTL_SECONDS
+    for name in os.listdir(UPLOAD_SESSION_DIR):
+        directory = os.path.join(UPLOAD_SESSION_DIR, name)
+        try:
+            if os.path.getmtime(directory) < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+        except OSError:
+            pass
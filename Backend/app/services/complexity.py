@@ -0,0 +1,70 @@
+"""Document complexity estimate, used to send simple resumes to a cheaper deployment tier.
+
+A resume is simple when its page count, extracted text length and table
+count are all within SIMPLE_MAX_PAGES, SIMPLE_MAX_TEXT_CHARS and
+SIMPLE_MAX_TABLES. Simple resumes go to the "small" tier with its smaller
+output budget, everything else to "large". Only local artifacts are used, and
+the tables are only looked for on documents that are still simple after the
+cheaper checks.
+"""
+import math
+from typing import NamedTuple
+
+from app.config import SIMPLE_MAX_PAGES, SIMPLE_MAX_TABLES, SIMPLE_MAX_TEXT_CHARS
+
+# Page count assumed for a DOC/DOCX that hasn't been converted to PDF
+_CHARS_PER_PAGE = 3000
+
+
+class Complexity(NamedTuple):
+    pages: int
+    text_chars: int
+    tables: int  # counting stops once over SIMPLE_MAX_TABLES; -1 if not counted
+    tier: str
+
+
+def _pdf_pages(pdf_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as document:
+        return document.page_count
+
+
+def _pdf_tables(pdf_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    tables = 0
+    with fitz.open(pdf_path) as document:
+        for page in document:
+            tables += len(page.find_tables().tables)
+            if tables > SIMPLE_MAX_TABLES:
+                break
+    return tables
+
+
+def _docx_tables(docx_path: str) -> int:
+    from docx import Document
+
+    return len(Document(docx_path).tables)
+
+
+def estimate(files) -> Complexity:
+    """Complexity of a file from its FileArtifacts (text, and the PDF if there is one)"""
+    try:
+        text_chars = len(files.text())
+    except Exception:
+        text_chars = 0  # no usable text layer; the page count still applies
+
+    if files.has_pdf():
+        pages = _pdf_pages(files.pdf_path())
+    else:
+        pages = max(1, math.ceil(text_chars / _CHARS_PER_PAGE))
+
+    if pages > SIMPLE_MAX_PAGES or text_chars > SIMPLE_MAX_TEXT_CHARS:
+        return Complexity(pages, text_chars, -1, "large")
+
+    if files.file_extension in (".doc", ".docx"):
+        tables = _docx_tables(files.file_path)
+    else:
+        tables = _pdf_tables(files.pdf_path())
+    return Complexity(pages, text_chars, tables, "small" if tables <= SIMPLE_MAX_TABLES else "large")
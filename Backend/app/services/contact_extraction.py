@@ -0,0 +1,133 @@
+"""Local extraction of the contact fields: email, mobile and links.
+
+Hyperlinks are read from the document itself: PDF link annotations through
+PyMuPDF, and DOCX hyperlink relationships through python-docx. mailto: and
+tel: targets give the email and phone number. The extracted text is then
+searched for whatever isn't hyperlinked. A field found here is exact, so
+it's left out of the Azure prompt and filled in after the parse. Fields that
+aren't found are still left to the model.
+"""
+import re
+from typing import List, Optional
+from urllib.parse import unquote, urlsplit
+
+_EMAIL = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+# A run of digits with the usual separators; kept only if it has 10-15 digits,
+# which leaves out dates and year ranges
+_PHONE = re.compile(r"(?<![\w/])\+?\(?\d[\d \t().-]{7,}\d(?![\w/])")
+# Where a run of digits can be split into separate numbers ("555-123-4567 2019 - 2021")
+_NUMBER_BREAK = re.compile(r"\s{2,}|\t|\s-\s|(?<=\d)\s(?=(?:19|20)\d\d\b)|(?<=\b(?:19|20)\d\d)\s(?=\d)")
+_URL = re.compile(
+    r"(?:https?://|www\.)[^\s<>()\"'|,]+"
+    r"|\b(?:github\.com|gitlab\.com|bitbucket\.org|(?:[a-z]{2,3}\.)?linkedin\.com)/[^\s<>()\"'|,]+",
+    re.IGNORECASE,
+)
+_TRAILING = ".,;:!?)]}'\""
+
+_LINK_TYPES = (
+    ("github.com", "GitHub"),
+    ("linkedin.com", "LinkedIn"),
+    ("gitlab.com", "GitLab"),
+    ("bitbucket.org", "Bitbucket"),
+    ("stackoverflow.com", "Stack Overflow"),
+    ("medium.com", "Medium"),
+    ("behance.net", "Behance"),
+    ("dribbble.com", "Dribbble"),
+    ("kaggle.com", "Kaggle"),
+)
+
+
+def _pdf_uris(pdf_path: str) -> List[str]:
+    import fitz  # PyMuPDF
+
+    uris = []
+    with fitz.open(pdf_path) as document:
+        for page in document:
+            uris.extend(link["uri"] for link in page.get_links() if link.get("uri"))
+    return uris
+
+
+def _docx_uris(docx_path: str) -> List[str]:
+    from docx import Document
+    from docx.opc.constants import RELATIONSHIP_TYPE
+
+    document = Document(docx_path)
+    parts = [document.part] + [section.header.part for section in document.sections] + [section.footer.part for section in document.sections]
+    uris = []
+    for part in parts:
+        uris.extend(rel.target_ref for rel in part.rels.values() if rel.reltype == RELATIONSHIP_TYPE.HYPERLINK)
+    return uris
+
+
+def _phone(candidate: str) -> Optional[str]:
+    digits = re.sub(r"\D", "", candidate)
+    if not 10 <= len(digits) <= 15:
+        return None
+    if all(len(group) == 4 and group[:2] in ("19", "20") for group in re.findall(r"\d+", candidate)):
+        return None  # a list of years
+    return " ".join(candidate.split())
+
+
+def _normalize_url(url: str) -> Optional[str]:
+    url = url.strip().rstrip(_TRAILING)
+    if not url.lower().startswith(("http://", "https://")):
+        url = "https://" + url
+    parts = urlsplit(url)
+    if "." not in parts.netloc:
+        return None
+    return url
+
+
+def _link_type(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    for domain, link_type in _LINK_TYPES:
+        if host == domain or host.endswith("." + domain):
+            return link_type
+    return "Website"
+
+
+def extract(file_path: str, file_extension: str, text: str) -> dict:
+    """The contact fields found in a file: any of "email", "mobile" and "links" (in the parse's format)"""
+    if file_extension == ".pdf":
+        uris = _pdf_uris(file_path)
+    elif file_extension == ".docx":
+        uris = _docx_uris(file_path)
+    else:
+        uris = []
+
+    emails, phones, urls = [], [], []
+    for uri in uris:
+        scheme = uri.split(":", 1)[0].lower()
+        if scheme == "mailto":
+            emails.append(unquote(uri[len("mailto:"):].split("?", 1)[0]).strip())
+        elif scheme == "tel":
+            phones.append(unquote(uri[len("tel:"):]).strip())
+        elif scheme in ("http", "https"):
+            urls.append(uri)
+
+    emails.extend(_EMAIL.findall(text))
+    phones.extend(match.group(0) for match in _PHONE.finditer(text))
+    # Emails can look like bare domains with a path; don't report them as links
+    urls.extend(match.group(0) for match in _URL.finditer(_EMAIL.sub(" ", text)))
+
+    fields = {}
+    if emails:
+        fields["email"] = emails[0]
+    for candidate in phones:
+        phone = _phone(candidate) or next(filter(None, map(_phone, _NUMBER_BREAK.split(candidate))), None)
+        if phone:
+            fields["mobile"] = phone
+            break
+
+    links, seen = [], set()
+    for url in urls:
+        url = _normalize_url(url)
+        if url is None:
+            continue
+        key = re.sub(r"^www\.", "", url.lower().split("://", 1)[1]).rstrip("/")
+        if key not in seen:
+            seen.add(key)
+            links.append({"type": _link_type(url), "url": url})
+    if links:
+        fields["links"] = links
+    return fields
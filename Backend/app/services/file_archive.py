@@ -0,0 +1,133 @@
+"""Content-addressed archive of uploaded originals.
+
+A file is stored once under ARCHIVE_DIR/<ab>/<cd>/<sha256><extension>, however
+many times it is uploaded, and resume_history rows refer to it by sha256. Each
+upload of a file already in the archive refreshes its mtime. purge() uses the
+mtime as "last seen" for the retention limits, and store() runs it at most
+once every PURGE_INTERVAL_SECONDS.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from app.config import ARCHIVE_DIR, ARCHIVE_MAX_BYTES, ARCHIVE_RETENTION_DAYS
+from utils.logger import get_logger
+
+logger = get_logger("file_archive")
+
+PURGE_INTERVAL_SECONDS = 3600
+
+_purge_lock = threading.Lock()
+_last_purge = 0.0
+
+
+def _path(sha256: str, file_extension: str) -> str:
+    # Both parts are ours (a hex digest and an allowed extension), but refuse anything
+    # that could leave the archive directory
+    if not sha256.isalnum() or not file_extension[1:].isalnum():
+        raise ValueError(f"Invalid archive key: {sha256}{file_extension}")
+    return os.path.join(ARCHIVE_DIR, sha256[:2], sha256[2:4], sha256 + file_extension)
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store(file_path: str, file_extension: str) -> str:
+    """Keep a copy of an uploaded file (if there isn't one yet); returns its sha256"""
+    sha256 = file_sha256(file_path)
+    path = _path(sha256, file_extension)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Copied under a temporary name and renamed, so a reader never sees a partial file
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(handle)
+        try:
+            shutil.copyfile(file_path, temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    _maybe_purge()
+    return sha256
+
+
+def checkout(sha256: str, file_extension: str) -> Optional[str]:
+    """A temporary copy of an archived file, which the caller removes; None if it isn't archived.
+
+    Hard-linked where the file system allows it, so no data is copied, and
+    removing the temporary path leaves the archive untouched.
+    """
+    path = _path(sha256, file_extension)
+    if not os.path.exists(path):
+        return None
+    handle, temp_path = tempfile.mkstemp(suffix=file_extension)
+    os.close(handle)
+    os.remove(temp_path)
+    try:
+        os.link(path, temp_path)
+    except OSError:
+        shutil.copyfile(path, temp_path)
+    return temp_path
+
+
+def remove(sha256: str, file_extension: str):
+    path = _path(sha256, file_extension)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _maybe_purge():
+    global _last_purge
+    if time.time() - _last_purge < PURGE_INTERVAL_SECONDS or not _purge_lock.acquire(blocking=False):
+        return
+    try:
+        _last_purge = time.time()
+        purge()
+    except Exception as e:
+        logger.warning(f"Archive purge failed: {str(e)}")
+    finally:
+        _purge_lock.release()
+
+
+def purge() -> int:
+    """Apply ARCHIVE_RETENTION_DAYS and ARCHIVE_MAX_BYTES; returns how many files were removed"""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return 0
+    files = []
+    for directory, _, names in os.walk(ARCHIVE_DIR):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+
+    cutoff = time.time() - ARCHIVE_RETENTION_DAYS * 86400 if ARCHIVE_RETENTION_DAYS else None
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in files:
+        expired = cutoff is not None and mtime < cutoff
+        if not expired and not (ARCHIVE_MAX_BYTES and total > ARCHIVE_MAX_BYTES):
+            break  # oldest first, so everything after this is kept too
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        logger.info(f"Removed {removed} files from the archive")
+    return removed
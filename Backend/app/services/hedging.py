@@ -0,0 +1,69 @@
+"""Hedged calls: start a backup when the primary is slower than usual and keep whichever succeeds first.
+
+Both calls run in their own thread with their own CancelToken, a child of the
+caller's. The one that loses is cancelled, which aborts its HTTP request in
+flight, and cancelling the caller's token cancels both.
+"""
+import queue
+import threading
+from typing import Any, Callable, Tuple
+
+from app.services.cancellation import CancelToken
+from app.services.metrics import HEDGES, Histogram
+
+
+def deadline(histogram: Histogram, quantile: float, min_samples: int, default: float, **labels) -> float:
+    """The `quantile` of a duration histogram, or `default` while it has fewer than `min_samples` observations"""
+    if histogram.count(**labels) < min_samples:
+        return default
+    return histogram.quantile(quantile, **labels) or default
+
+
+def run(primary: Callable[[CancelToken], Any], backup: Callable[[CancelToken], Any], delay: float,
+        cancel_token: CancelToken) -> Tuple[Any, str]:
+    """Run `primary(token)`, and `backup(token)` too if the primary takes longer than `delay` seconds.
+
+    Returns (result, "primary" or "backup"). A primary that fails before the
+    deadline raises its error without starting the backup. Once both are running,
+    the first success wins; if both fail, the primary's error is raised.
+    """
+    results = queue.Queue()
+    tokens = {}
+
+    def start(label: str, call: Callable[[CancelToken], Any]):
+        token = tokens[label] = CancelToken(parent=cancel_token)
+
+        def target():
+            try:
+                results.put((label, call(token), None))
+            except BaseException as e:  # TaskCancelled too: the waiting caller re-raises it
+                results.put((label, None, e))
+
+        threading.Thread(target=target, name=f"hedge-{label}", daemon=True).start()
+
+    start("primary", primary)
+    try:
+        label, value, error = results.get(timeout=delay)
+        if error is not None:
+            raise error
+        HEDGES.inc(outcome="in_time")
+        return value, label
+    except queue.Empty:
+        pass
+
+    cancel_token.check()
+    start("backup", backup)
+    errors = {}
+    while len(errors) < len(tokens):
+        label, value, error = results.get()
+        if error is None:
+            for other, token in tokens.items():
+                if other != label:
+                    token.cancel()
+            HEDGES.inc(outcome=label)
+            return value, label
+        errors[label] = error
+
+    cancel_token.check()
+    HEDGES.inc(outcome="failed")
+    raise errors["primary"]
@@ -0,0 +1,189 @@
+"""HTTP client for the Azure OpenAI calls.
+
+httpx/httpcore are only imported by this module, which the parser loads on its
+first Azure call (or the warm-up does at startup), so importing the app
+doesn't pay for them. Every call goes through one pooled client, so its TLS
+context is built once and connections are kept alive between requests.
+
+A request can carry a CancelToken (`extensions={"cancel_token": token}`). The
+sockets it uses, whether newly opened or taken from the pool, are shut down as
+soon as the token is cancelled. That wakes up the blocked read at once, rather
+than waiting for Azure to answer. Once the request is done the token no longer
+affects them, so a kept-alive connection can serve the next request safely.
+"""
+import socket
+import ssl
+import threading
+from typing import Optional
+
+import httpcore
+import httpx
+
+from app.services.cancellation import CancelToken
+
+_ssl_context = None
+_shared_client = None
+_lock = threading.Lock()
+
+# The request being sent on this thread; httpcore does all of a request's I/O on the caller's thread
+_current = threading.local()
+
+
+def ssl_context() -> ssl.SSLContext:
+    """The TLS context for Azure calls; loading the CA bundle is the slow part, so it's done once"""
+    global _ssl_context
+    with _lock:
+        if _ssl_context is None:
+            _ssl_context = httpx.create_ssl_context()
+        return _ssl_context
+
+
+def shared_client() -> httpx.Client:
+    """The process-wide pooled client; pass a token in `extensions` to make a request cancellable"""
+    global _shared_client
+    context = ssl_context()
+    with _lock:
+        if _shared_client is None:
+            _shared_client = httpx.Client(transport=_CancellableTransport(context))
+        return _shared_client
+
+
+class _InFlight:
+    """The sockets one cancellable request has used, shut down if its token is cancelled before it finishes"""
+
+    def __init__(self, token: CancelToken):
+        self._token = token
+        self._lock = threading.Lock()
+        self._sockets = set()
+        self._done = False
+        token.on_cancel(self.abort)
+
+    def watch(self, sock: socket.socket):
+        with self._lock:
+            if self._done or sock in self._sockets:
+                return
+            self._sockets.add(sock)
+        if self._token.cancelled:
+            self.abort()  # cancelled before this socket was watched
+
+    def abort(self):
+        with self._lock:
+            if self._done:
+                return
+            sockets = list(self._sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def finish(self):
+        with self._lock:
+            self._done = True
+
+
+class _WatchedStream(httpcore.NetworkStream):
+    """A pooled connection's stream; each read or write registers its socket with the current request"""
+
+    def __init__(self, stream: httpcore.NetworkStream, sock: socket.socket):
+        self._stream = stream
+        self._socket = sock
+
+    def _watch(self):
+        request = getattr(_current, "request", None)
+        if request is not None:
+            request.watch(self._socket)
+
+    def read(self, max_bytes, timeout=None):
+        self._watch()
+        return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer, timeout=None):
+        self._watch()
+        self._stream.write(buffer, timeout)
+
+    def close(self):
+        self._stream.close()
+
+    def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        self._watch()
+        # Shutting down the TCP socket also breaks the TLS stream on top of it
+        return _WatchedStream(self._stream.start_tls(ssl_context, server_hostname, timeout), self._socket)
+
+    def get_extra_info(self, info):
+        return self._stream.get_extra_info(info)
+
+
+class _WatchedBackend(httpcore.NetworkBackend):
+    def __init__(self):
+        self._backend = httpcore.SyncBackend()
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        stream = self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        stream = _WatchedStream(stream, stream.get_extra_info("socket"))
+        stream._watch()
+        return stream
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+
+class _CancellableTransport(httpx.BaseTransport):
+    def __init__(self, context: ssl.SSLContext):
+        # httpx's own defaults; httpcore's are lower (10 connections)
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=context,
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=5.0,
+            network_backend=_WatchedBackend(),
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        extensions = dict(request.extensions)
+        token: Optional[CancelToken] = extensions.pop("cancel_token", None)
+        in_flight = None
+        if token is not None:
+            token.check()
+            in_flight = _current.request = _InFlight(token)
+        try:
+            return self._send(request, extensions)
+        except httpcore.TimeoutException as e:
+            raise httpx.TimeoutException(str(e), request=request) from e
+        except (httpcore.NetworkError, httpcore.ProtocolError) as e:
+            raise httpx.TransportError(str(e), request=request) from e
+        finally:
+            if in_flight is not None:
+                in_flight.finish()
+                _current.request = None
+
+    def _send(self, request: httpx.Request, extensions: dict) -> httpx.Response:
+        response = self._pool.handle_request(httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=extensions,
+        ))
+        # Read inside handle_request, so the whole body is received while the token applies
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            content=content,
+            extensions=response.extensions,
+        )
+
+    def close(self):
+        self._pool.close()
@@ -0,0 +1,53 @@
+"""Idempotency-Key bookkeeping for upload endpoints.
+
+Keys are scoped per user and kept in memory for IDEMPOTENCY_TTL_SECONDS, like
+TASKS, so they only deduplicate requests that reach the same API process.
+"""
+import threading
+import time
+from typing import Optional
+
+from app.config import IDEMPOTENCY_TTL_SECONDS
+
+_lock = threading.Lock()
+_records = {}
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+def reserve(user_id: str, key: str, fingerprint: str) -> Optional[dict]:
+    """Claim `key` for a new request, or return the response recorded for it.
+
+    Returns None when the caller should go ahead and process the request.
+    Raises IdempotencyConflict if the key was used for a different request or
+    the original request is still being processed.
+    """
+    now = time.time()
+    with _lock:
+        for expired in [k for k, record in _records.items() if record["expires_at"] < now]:
+            del _records[expired]
+
+        record = _records.get((user_id, key))
+        if record is None:
+            _records[(user_id, key)] = {"fingerprint": fingerprint, "response": None, "expires_at": now + IDEMPOTENCY_TTL_SECONDS}
+            return None
+        if record["fingerprint"] != fingerprint:
+            raise IdempotencyConflict("Idempotency-Key was already used for a different upload")
+        if record["response"] is None:
+            raise IdempotencyConflict("A request with this Idempotency-Key is still being processed")
+        return record["response"]
+
+
+def store(user_id: str, key: str, response: dict):
+    with _lock:
+        record = _records.get((user_id, key))
+        if record is not None:
+            record["response"] = response
+
+
+def release(user_id: str, key: str):
+    """Forget a key whose request failed, so the client can retry with it"""
+    with _lock:
+        _records.pop((user_id, key), None)
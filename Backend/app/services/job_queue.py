@@ -0,0 +1,271 @@
+"""Durable job queue shared by the API (enqueue/status) and worker processes (claim/run).
+
+Jobs live in a SQL table (SQLite by default, see JOB_QUEUE_URL). A worker
+claims a job by taking a time-limited lease and keeps it alive with
+heartbeats; if a worker dies, the lease expires and another worker re-claims
+the job, up to JOB_MAX_ATTEMPTS times.
+"""
+import json
+import time
+import uuid
+from typing import Optional, Tuple
+
+from sqlalchemy import Column, Float, Integer, JSON, String, Text, create_engine, event, inspect, text
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.config import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_QUEUE_URL
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+_is_sqlite = JOB_QUEUE_URL.startswith("sqlite")
+queue_engine = create_engine(
+    JOB_QUEUE_URL,
+    connect_args={"check_same_thread": False, "timeout": 30} if _is_sqlite else {},
+)
+
+if _is_sqlite:
+    @event.listens_for(queue_engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # WAL lets the API read job status while workers write heartbeats
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+QueueSession = sessionmaker(autocommit=False, autoflush=False, bind=queue_engine)
+QueueBase = declarative_base()
+
+
+class Job(QueueBase):
+    __tablename__ = "jobs"
+
+    id = Column(String(64), primary_key=True)  # same as the task_id handed to clients
+    kind = Column(String(20), nullable=False)  # "single" or "batch"
+    lane = Column(String(20), nullable=False, default="interactive")  # "interactive" jobs are claimed first
+    user_id = Column(String(100), nullable=True, index=True)
+    status = Column(String(20), nullable=False, default=JobStatus.QUEUED, index=True)
+    payload = Column(JSON, nullable=False)  # the task dict the worker rebuilds TASKS from
+    stage = Column(String(100), default="upload")
+    progress = Column(Integer, default=10)
+    processed_files = Column(Integer, nullable=True)
+    result = Column(JSON, nullable=True)  # {"data": ..., "profile_report": ...}, or partial batch results while running
+    error = Column(Text, nullable=True)
+    worker_id = Column(String(100), nullable=True)
+    lease_token = Column(String(64), nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+    attempts = Column(Integer, default=0)
+    cancel_requested = Column(Integer, nullable=False, default=0)  # set while running; the worker aborts the job
+    cancelled_files = Column(JSON, nullable=True)  # indexes of batch files to skip or abort
+    created_at = Column(Float, nullable=False, index=True)
+    updated_at = Column(Float, nullable=False)
+
+
+# Columns added after the jobs table was first released
+_ADDED_COLUMNS = {
+    "lane": "VARCHAR(20) NOT NULL DEFAULT 'interactive'",
+    "user_id": "VARCHAR(100)",
+    "cancel_requested": "INTEGER NOT NULL DEFAULT 0",
+    "cancelled_files": "JSON",
+}
+
+
+def init_queue():
+    QueueBase.metadata.create_all(bind=queue_engine)
+    
+    # Tables created by an older version of this module
+    columns = {column["name"] for column in inspect(queue_engine).get_columns("jobs")}
+    with queue_engine.begin() as connection:
+        for name, definition in _ADDED_COLUMNS.items():
+            if name not in columns:
+                connection.execute(text(f"ALTER TABLE jobs ADD COLUMN {name} {definition}"))
+
+
+def enqueue(task_id: str, kind: str, payload: dict, lane: str = "interactive"):
+    now = time.time()
+    with QueueSession() as session:
+        session.add(Job(
+            id=task_id,
+            kind=kind,
+            lane=lane,
+            user_id=payload.get("user_id"),
+            status=JobStatus.QUEUED,
+            payload=payload,
+            stage=payload.get("stage", "upload"),
+            progress=payload.get("progress", 10),
+            processed_files=payload.get("processed_files"),
+            created_at=now,
+            updated_at=now,
+        ))
+        session.commit()
+
+
+def claim(worker_id: str, lease_seconds: int = JOB_LEASE_SECONDS) -> Optional[dict]:
+    """Atomically lease the next runnable job; returns it as a dict or None.
+
+    Runnable means queued, or running with an expired lease (its worker died).
+    Interactive jobs go before bulk ones; within a lane the user with the fewest
+    running jobs goes first, then the oldest job. The single
+    UPDATE ... WHERE id = (SELECT ...) is atomic, so two workers can never
+    claim the same job.
+    """
+    now = time.time()
+    token = uuid.uuid4().hex
+    with queue_engine.begin() as connection:
+        # Jobs whose worker died too many times are given up on
+        connection.execute(text(
+            "UPDATE jobs SET status = :failed, error = :error, updated_at = :now "
+            "WHERE status = :running AND lease_expires_at < :now AND attempts >= :max_attempts"
+        ), {
+            "failed": JobStatus.FAILED, "running": JobStatus.RUNNING, "now": now,
+            "max_attempts": JOB_MAX_ATTEMPTS, "error": "Job lease expired too many times",
+        })
+        claimed = connection.execute(text(
+            "UPDATE jobs SET status = :running, worker_id = :worker_id, lease_token = :token, "
+            "lease_expires_at = :expires, attempts = attempts + 1, updated_at = :now "
+            "WHERE id = (SELECT id FROM jobs AS candidate "
+            "WHERE status = :queued OR (status = :running AND lease_expires_at < :now) "
+            "ORDER BY CASE WHEN lane = 'interactive' THEN 0 ELSE 1 END, "
+            "(SELECT COUNT(*) FROM jobs AS active WHERE active.status = :running "
+            "AND active.user_id = candidate.user_id AND active.lease_expires_at >= :now), "
+            "created_at LIMIT 1)"
+        ), {
+            "running": JobStatus.RUNNING, "queued": JobStatus.QUEUED, "worker_id": worker_id,
+            "token": token, "expires": now + lease_seconds, "now": now,
+        })
+        if claimed.rowcount == 0:
+            return None
+
+    with QueueSession() as session:
+        job = session.query(Job).filter(Job.lease_token == token).first()
+        return _to_dict(job) if job else None
+
+
+def heartbeat(task_id: str, lease_token: str, stage: str, progress: int,
+              processed_files: Optional[int] = None, lease_seconds: int = JOB_LEASE_SECONDS) -> bool:
+    """Extend the lease and publish progress; False means the lease was lost"""
+    now = time.time()
+    with queue_engine.begin() as connection:
+        updated = connection.execute(text(
+            "UPDATE jobs SET stage = :stage, progress = :progress, processed_files = :processed_files, "
+            "lease_expires_at = :expires, updated_at = :now "
+            "WHERE id = :id AND lease_token = :token AND status = :running"
+        ), {
+            "stage": stage, "progress": progress, "processed_files": processed_files,
+            "expires": now + lease_seconds, "now": now, "id": task_id, "token": lease_token,
+            "running": JobStatus.RUNNING,
+        })
+        return updated.rowcount == 1
+
+
+def publish_results(task_id: str, lease_token: str, result: dict) -> bool:
+    """Store partial results of a running job (batch files finished so far)"""
+    with QueueSession() as session:
+        job = session.query(Job).filter(
+            Job.id == task_id, Job.lease_token == lease_token, Job.status == JobStatus.RUNNING
+        ).first()
+        if job is None:
+            return False
+        job.result = result
+        job.updated_at = time.time()
+        session.commit()
+        return True
+
+
+def finish(task_id: str, lease_token: str, status: str, stage: str, progress: int,
+           processed_files: Optional[int] = None, result: Optional[dict] = None, error: Optional[str] = None) -> bool:
+    """Record the final state of a job this worker still holds the lease for"""
+    with QueueSession() as session:
+        job = session.query(Job).filter(Job.id == task_id, Job.lease_token == lease_token).first()
+        if job is None:
+            return False
+        job.status = status
+        job.stage = stage
+        job.progress = progress
+        job.processed_files = processed_files
+        job.result = result
+        job.error = error
+        job.lease_expires_at = None
+        job.updated_at = time.time()
+        session.commit()
+        return True
+
+
+def request_cancel(task_id: str, file_index: Optional[int] = None) -> Optional[str]:
+    """Cancel a job, or one file of a batch job; returns the job's status afterwards.
+
+    A job that is still queued is cancelled outright. For a running job the
+    request is recorded and the worker holding it aborts the work.
+    """
+    now = time.time()
+    with queue_engine.begin() as connection:
+        if file_index is None:
+            connection.execute(text(
+                "UPDATE jobs SET status = :cancelled, stage = 'cancelled', lease_expires_at = NULL, updated_at = :now "
+                "WHERE id = :id AND status = :queued"
+            ), {"cancelled": JobStatus.CANCELLED, "queued": JobStatus.QUEUED, "now": now, "id": task_id})
+            connection.execute(text(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = :now WHERE id = :id AND status = :running"
+            ), {"running": JobStatus.RUNNING, "now": now, "id": task_id})
+
+    with QueueSession() as session:
+        job = session.get(Job, task_id)
+        if job is None:
+            return None
+        if file_index is not None and job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+            job.cancelled_files = sorted(set(job.cancelled_files or []) | {file_index})
+            job.updated_at = now
+            session.commit()
+        return job.status
+
+
+def get_cancel_requests(task_id: str) -> Tuple[bool, list]:
+    """(whole job cancelled, indexes of cancelled files) as requested through request_cancel"""
+    with queue_engine.connect() as connection:
+        row = connection.execute(
+            text("SELECT cancel_requested, cancelled_files FROM jobs WHERE id = :id"), {"id": task_id}
+        ).first()
+    if row is None:
+        return False, []
+    cancelled_files = row[1]
+    if isinstance(cancelled_files, str):
+        cancelled_files = json.loads(cancelled_files)
+    return bool(row[0]), cancelled_files or []
+
+
+def get_job(task_id: str) -> Optional[dict]:
+    with QueueSession() as session:
+        job = session.get(Job, task_id)
+        return _to_dict(job) if job else None
+
+
+def count_by_status() -> dict:
+    with queue_engine.connect() as connection:
+        rows = connection.execute(text("SELECT status, COUNT(*) FROM jobs GROUP BY status")).all()
+    return {status: count for status, count in rows}
+
+
+def _to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "lane": job.lane,
+        "user_id": job.user_id,
+        "status": job.status,
+        "payload": job.payload,
+        "stage": job.stage,
+        "progress": job.progress,
+        "processed_files": job.processed_files,
+        "result": job.result,
+        "error": job.error,
+        "worker_id": job.worker_id,
+        "lease_token": job.lease_token,
+        "lease_expires_at": job.lease_expires_at,
+        "attempts": job.attempts,
+        "updated_at": job.updated_at,
+    }
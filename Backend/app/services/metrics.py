@@ -0,0 +1,250 @@
+"""In-process pipeline metrics rendered in the Prometheus text exposition format"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from app.config import TIER_PRICES
+
+_lock = threading.RLock()
+_registry = []
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 180.0, 300.0)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        with _lock:
+            _registry.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self):
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge whose value can be set directly or computed at scrape time"""
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[_label_key(self.labelnames, labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the (unlabelled) value on every scrape"""
+        self._function = function
+
+    def render(self):
+        lines = self._header()
+        if self._function is not None:
+            lines.append(f"{self.name} {_format_value(self._function())}")
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[Tuple[str, ...], list] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(_label_key(self.labelnames, labels), ()))
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile from the bucket counts (upper bound of the matching bucket)"""
+        counts = self._counts.get(_label_key(self.labelnames, labels))
+        if not counts:
+            return None
+        total = sum(counts)
+        rank = q * total
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound if bound != float("inf") else self.buckets[-2]
+        return self.buckets[-2]
+
+    def render(self):
+        lines = self._header()
+        for key in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets, self._counts[key]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(self._sums[key], 6))}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# Pipeline metrics
+STAGE_DURATION = Histogram(
+    "resume_stage_duration_seconds",
+    "Time spent in each pipeline stage",
+    ("stage", "method"),
+)
+TASKS_QUEUED = Gauge("resume_tasks_queued", "Tasks waiting to start processing")
+TASKS_IN_FLIGHT = Gauge("resume_tasks_in_flight", "Tasks currently being processed")
+TASKS_FINISHED = Counter("resume_tasks_finished_total", "Finished tasks by final status", ("status",))
+WORK_CANCELLED = Counter(
+    "resume_work_cancelled_total",
+    "Cancelled tasks and batch files, by whether they were still queued or already running",
+    ("kind", "state"),
+)
+AZURE_REQUESTS = Counter("azure_openai_requests_total", "Azure OpenAI requests by HTTP status", ("status",))
+TRUNCATIONS = Counter(
+    "azure_openai_truncations_total",
+    "Answers cut off at max_tokens, by method and outcome (continued, closed)",
+    ("method", "outcome"),
+)
+AZURE_TOKENS = Counter("azure_openai_tokens_total", "Azure OpenAI tokens consumed", ("type",))
+NEAR_DUPLICATES = Counter(
+    "resume_near_duplicate_lookups_total",
+    "Near-duplicate and page-level reuse lookups by outcome (reused, delta, page_delta, miss, ...)",
+    ("outcome",),
+)
+STRATEGY_FALLBACKS = Counter(
+    "resume_strategy_fallbacks_total",
+    "Files that fell back to text-based processing, by the step that failed",
+    ("step",),
+)
+TIER_ROUTING = Counter(
+    "resume_tier_routing_total",
+    "Files routed to each deployment tier by estimated complexity",
+    ("tier",),
+)
+TIER_REQUEST_DURATION = Histogram(
+    "azure_openai_tier_request_duration_seconds",
+    "Duration of successful Azure OpenAI requests by deployment tier and method",
+    ("tier", "method"),
+)
+TIER_TOKENS = Counter("azure_openai_tier_tokens_total", "Azure OpenAI tokens consumed by deployment tier", ("tier", "type"))
+TIER_COST = Counter("azure_openai_tier_cost_usd_total", "Estimated Azure OpenAI cost in USD by deployment tier (see TIER_PRICES)", ("tier",))
+LOCAL_CONTACT_FIELDS = Counter(
+    "resume_local_contact_fields_total",
+    "Contact fields extracted locally instead of by Azure, by field",
+    ("field",),
+)
+HEDGES = Counter(
+    "resume_hedged_parses_total",
+    "Vision parses by hedging outcome (in_time, primary, backup, failed)",
+    ("outcome",),
+)
+CACHE_REQUESTS = Counter("resume_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+CACHE_HIT_RATIO = Gauge("resume_cache_hit_ratio", "Share of cache lookups that were hits", ("cache",))
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+    total = hits + CACHE_REQUESTS.value(cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(hits / total, cache=cache)
+
+
+def record_token_usage(usage: Optional[dict], tier: Optional[str] = None):
+    if not usage:
+        return
+    AZURE_TOKENS.inc(usage.get("prompt_tokens", 0), type="prompt")
+    AZURE_TOKENS.inc(usage.get("completion_tokens", 0), type="completion")
+    if tier:
+        prices = TIER_PRICES.get(tier, {})
+        cost = 0.0
+        for kind in ("prompt", "completion"):
+            tokens = usage.get(f"{kind}_tokens", 0)
+            TIER_TOKENS.inc(tokens, tier=tier, type=kind)
+            cost += tokens / 1000 * prices.get(kind, 0.0)
+        TIER_COST.inc(cost, tier=tier)
+
+
+@contextmanager
+def stage_timer(stage: str, method: str = "none"):
+    """Observe the wall-clock duration of a pipeline stage, even if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - started, stage=stage, method=method)
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
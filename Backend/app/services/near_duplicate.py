@@ -0,0 +1,144 @@
+"""Near-duplicate resume detection with MinHash and locality-sensitive hashing.
+
+Each processed resume's extracted text is reduced to a MinHash signature over
+word 3-gram shingles. The signature is split into bands. Every band is stored
+as a bucket row, so finding candidates is one indexed query: resumes that share
+any bucket. The candidates are then ranked by the estimated Jaccard similarity of
+their signatures. With 16 bands of 8 rows, pairs around 0.7 similar
+start to collide, and pairs at 0.85 or more almost always do.
+
+The index lives in the database next to resume_history. The API and the
+workers all see it, and each new resume is added when it is saved.
+"""
+import difflib
+import hashlib
+import random
+import re
+import struct
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import DEDUP_SCOPE, DEDUP_THRESHOLD
+from app.models import ResumeFingerprint, ResumeHistory, ResumeLshBucket
+
+SHINGLE_WORDS = 3
+BANDS = 16
+ROWS = 8
+NUM_PERM = BANDS * ROWS
+# Texts with fewer shingles than this (e.g. scanned PDFs) aren't fingerprinted
+MIN_SHINGLES = 20
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+_rng = random.Random(1729)  # fixed, so signatures stay comparable across processes and restarts
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_WORD = re.compile(r"\w+")
+
+
+class Match(NamedTuple):
+    resume: ResumeHistory
+    similarity: float
+    text: str  # the matched resume's cleaned text
+    identical: bool  # same words in the same order
+
+
+def clean_text(text: str) -> str:
+    """Collapse whitespace within lines and drop blank lines; this is what gets stored and diffed"""
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def signature(text: str) -> Optional[Tuple[int, ...]]:
+    """MinHash signature of `text`, or None if it is too short to fingerprint"""
+    words = _words(text)
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+              for shingle in shingles]
+    return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in _PERMUTATIONS)
+
+
+def _pack(values: Tuple[int, ...]) -> bytes:
+    return struct.pack(f"<{NUM_PERM}Q", *values)
+
+
+def _unpack(data: bytes) -> Tuple[int, ...]:
+    return struct.unpack(f"<{NUM_PERM}Q", data)
+
+
+def _buckets(values: Tuple[int, ...]) -> List[int]:
+    """One bucket id per band, kept within SQLite's signed 64-bit INTEGER"""
+    buckets = []
+    for band in range(BANDS):
+        rows = struct.pack(f"<B{ROWS}Q", band, *values[band * ROWS:(band + 1) * ROWS])
+        buckets.append(int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "little") >> 1)
+    return buckets
+
+
+def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def find_match(db: Session, text: str, user_id: Optional[str]) -> Optional[Match]:
+    """The most similar completed resume at or above DEDUP_THRESHOLD, if any"""
+    values = signature(text)
+    if values is None:
+        return None
+
+    candidates = db.query(ResumeLshBucket.resume_id).filter(ResumeLshBucket.bucket.in_(_buckets(values))).distinct()
+    query = db.query(ResumeFingerprint).filter(ResumeFingerprint.resume_id.in_(candidates))
+    if DEDUP_SCOPE == "user":
+        query = query.filter(ResumeFingerprint.user_id == user_id)
+
+    best = None
+    for fingerprint in query:
+        score = similarity(values, _unpack(fingerprint.signature))
+        if score >= DEDUP_THRESHOLD and (best is None or score > best[0]):
+            best = (score, fingerprint)
+    if best is None:
+        return None
+
+    score, fingerprint = best
+    resume = db.query(ResumeHistory).filter(ResumeHistory.id == fingerprint.resume_id).first()
+    if resume is None or resume.status != "completed" or not resume.resume_data:
+        return None
+    identical = _words(fingerprint.text) == _words(text)
+    return Match(resume, 1.0 if identical else score, fingerprint.text, identical)
+
+
+def changed_lines(old_text: str, new_text: str) -> Tuple[List[str], List[str]]:
+    """(removed, added) lines between two cleaned texts"""
+    old_lines = clean_text(old_text).splitlines()
+    new_lines = clean_text(new_text).splitlines()
+    removed, added = [], []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != "equal":
+            removed.extend(old_lines[old_start:old_end])
+            added.extend(new_lines[new_start:new_end])
+    return removed, added
+
+
+def index_resume(db: Session, resume_id: int, user_id: Optional[str], text: str) -> bool:
+    """Add a saved resume to the index; False if its text is too short to fingerprint"""
+    values = signature(text)
+    if values is None:
+        return False
+    db.add(ResumeFingerprint(resume_id=resume_id, user_id=user_id, signature=_pack(values), text=clean_text(text)))
+    db.add_all(ResumeLshBucket(bucket=bucket, resume_id=resume_id) for bucket in _buckets(values))
+    db.commit()
+    return True
+
+
+def remove_resume(db: Session, resume_id: int):
+    """Drop a resume from the index (the caller commits)"""
+    db.query(ResumeLshBucket).filter(ResumeLshBucket.resume_id == resume_id).delete(synchronize_session=False)
+    db.query(ResumeFingerprint).filter(ResumeFingerprint.resume_id == resume_id).delete(synchronize_session=False)
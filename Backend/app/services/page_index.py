@@ -0,0 +1,127 @@
+"""Per-page fingerprints of processed PDFs, so a new version re-parses only the pages that changed.
+
+A page's fingerprint hashes its words, or for a page without a text layer
+(a scan), a small grayscale rendering of it. Every saved PDF resume stores one
+row per page. A new upload looks for the earlier resume that shares the
+most page fingerprints with it. The changed pages are then the positions whose
+fingerprints differ.
+
+Sharing a page isn't enough to be a previous version: two different people's
+resumes can share a cover or boilerplate page. Most of the earlier resume's
+pages must match, at least one of them with text. Unless every page is
+identical, the file name must also be the same or the two texts at least
+PAGE_REPARSE_MIN_SIMILARITY similar.
+"""
+import hashlib
+import re
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import DEDUP_SCOPE, PAGE_REPARSE_MIN_SIMILARITY
+from app.models import ResumeHistory, ResumePage
+from app.services import near_duplicate
+
+_WORD = re.compile(r"\w+")
+
+# Zoom of the rendering hashed for pages without text; small, so slight rasterizer
+# differences don't matter and it stays cheap
+_IMAGE_ZOOM = 0.25
+
+
+class PageFingerprint(NamedTuple):
+    fingerprint: str
+    text: str
+
+
+class PreviousVersion(NamedTuple):
+    resume: ResumeHistory
+    changed_pages: List[int]  # 0-based pages of the new version to re-extract
+    page_texts: dict  # page number -> that page's text in the previous version
+
+
+def fingerprint_pages(pdf_path: str) -> List[PageFingerprint]:
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(pdf_path) as document:
+        for page in document:
+            text = " ".join(page.get_text().split())
+            words = _WORD.findall(text.lower())
+            if words:
+                digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).hexdigest()
+                pages.append(PageFingerprint(f"t:{digest}", text))
+            else:
+                pixmap = page.get_pixmap(matrix=fitz.Matrix(_IMAGE_ZOOM, _IMAGE_ZOOM), colorspace=fitz.csGRAY, alpha=False)
+                digest = hashlib.blake2b(pixmap.samples, digest_size=16).hexdigest()
+                pages.append(PageFingerprint(f"i:{digest}", ""))
+    return pages
+
+
+def _same_document(resume: ResumeHistory, filename: Optional[str], old_pages: list, pages: List[PageFingerprint]) -> bool:
+    """Whether a candidate is confirmed as an earlier version: same file name, or similar enough text"""
+    if filename and resume.filename == filename:
+        return True
+    old_signature = near_duplicate.signature(" ".join(page.text for page in old_pages))
+    new_signature = near_duplicate.signature(" ".join(page.text for page in pages))
+    if old_signature is None or new_signature is None:
+        return False
+    return near_duplicate.similarity(old_signature, new_signature) >= PAGE_REPARSE_MIN_SIMILARITY
+
+
+def find_previous_version(db: Session, pages: List[PageFingerprint], user_id: Optional[str],
+                          max_changed_pages: int, filename: Optional[str] = None) -> Optional[PreviousVersion]:
+    """The stored resume this PDF is a page-wise edit of, if at most `max_changed_pages` pages differ.
+
+    A page-wise edit keeps every page of the previous version, in place, except
+    the changed ones; pages may be appended. More than half of the previous
+    version's pages must be kept, and see the module docstring for the other
+    checks. Identical documents match with no changed pages.
+    """
+    if len(pages) < 2:
+        return None
+
+    shared = func.count(ResumePage.id)
+    query = (
+        db.query(ResumePage.resume_id, shared)
+        .join(ResumeHistory, ResumeHistory.id == ResumePage.resume_id)
+        .filter(ResumePage.fingerprint.in_({page.fingerprint for page in pages}), ResumeHistory.status == "completed")
+    )
+    if DEDUP_SCOPE == "user":
+        query = query.filter(ResumeHistory.user_id == user_id)
+    candidates = query.group_by(ResumePage.resume_id).order_by(shared.desc(), ResumePage.resume_id.desc()).limit(5).all()
+
+    for resume_id, _ in candidates:
+        old_pages = db.query(ResumePage).filter(ResumePage.resume_id == resume_id).order_by(ResumePage.page_number).all()
+        if len(old_pages) > len(pages):
+            continue  # pages were removed; the previous JSON can't be split by page
+        changed = [
+            page_number for page_number, page in enumerate(pages)
+            if page_number >= len(old_pages) or old_pages[page_number].fingerprint != page.fingerprint
+        ]
+        if len(changed) > max_changed_pages or len(changed) >= len(pages):
+            continue
+        kept = [page for page_number, page in enumerate(old_pages) if page_number not in changed]
+        if len(kept) * 2 <= len(old_pages) or not any(page.fingerprint.startswith("t:") and page.text for page in kept):
+            continue
+        resume = db.query(ResumeHistory).filter(ResumeHistory.id == resume_id).first()
+        identical = not changed and len(old_pages) == len(pages)
+        if resume is None or not (identical or _same_document(resume, filename, old_pages, pages)) or not resume.resume_data:
+            continue
+        page_texts = {page_number: old_pages[page_number].text for page_number in changed if page_number < len(old_pages)}
+        return PreviousVersion(resume, changed, page_texts)
+    return None
+
+
+def index_pages(db: Session, resume_id: int, pages: List[PageFingerprint]):
+    db.add_all(
+        ResumePage(resume_id=resume_id, page_number=page_number, fingerprint=page.fingerprint, text=page.text)
+        for page_number, page in enumerate(pages)
+    )
+    db.commit()
+
+
+def remove_pages(db: Session, resume_id: int):
+    """Drop a resume's page fingerprints (the caller commits)"""
+    db.query(ResumePage).filter(ResumePage.resume_id == resume_id).delete(synchronize_session=False)
@@ -0,0 +1,79 @@
+"""Compressed storage of parsed resume JSON in resume_payloads.
+
+resume_history rows only carry metadata; the parse lives in a side table,
+compressed, and is loaded the first time a row's resume_data is read (detail
+view, export, reuse). PAYLOAD_COMPRESSION picks zstd (when the zstandard
+package is installed) or zlib for new payloads. Every payload records its
+codec, so both can be read back.
+
+Rows written before the side table existed still have their JSON inline;
+migrate() moves them over.
+"""
+import json
+import zlib
+from typing import Any, Tuple
+
+from app.config import PAYLOAD_COMPRESSION
+from utils.logger import get_logger
+
+# zstandard is optional; zlib is used without it
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = get_logger("payloads")
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def codec() -> str:
+    return "zstd" if PAYLOAD_COMPRESSION == "zstd" and zstandard is not None else "zlib"
+
+
+def encode(value: Any) -> Tuple[str, bytes, int]:
+    """(codec, compressed bytes, uncompressed size) of a JSON value"""
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    name = codec()
+    if name == "zstd":
+        return name, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), len(raw)
+    return name, zlib.compress(raw, ZLIB_LEVEL), len(raw)
+
+
+def decode(name: str, data: bytes) -> Any:
+    if name == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This payload is zstd-compressed; install the zstandard package to read it")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif name == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown payload codec: {name}")
+    return json.loads(raw)
+
+
+def migrate(db, batch_size: int = 500) -> dict:
+    """Move inline resume_data of existing rows into resume_payloads; returns row and byte counts"""
+    from app.models import ResumeHistory, ResumePayload
+
+    totals = {"rows": 0, "raw_bytes": 0, "stored_bytes": 0}
+    while True:
+        rows = (
+            db.query(ResumeHistory)
+            .outerjoin(ResumePayload, ResumePayload.resume_id == ResumeHistory.id)
+            .filter(ResumePayload.resume_id.is_(None))
+            .order_by(ResumeHistory.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return totals
+        for row in rows:
+            row.resume_data = row.inline_data or {}
+            totals["rows"] += 1
+            totals["raw_bytes"] += row.payload.raw_size
+            totals["stored_bytes"] += len(row.payload.data)
+        db.commit()
+        db.expunge_all()  # keep memory flat on large tables
+        logger.info(f"Moved {totals['rows']} payloads to resume_payloads")
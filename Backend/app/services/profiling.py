@@ -0,0 +1,142 @@
+"""Opt-in per-task profiling: a stack-sampling profiler plus tracemalloc snapshots"""
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+# tracemalloc is process-wide; only stop it once the last active profile finishes
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+# Keep the profiler's own bookkeeping out of the allocation summary
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+]
+
+
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class TaskProfiler:
+    """Sample the calling thread's stack every `interval` seconds while active.
+
+    Sampling reads sys._current_frames() from a helper thread, so the profiled
+    code runs unmodified and the overhead is bounded by the sampling rate. The
+    allocation summary diffs tracemalloc snapshots taken on entry and exit; it
+    covers the whole process, so concurrent tasks show up in it as well.
+    """
+
+    def __init__(self, interval: float = 0.005, top_allocations: int = 25):
+        self.interval = interval
+        self.top_allocations = top_allocations
+        self.stacks = Counter()
+        self.samples = 0
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._start_snapshot = None
+        self._allocations = []
+        self._peak_bytes = 0
+        self._started_at = 0.0
+        self._duration = 0.0
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        _start_tracemalloc()
+        tracemalloc.reset_peak()
+        self._start_snapshot = _take_snapshot()
+        self._started_at = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name="task-profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._duration = time.perf_counter() - self._started_at
+        self._stop.set()
+        self._sampler.join()
+        try:
+            end_snapshot = _take_snapshot()
+            self._peak_bytes = tracemalloc.get_traced_memory()[1]
+            self._allocations = end_snapshot.compare_to(self._start_snapshot, "lineno")[: self.top_allocations]
+        finally:
+            self._start_snapshot = None
+            _stop_tracemalloc()
+        return False
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def report(self, top_functions: int = 30) -> dict:
+        self_samples = Counter()
+        total_samples = Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack[-1]] += count
+            for label in set(stack):
+                total_samples[label] += count
+
+        return {
+            "duration_ms": round(self._duration * 1000, 1),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "top_functions": [
+                {
+                    "function": label,
+                    "self_samples": self_samples[label],
+                    "total_samples": count,
+                    "total_percent": round(100 * count / self.samples, 1) if self.samples else 0,
+                }
+                for label, count in total_samples.most_common(top_functions)
+            ],
+            "allocations": {
+                "peak_traced_mb": round(self._peak_bytes / (1024 * 1024), 2),
+                "top_lines": [
+                    {
+                        "location": str(stat.traceback),
+                        "size_kb": round(stat.size / 1024, 1),
+                        "size_diff_kb": round(stat.size_diff / 1024, 1),
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in self._allocations
+                ],
+            },
+            "collapsed_stacks": self.collapsed(),
+        }
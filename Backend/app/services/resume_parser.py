@@ -1,20 +1,49 @@
-import PyPDF2
-import httpx
-from app.config import AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_KEY
+from app.config import AZURE_MAX_ATTEMPTS, AZURE_MAX_CONTINUATIONS, TIER_MAX_TOKENS
 import json
 import re
 import tempfile
 import os
 import base64  # For encoding images
-import fitz  # PyMuPDF
-from PIL import Image
+import contextlib
 import io
-from docx import Document  # For DOCX text extraction
 import subprocess
 import platform
+import shutil
+import time
+from app.services import azure_pool
+from app.services.cancellation import CancelToken, TaskCancelled, gather
+from app.services.metrics import AZURE_REQUESTS, STAGE_DURATION, TIER_REQUEST_DURATION, TRUNCATIONS, record_token_usage, stage_timer
+from utils.logger import get_logger
+
+logger = get_logger("parser")
+
+# The vision request covers at most this many pages
+VISION_MAX_PAGES = 10
+
+# PyMuPDF, Pillow, PyPDF2, python-docx and httpx are imported inside the functions
+# that use them, so importing the app (and starting a worker) doesn't pay for
+# them; app/services/warmup.py loads them in the background after startup.
+
+_aspose_words = None
+_aspose_import_error = None
+
+def _load_aspose_words():
+    """Import Aspose.Words once; a failed import is remembered rather than retried per file"""
+    global _aspose_words, _aspose_import_error
+    if _aspose_words is None and _aspose_import_error is None:
+        try:
+            import aspose.words as aw
+            _aspose_words = aw
+        except ImportError as e:
+            _aspose_import_error = e
+    if _aspose_import_error is not None:
+        raise _aspose_import_error
+    return _aspose_words
 
 def extract_text_from_pdf(file_path: str) -> str:
     """Legacy function to extract text from PDF - kept for backward compatibility"""
+    import PyPDF2
+
     with open(file_path, "rb") as file:
         reader = PyPDF2.PdfReader(file)
         text = ""
@@ -25,6 +54,8 @@ def extract_text_from_pdf(file_path: str) -> str:
 
 def extract_text_from_docx(file_path: str) -> str:
     """Extract text from DOCX files using python-docx"""
+    from docx import Document
+
     try:
         doc = Document(file_path)
         text = ""
@@ -55,7 +86,7 @@ def extract_text_from_docx(file_path: str) -> str:
         return text.strip()
         
     except Exception as e:
-        print(f"Error extracting text from DOCX: {str(e)}")
+        logger.error(f"Error extracting text from DOCX: {str(e)}")
         raise RuntimeError(f"Failed to extract text from DOCX file: {str(e)}")
 
 def convert_docx_to_pdf(docx_path: str) -> str:
@@ -66,9 +97,9 @@ def convert_docx_to_pdf(docx_path: str) -> str:
         
         # Try Aspose.Words first
         try:
-            import aspose.words as aw
+            aw = _load_aspose_words()
             
-            print(f"Attempting conversion with Aspose.Words: {docx_path}")
+            logger.debug(f"Attempting conversion with Aspose.Words: {docx_path}")
             
             # Load the document
             doc = aw.Document(docx_path)
@@ -78,16 +109,16 @@ def convert_docx_to_pdf(docx_path: str) -> str:
             
             # Verify the PDF was created and has content
             if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
-                print(f"Successfully converted DOCX to PDF using Aspose.Words: {pdf_path}")
+                logger.info(f"Successfully converted DOCX to PDF using Aspose.Words: {pdf_path}")
                 return pdf_path
             else:
-                print("Aspose.Words created empty or invalid PDF, falling back")
+                logger.warning("Aspose.Words created empty or invalid PDF, falling back")
                 raise Exception("Invalid PDF created")
                 
         except ImportError:
-            print("Aspose.Words not installed, falling back to original methods")
+            logger.warning("Aspose.Words not installed, falling back to original methods")
         except Exception as e:
-            print(f"Aspose.Words conversion failed: {str(e)}, falling back to original methods")
+            logger.warning(f"Aspose.Words conversion failed: {str(e)}, falling back to original methods")
         
         # Fallback to original methods
         system = platform.system().lower()
@@ -107,14 +138,14 @@ def convert_docx_to_pdf(docx_path: str) -> str:
                 result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
                 
                 if result.returncode == 0:
-                    print(f"Successfully converted DOCX to PDF using LibreOffice")
+                    logger.info("Successfully converted DOCX to PDF using LibreOffice")
                     return pdf_path
                 else:
-                    print(f"LibreOffice conversion failed: {result.stderr}")
+                    logger.warning(f"LibreOffice conversion failed: {result.stderr}")
                     raise Exception("LibreOffice conversion failed")
                     
             except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-                print(f"LibreOffice not available or timeout: {str(e)}")
+                logger.warning(f"LibreOffice not available or timeout: {str(e)}")
                 raise Exception("LibreOffice conversion not available")
                 
         elif system == "windows":
@@ -122,10 +153,10 @@ def convert_docx_to_pdf(docx_path: str) -> str:
             try:
                 from docx2pdf import convert
                 convert(docx_path, pdf_path)
-                print(f"Successfully converted DOCX to PDF using docx2pdf")
+                logger.info("Successfully converted DOCX to PDF using docx2pdf")
                 return pdf_path
             except ImportError:
-                print("docx2pdf not available on Windows")
+                logger.warning("docx2pdf not available on Windows")
                 raise Exception("docx2pdf not available")
                 
         else:
@@ -152,19 +183,22 @@ def convert_docx_to_pdf(docx_path: str) -> str:
                         story.append(para)
                 
                 doc.build(story)
-                print(f"Successfully converted DOCX to PDF using reportlab")
+                logger.info("Successfully converted DOCX to PDF using reportlab")
                 return pdf_path
                 
             except ImportError:
-                print("reportlab not available for PDF generation")
+                logger.warning("reportlab not available for PDF generation")
                 raise Exception("No PDF conversion method available")
                 
     except Exception as e:
-        print(f"Error converting DOCX to PDF: {str(e)}")
+        logger.error(f"Error converting DOCX to PDF: {str(e)}")
         raise RuntimeError(f"Failed to convert DOCX to PDF: {str(e)}")
 
 def convert_pdf_to_images(file_path: str, dpi: int = 300) -> list:
     """Convert PDF to a list of PIL Images using PyMuPDF (fitz)"""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
     try:
         # Open the PDF
         pdf_document = fitz.open(file_path)
@@ -172,7 +206,7 @@ def convert_pdf_to_images(file_path: str, dpi: int = 300) -> list:
         
         # Get number of pages
         page_count = len(pdf_document)
-        print(f"PDF has {page_count} pages - converting all pages to images")
+        logger.debug(f"PDF has {page_count} pages - converting all pages to images")
         
         # Convert each page to an image
         for page_num in range(page_count):
@@ -189,53 +223,402 @@ def convert_pdf_to_images(file_path: str, dpi: int = 300) -> list:
             img = Image.frombytes("RGB", [pixmap.width, pixmap.height], pixmap.samples)
             images.append(img)
             
-            print(f"Converted page {page_num + 1}/{page_count} to image: {img.width}x{img.height}")
+            logger.debug(f"Converted page {page_num + 1}/{page_count} to image: {img.width}x{img.height}")
         
         # Close the document
         pdf_document.close()
         
-        print(f"Successfully converted all {page_count} pages to images")
+        logger.info(f"Converted all {page_count} pages to images")
         return images
     except Exception as e:
-        print(f"Error converting PDF to images with PyMuPDF: {str(e)}")
+        logger.error(f"Error converting PDF to images with PyMuPDF: {str(e)}")
         raise
 
-def image_to_base64(image) -> str:
-    """Convert PIL Image to base64 string"""
+def iter_pdf_page_png(file_path: str, dpi: int = 300, max_pages: int = None, cancel_token: CancelToken = None,
+                      page_numbers: list = None):
+    """Render PDF pages one at a time and yield each as PNG bytes.
+
+    Only one page's pixmap is alive at a time, unlike convert_pdf_to_images
+    which keeps every full-resolution page in memory. A cancelled token stops
+    rendering before the next page. `page_numbers` (0-based) renders just those pages.
+    """
+    import fitz  # PyMuPDF
+
+    pdf_document = fitz.open(file_path)
+    try:
+        page_count = len(pdf_document) if max_pages is None else min(max_pages, len(pdf_document))
+        zoom = dpi / 72  # 72 is the default DPI for PDF
+        matrix = fitz.Matrix(zoom, zoom)
+        for page_num in (range(page_count) if page_numbers is None else page_numbers):
+            if cancel_token is not None:
+                cancel_token.check()
+            pixmap = pdf_document.load_page(page_num).get_pixmap(matrix=matrix, alpha=False)
+            png_bytes = pixmap.tobytes("png")
+            logger.debug(f"Rendered page {page_num + 1}/{page_count}: {pixmap.width}x{pixmap.height}")
+            del pixmap
+            yield png_bytes
+            del png_bytes
+    finally:
+        pdf_document.close()
+
+def image_to_png_bytes(image) -> bytes:
+    """Encode a PIL Image as PNG bytes"""
     buffer = io.BytesIO()
     image.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    return buffer.getvalue()
+
+def image_to_base64(image) -> str:
+    """Convert PIL Image to base64 string"""
+    img_str = base64.b64encode(image_to_png_bytes(image)).decode('utf-8')
     return img_str
 
-def extract_resume_details_with_azure(text: str) -> dict:
-    """Legacy function that uses text-based extraction - kept for backward compatibility"""
-    url = AZURE_OPENAI_ENDPOINT
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": AZURE_OPENAI_KEY
-    }
+# Marker replaced by the page images when the vision request body is streamed
+_PAGE_IMAGES_PLACEHOLDER = "__PAGE_IMAGES__"
+
+def _request_body_parts(payload: dict) -> tuple:
+    """The serialized body split around where the page images go: (prefix, suffix) as bytes.
+
+    The images go at the end of the last message whose content is a list.
+    """
+    content = next(message["content"] for message in reversed(payload["messages"]) if isinstance(message["content"], list))
+    content.append(_PAGE_IMAGES_PLACEHOLDER)
+    try:
+        serialized = json.dumps(payload, separators=(",", ":"))
+    finally:
+        content.pop()
+    prefix, suffix = serialized.split(f',"{_PAGE_IMAGES_PLACEHOLDER}"', 1)
+    return prefix.encode("utf-8"), suffix.encode("utf-8")
+
+def write_page_images(handle, png_pages) -> int:
+    """Write one image part per page, as they appear in a request body, and return the number of pages.
+
+    Each page is pulled from `png_pages`, base64-encoded, written and released
+    before the next one is produced, so memory stays at roughly one page.
+    """
+    pages = 0
+    render_seconds = 0.0
+    encode_seconds = 0.0
+    page_iter = iter(png_pages)
+    while True:
+        started = time.perf_counter()
+        png_bytes = next(page_iter, None)
+        render_seconds += time.perf_counter() - started
+        if png_bytes is None:
+            break
+
+        started = time.perf_counter()
+        handle.write(b',{"type":"image_url","image_url":{"url":"data:image/png;base64,')
+        handle.write(base64.b64encode(png_bytes))
+        handle.write(b'"}}')
+        encode_seconds += time.perf_counter() - started
+        del png_bytes
+        pages += 1
+        logger.debug(f"Added page {pages} to vision payload")
+
+    STAGE_DURATION.observe(render_seconds, stage="render", method="vision")
+    STAGE_DURATION.observe(encode_seconds, stage="encode", method="vision")
+    return pages
+
+def write_vision_request_body(handle, payload: dict, png_pages) -> int:
+    """Write a chat-completions body to `handle`, appending one image part per page.
+
+    The last message with a content list in `payload` gets the page images (see
+    write_page_images). Returns the number of pages written.
+    """
+    prefix, suffix = _request_body_parts(payload)
+    handle.write(prefix)
+    pages = write_page_images(handle, png_pages)
+    handle.write(suffix)
+    return pages
+
+def write_request_body_with_images(handle, payload: dict, images_file):
+    """Like write_vision_request_body, copying page images already written to `images_file` by write_page_images"""
+    prefix, suffix = _request_body_parts(payload)
+    handle.write(prefix)
+    images_file.seek(0)
+    shutil.copyfileobj(images_file, handle)
+    handle.write(suffix)
+
+def post_chat_completion(payload: dict, timeout: float, method: str, body_file=None, cancel_token: CancelToken = None,
+                         tier: str = "large") -> str:
+    """Send a chat-completions request to Azure and return the message content.
+
+    When `body_file` is given it holds the already-serialized request body and is
+    streamed from disk instead of serializing `payload` in memory. Cancelling
+    `cancel_token` aborts the request in flight and raises TaskCancelled.
+
+    An answer cut off at max_tokens (finish_reason "length") is continued: the
+    partial answer is sent back as the assistant's message and only the rest is
+    generated, up to AZURE_MAX_CONTINUATIONS times. If it's still cut off after
+    that, the JSON is closed after its last complete value (close_truncated_json).
+    """
+    content, finish_reason = request_chat_completion(payload, timeout, method, body_file, cancel_token, tier)
+    continuations = 0
+    while finish_reason == "length" and continuations < AZURE_MAX_CONTINUATIONS:
+        continuations += 1
+        logger.info(f"Azure response cut off at max_tokens after {len(content)} characters, requesting continuation {continuations}")
+        continuation = {
+            **payload,
+            "messages": payload["messages"] + [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": CONTINUATION_PROMPT},
+            ],
+        }
+        if body_file is None:
+            more, finish_reason = request_chat_completion(continuation, timeout, method, None, cancel_token, tier)
+        else:
+            with tempfile.TemporaryFile() as continuation_file:
+                write_continuation_body(continuation_file, body_file, payload, continuation)
+                more, finish_reason = request_chat_completion(continuation, timeout, method, continuation_file, cancel_token, tier)
+        content = join_continuation(content, more)
+        TRUNCATIONS.inc(method=method, outcome="continued")
+
+    if finish_reason == "length":
+        logger.warning(f"Azure response still cut off after {continuations} continuations, closing the JSON at its last complete value")
+        TRUNCATIONS.inc(method=method, outcome="closed")
+        content = close_truncated_json(content)
+    return content
+
+# Sent after a cut-off answer, which is passed back as the assistant's message
+CONTINUATION_PROMPT = (
+    "Your previous answer was cut off. Continue it from exactly where it stopped: output only the "
+    "remaining characters of the JSON, without repeating anything and without code fences."
+)
+
+def write_continuation_body(handle, body_file, payload: dict, continuation: dict):
+    """Write the body of `continuation` to `handle`, copying the page images from the original `body_file`"""
+    prefix, suffix = _request_body_parts(payload)
+    body_file.seek(0, os.SEEK_END)
+    images_end = body_file.tell() - len(suffix)
+    continuation_prefix, continuation_suffix = _request_body_parts(continuation)
+    handle.write(continuation_prefix)
+    body_file.seek(len(prefix))
+    remaining = images_end - len(prefix)
+    while remaining > 0:
+        chunk = body_file.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            break
+        handle.write(chunk)
+        remaining -= len(chunk)
+    handle.write(continuation_suffix)
+
+def join_continuation(content: str, more: str) -> str:
+    """Append a continuation to a cut-off answer, dropping code fences and any part it repeats"""
+    more = re.sub(r"^```(?:json)?\s*", "", more.lstrip())  # a closing fence is removed by clean_json_string
+    # A continuation that starts over from part of the answer: keep one copy
+    for overlap in range(min(len(content), len(more), 2000), 15, -1):
+        if content.endswith(more[:overlap]):
+            return content + more[overlap:]
+    return content + more
+
+def close_truncated_json(raw: str) -> str:
+    """Cut truncated JSON back to its last complete value and close the arrays and objects still open"""
+    text = re.sub(r"^```(?:json)?\s*", "", raw.strip())
+    stack = []
+    in_string = escaped = False
+    cut = None  # (index to cut at, brackets open there)
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            cut = (index + 1, list(stack))
+        elif char == ",":
+            cut = (index, list(stack))
+    if cut is None:
+        return raw
+    end, still_open = cut
+    return text[:end] + "".join("}" if bracket == "{" else "]" for bracket in reversed(still_open))
+
+def request_chat_completion(payload: dict, timeout: float, method: str, body_file=None, cancel_token: CancelToken = None,
+                            tier: str = "large") -> tuple:
+    """One chat-completions request (with retries on other deployments); returns (content, finish_reason).
+
+    The request goes to the least-loaded deployment of `tier` in azure_pool. A
+    timeout, connection error, 429 or 5xx is retried on another deployment,
+    trying at most AZURE_MAX_ATTEMPTS of them.
+    """
+    import httpx
+    from app.services import http_client
+
+    tried = []
+    while True:
+        deployment = azure_pool.pool.acquire(exclude=tried, tier=tier)
+        tried.append(deployment.name)
+        can_retry = len(tried) < AZURE_MAX_ATTEMPTS and azure_pool.pool.has_alternative(tried)
+
+        headers = {
+            "Content-Type": "application/json",
+            "api-key": deployment.key
+        }
+        if body_file is not None:
+            body_file.seek(0)
+            request_body = {"content": body_file}
+        else:
+            request_body = {"json": payload}
+
+        started = time.perf_counter()
+        try:
+            with stage_timer("azure_call", method):
+                response = http_client.shared_client().post(
+                    deployment.endpoint, headers=headers, timeout=timeout,
+                    extensions={"cancel_token": cancel_token} if cancel_token is not None else None, **request_body
+                )
+        except TaskCancelled:
+            azure_pool.pool.release(deployment, "cancelled")
+            raise
+        except httpx.HTTPError as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                azure_pool.pool.release(deployment, "cancelled")
+                AZURE_REQUESTS.inc(status="cancelled")
+                raise TaskCancelled()
+            azure_pool.pool.release(deployment, "failed")
+            AZURE_REQUESTS.inc(status="error")
+            if not can_retry:
+                raise
+            logger.warning(f"Azure deployment {deployment.name} failed ({type(e).__name__}), retrying on another deployment")
+            continue
+
+        AZURE_REQUESTS.inc(status=str(response.status_code))
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get("Retry-After", "")
+            azure_pool.pool.release(
+                deployment,
+                "throttled" if response.status_code == 429 else "failed",
+                retry_after=float(retry_after) if retry_after.isdigit() else None
+            )
+            if can_retry:
+                logger.warning(f"Azure deployment {deployment.name} returned {response.status_code}, retrying on another deployment")
+                continue
+        else:
+            seconds = time.perf_counter() - started
+            azure_pool.pool.release(deployment, "ok" if response.is_success else "rejected", seconds=seconds)
+            if response.is_success:
+                TIER_REQUEST_DURATION.observe(seconds, tier=deployment.tier, method=method)
+        break
+
+    try:
+        response.raise_for_status()
+        try:
+            data = response.json()
+            record_token_usage(data.get("usage"), deployment.tier)
+            choice = data["choices"][0]
+            return choice["message"]["content"], choice.get("finish_reason")
+        except Exception as json_error:
+            logger.error(f"Raw response text: {response.text}")  # This will show what Azure actually returned
+            raise RuntimeError(f"Failed to parse JSON: {json_error}")
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Azure returned an HTTP error: {e.response.text}")
+        raise RuntimeError(f"Request failed with status {e.response.status_code}: {e.response.text}")
+
+# Recorded with every saved parse. Bump it when the prompts or the parsing
+# change, so older records can be found and reprocessed from their originals
+PROMPT_VERSION = "2"
+
+# The fields of a parse, in the order of its JSON, with their line in the prompt's field list
+RESUME_FIELD_PROMPTS = {
+    "name": "- name\n",
+    "email": "- email\n",
+    "mobile": "- mobile\n",
+    "links": "- links (extract all professional links like GitHub, LinkedIn, portfolio websites, personal websites. Return as array of objects with 'type' and 'url' keys. For example: [{'type': 'GitHub', 'url': 'https://github.com/username'}, {'type': 'LinkedIn', 'url': 'https://linkedin.com/in/username'}, {'type': 'Portfolio', 'url': 'https://portfolio.com'}])\n",
+    "skills": "- skills (group related skills together, and return as a list of objects with category as the key and related skills as the value. For example: [{ 'Programming Languages': ['Java', 'C++'] }, { 'Cloud': ['AWS', 'Docker'] }])\n",
+    "education": "- education (recently passed degree/institution)\n",
+    "professional_experience": "- professional_experience (CRITICAL: Summarize to fit EXACTLY 1000 characters or less. This must be concise but comprehensive, covering key achievements and technologies. Format as array: ['point1','point2',..])\n",
+    "certifications": "- certifications (as a list\\check for certifications with images eg: microsoft certified Technology specialist)\n",
+    "experience_data": "- experience_data (as a list of objects with each object containing the following keys: 'company', 'startDate', 'endDate', 'role', 'clientEngagement', 'program', and 'responsibilities' which is a list of bullet points describing duties)\n",
+    "summary": "- summary (brief professional summary)\n",
+}
+
+# Roughly how many output tokens the model spends on the contact fields that
+# contact_extraction can fill in locally
+CONTACT_FIELD_TOKENS = {"email": 40, "mobile": 30, "links": 300}
+
+TEXT_LINK_GUIDELINES = (
+    "\nLINK EXTRACTION GUIDELINES:\n"
+    "- Look for URLs starting with http://, https://, www.\n"
+    "- Identify GitHub profiles (github.com)\n"
+    "- Identify LinkedIn profiles (linkedin.com/in/)\n"
+    "- Identify portfolio/personal websites\n"
+    "- Clean and format URLs properly\n"
+    "- Categorize links by type (GitHub, LinkedIn, Portfolio, Website, etc.)\n"
+)
+
+VISION_EXPERIENCE_GUIDELINES = (
+    "\nCRITICAL INSTRUCTIONS FOR EXPERIENCE DATA EXTRACTION:\n"
+    "- EXTRACT EVERY SINGLE ROW from ALL experience tables across ALL pages\n"
+    "- Each table row represents a separate job/role and should be a separate object in the experience_data array\n"
+    "- Do NOT skip any rows - process EVERY visible row in experience tables\n"
+    "- If a company appears multiple times with different roles, create separate objects for EACH role\n"
+    "- Look for tables with columns like: Role, Location, Domain, Duration, Key Projects\n"
+    "- Parse ALL rows from top to bottom, including partially visible rows\n"
+    "- For multi-page tables, ensure you capture continuation rows on subsequent pages\n"
+    "- If you see only partial information in a row, still include it as a separate entry\n"
+    "- Pay special attention to table borders and row separators to identify individual entries\n"
+    "- Count the number of rows you process and ensure you capture ALL visible experience entries\n\n"
+)
+
+VISION_SUMMARIZATION_GUIDELINES = (
+    "PROFESSIONAL EXPERIENCE SUMMARIZATION:\n"
+    "- The professional_experience field MUST be summarized to fit within 1000 characters total (including all array elements)\n"
+    "- Prioritize most important achievements, technologies, and impact\n"
+    "- Use concise language while maintaining key information\n"
+    "- Focus on quantifiable results and technical skills\n\n"
+)
 
+VISION_LINK_GUIDELINES = (
+    "LINK EXTRACTION GUIDELINES:\n"
+    "- Look for URLs starting with http://, https://, www.\n"
+    "- Identify GitHub profiles (github.com)\n"
+    "- Identify LinkedIn profiles (linkedin.com/in/)\n"
+    "- Identify portfolio/personal websites\n"
+    "- Look for links in headers, footers, contact sections\n"
+    "- Clean and format URLs properly\n"
+    "- Categorize links by type (GitHub, LinkedIn, Portfolio, Website, etc.)\n"
+    "- Extract clickable links and hyperlinked text\n\n"
+)
+
+VISION_TABLE_PARSING_STRATEGY = (
+    "TABLE PARSING STRATEGY:\n"
+    "1. Identify ALL tables containing work experience information\n"
+    "2. Process each table row by row from top to bottom\n"
+    "3. Extract data from each column for every row\n"
+    "4. Create a separate experience_data object for each row\n"
+    "5. Continue processing on subsequent pages if tables span multiple pages\n\n"
+)
+
+MISSING_DATA_INSTRUCTION = "If there is no data available for a section, try to infer it from the resume. If not possible, return 'Not available' for that section."
+
+def field_list_prompt(fields, known_fields: tuple = ()) -> str:
+    """The field-list lines of `fields`, leaving out the locally extracted `known_fields`"""
+    return "".join(RESUME_FIELD_PROMPTS[field] for field in fields if field not in known_fields)
+
+def max_tokens(tier: str, kind: str, known_fields: tuple = ()) -> int:
+    """Output budget of a `kind` ("text" or "vision") request on `tier`, less what known fields would have used"""
+    return TIER_MAX_TOKENS[tier][kind] - sum(CONTACT_FIELD_TOKENS.get(field, 0) for field in known_fields)
+
+def extract_resume_details_with_azure(text: str, cancel_token: CancelToken = None, tier: str = "large",
+                                      known_fields: tuple = ()) -> dict:
+    """Legacy function that uses text-based extraction - kept for backward compatibility.
+
+    `known_fields` are contact fields extracted locally (see contact_extraction);
+    they are left out of the prompt and the output budget.
+    """
     system_prompt = (
         "You are an expert resume parser. Extract the following fields from the resume:\n"
-        "- name\n"
-        "- email\n"
-        "- mobile\n"
-        "- links (extract all professional links like GitHub, LinkedIn, portfolio websites, personal websites. Return as array of objects with 'type' and 'url' keys. For example: [{'type': 'GitHub', 'url': 'https://github.com/username'}, {'type': 'LinkedIn', 'url': 'https://linkedin.com/in/username'}, {'type': 'Portfolio', 'url': 'https://portfolio.com'}])\n"
-        "- skills (group related skills together, and return as a list of objects with category as the key and related skills as the value. For example: [{ 'Programming Languages': ['Java', 'C++'] }, { 'Cloud': ['AWS', 'Docker'] }])\n"
-        "- education (recently passed degree/institution)\n"
-        "- professional_experience (CRITICAL: Summarize to fit EXACTLY 1000 characters or less. This must be concise but comprehensive, covering key achievements and technologies. Format as array: ['point1','point2',..])\n"
-        "- certifications (as a list\check for certifications with images eg: microsoft certified Technology specialist)\n"
-        "- experience_data (as a list of objects with each object containing the following keys: 'company', 'startDate', 'endDate', 'role', 'clientEngagement', 'program', and 'responsibilities' which is a list of bullet points describing duties)\n"
-        "- summary (brief professional summary)\n"
+        + field_list_prompt(RESUME_FIELD_PROMPTS, known_fields) +
         "\nIMPORTANT: The professional_experience field MUST be summarized to fit within 1000 characters total (including all array elements). Prioritize most important achievements and technologies.\n"
-        "\nLINK EXTRACTION GUIDELINES:\n"
-        "- Look for URLs starting with http://, https://, www.\n"
-        "- Identify GitHub profiles (github.com)\n"
-        "- Identify LinkedIn profiles (linkedin.com/in/)\n"
-        "- Identify portfolio/personal websites\n"
-        "- Clean and format URLs properly\n"
-        "- Categorize links by type (GitHub, LinkedIn, Portfolio, Website, etc.)\n"
-        "Return the data as valid JSON. If there is no data available for a section, try to infer it from the resume. If not possible, return 'Not available' for that section."
+        + ("" if "links" in known_fields else TEXT_LINK_GUIDELINES) +
+        "Return the data as valid JSON. " + MISSING_DATA_INSTRUCTION
     )
 
     user_prompt = f"Resume Text:\n{text}"
@@ -246,90 +629,38 @@ def extract_resume_details_with_azure(text: str) -> dict:
             {"role": "user", "content": user_prompt}
         ],
         "temperature": 0.2,
-        "max_tokens": 6000
+        "max_tokens": max_tokens(tier, "text", known_fields)
     }
 
-    try:
-        response = httpx.post(url, headers=headers, json=payload, timeout=50.0)
-        response.raise_for_status()
-        try:
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
-        except Exception as json_error:
-            print("Raw response text:", response.text)  # This will show what Azure actually returned
-            raise RuntimeError(f"Failed to parse JSON: {json_error}")
-    except httpx.HTTPStatusError as e:
-        print("Azure returned an HTTP error:", e.response.text)
-        raise RuntimeError(f"Request failed with status {e.response.status_code}: {e.response.text}")
+    return post_chat_completion(payload, timeout=50.0, method="text", cancel_token=cancel_token, tier=tier)
 
-def extract_resume_details_with_azure_vision(images: list) -> dict:
-    """Extract resume details using Azure OpenAI with vision capabilities"""
-    url = AZURE_OPENAI_ENDPOINT
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": AZURE_OPENAI_KEY
-    }
+def extract_resume_details_with_azure_vision(images, cancel_token: CancelToken = None, tier: str = "large",
+                                             known_fields: tuple = ()) -> dict:
+    """Extract resume details using Azure OpenAI with vision capabilities.
 
+    `images` is either a list of PIL Images or the path of a PDF. For a path,
+    pages are rendered, encoded and written to the request body one at a time.
+    `tier` picks the deployment tier and output budget (see TIER_MAX_TOKENS);
+    `known_fields` are left out as in extract_resume_details_with_azure.
+    """
     system_prompt = (
         "You are an expert resume parser. Extract the following fields from the resume:\n"
-        "- name\n"
-        "- email\n"
-        "- mobile\n"
-        "- links (extract all professional links like GitHub, LinkedIn, portfolio websites, personal websites. Return as array of objects with 'type' and 'url' keys. For example: [{'type': 'GitHub', 'url': 'https://github.com/username'}, {'type': 'LinkedIn', 'url': 'https://linkedin.com/in/username'}, {'type': 'Portfolio', 'url': 'https://portfolio.com'}])\n"
-        "- skills (group related skills together, and return as a list of objects with category as the key and related skills as the value. For example: [{ 'Programming Languages': ['Java', 'C++'] }, { 'Cloud': ['AWS', 'Docker'] }])\n"
-        "- education (recently passed degree/institution)\n"
-        "- professional_experience (CRITICAL: Summarize to fit EXACTLY 1000 characters or less. This must be concise but comprehensive, covering key achievements and technologies. Format as array: ['point1','point2',..])\n"
-        "- certifications (as a list\check for certifications with images eg: microsoft certified Technology specialist)\n"
-        "- experience_data (as a list of objects with each object containing the following keys: 'company', 'startDate', 'endDate', 'role', 'clientEngagement', 'program', and 'responsibilities' which is a list of bullet points describing duties)\n"
-        "- summary (brief professional summary)\n"
-        "\nCRITICAL INSTRUCTIONS FOR EXPERIENCE DATA EXTRACTION:\n"
-        "- EXTRACT EVERY SINGLE ROW from ALL experience tables across ALL pages\n"
-        "- Each table row represents a separate job/role and should be a separate object in the experience_data array\n"
-        "- Do NOT skip any rows - process EVERY visible row in experience tables\n"
-        "- If a company appears multiple times with different roles, create separate objects for EACH role\n"
-        "- Look for tables with columns like: Role, Location, Domain, Duration, Key Projects\n"
-        "- Parse ALL rows from top to bottom, including partially visible rows\n"
-        "- For multi-page tables, ensure you capture continuation rows on subsequent pages\n"
-        "- If you see only partial information in a row, still include it as a separate entry\n"
-        "- Pay special attention to table borders and row separators to identify individual entries\n"
-        "- Count the number of rows you process and ensure you capture ALL visible experience entries\n\n"
-        "PROFESSIONAL EXPERIENCE SUMMARIZATION:\n"
-        "- The professional_experience field MUST be summarized to fit within 1000 characters total (including all array elements)\n"
-        "- Prioritize most important achievements, technologies, and impact\n"
-        "- Use concise language while maintaining key information\n"
-        "- Focus on quantifiable results and technical skills\n\n"
-        "LINK EXTRACTION GUIDELINES:\n"
-        "- Look for URLs starting with http://, https://, www.\n"
-        "- Identify GitHub profiles (github.com)\n"
-        "- Identify LinkedIn profiles (linkedin.com/in/)\n"
-        "- Identify portfolio/personal websites\n"
-        "- Look for links in headers, footers, contact sections\n"
-        "- Clean and format URLs properly\n"
-        "- Categorize links by type (GitHub, LinkedIn, Portfolio, Website, etc.)\n"
-        "- Extract clickable links and hyperlinked text\n\n"
-        "TABLE PARSING STRATEGY:\n"
-        "1. Identify ALL tables containing work experience information\n"
-        "2. Process each table row by row from top to bottom\n"
-        "3. Extract data from each column for every row\n"
-        "4. Create a separate experience_data object for each row\n"
-        "5. Continue processing on subsequent pages if tables span multiple pages\n\n"
-        "Return the data as valid JSON. If there is no data available for a section, try to infer it from the resume. If not possible, return 'Not available' for that section."
+        + field_list_prompt(RESUME_FIELD_PROMPTS, known_fields)
+        + VISION_EXPERIENCE_GUIDELINES
+        + VISION_SUMMARIZATION_GUIDELINES
+        + ("" if "links" in known_fields else VISION_LINK_GUIDELINES)
+        + VISION_TABLE_PARSING_STRATEGY +
+        "Return the data as valid JSON. " + MISSING_DATA_INSTRUCTION
     )
 
     # Process ALL pages for complete coverage of 10-page resumes
-    content = [{"type": "text", "text": "Parse this complete resume. This is a 10-page document. Pay special attention to extracting ALL experience data from ALL table rows across ALL pages. DO NOT miss any rows in experience tables. IMPORTANT: Summarize professional_experience to exactly 1000 characters or less. ALSO EXTRACT ALL PROFESSIONAL LINKS (GitHub, LinkedIn, Portfolio, etc.):"}]
+    content = [{"type": "text", "text": "Parse this complete resume. This is a 10-page document. Pay special attention to extracting ALL experience data from ALL table rows across ALL pages. DO NOT miss any rows in experience tables. IMPORTANT: Summarize professional_experience to exactly 1000 characters or less." + ("" if "links" in known_fields else " ALSO EXTRACT ALL PROFESSIONAL LINKS (GitHub, LinkedIn, Portfolio, etc.):")}]
     
     # Process ALL pages (up to 10 for complete coverage)
-    max_pages = min(10, len(images))
-    print(f"Processing ALL {max_pages} pages out of {len(images)} total pages for comprehensive vision analysis")
-    
-    for i, image in enumerate(images[:max_pages]):
-        base64_image = image_to_base64(image)
-        content.append({
-            "type": "image_url", 
-            "image_url": {"url": f"data:image/png;base64,{base64_image}"}
-        })
-        print(f"Added page {i+1} to vision processing for complete table extraction")
+    if isinstance(images, str):
+        png_pages = iter_pdf_page_png(images, max_pages=VISION_MAX_PAGES, cancel_token=cancel_token)
+    else:
+        png_pages = (image_to_png_bytes(image) for image in images[:VISION_MAX_PAGES])
         
     payload = {
         "messages": [
@@ -337,23 +668,191 @@ def extract_resume_details_with_azure_vision(images: list) -> dict:
             {"role": "user", "content": content}
         ],
         "temperature": 0.05,  # Very low temperature for maximum consistency
-        "max_tokens": 12000   # Increased token limit significantly for longer responses
+        "max_tokens": max_tokens(tier, "vision", known_fields)   # 12000 on the large tier, for long responses
     }
 
-    try:
-        response = httpx.post(url, headers=headers, json=payload, timeout=180.0)  # Increased timeout for all pages
-        response.raise_for_status()
-        try:
-            data = response.json()
-            extracted_content = data["choices"][0]["message"]["content"]
-            print(f"Azure Vision API response length: {len(extracted_content)} characters")
-            return extracted_content
-        except Exception as json_error:
-            print("Raw response text:", response.text)
-            raise RuntimeError(f"Failed to parse JSON: {json_error}")
-    except httpx.HTTPStatusError as e:
-        print("Azure returned an HTTP error:", e.response.text)
-        raise RuntimeError(f"Request failed with status {e.response.status_code}: {e.response.text}")
+    # Spool the body to disk page by page rather than holding every page's base64 in memory
+    with tempfile.TemporaryFile() as body_file:
+        pages = write_vision_request_body(body_file, payload, png_pages)
+        logger.debug(f"Vision request body: {pages} pages, {body_file.tell()} bytes")
+        extracted_content = post_chat_completion(payload, timeout=180.0, method="vision", body_file=body_file, cancel_token=cancel_token, tier=tier)  # Increased timeout for all pages
+    logger.info(f"Azure Vision API response length: {len(extracted_content)} characters")
+    return extracted_content
+
+# Section mode: the fields are split into independent prompts sent concurrently,
+# so the slowest section rather than the whole JSON sets the wall-clock time
+RESUME_SECTIONS = {
+    "profile": ("name", "email", "mobile", "links", "education", "professional_experience", "summary"),
+    "skills": ("skills",),
+    "experience": ("experience_data",),
+    "certifications": ("certifications",),
+}
+# Output budget per section; experience_data keeps the tier's whole budget
+SECTION_MAX_TOKENS = {"profile": 2500, "skills": 1500, "certifications": 1000}
+
+def section_system_prompt(section: str, vision: bool, known_fields: tuple = ()) -> str:
+    fields = [field for field in RESUME_SECTIONS[section] if field not in known_fields]
+    guidelines = ""
+    if section == "experience" and vision:
+        guidelines = VISION_EXPERIENCE_GUIDELINES + VISION_TABLE_PARSING_STRATEGY
+    elif section == "profile":
+        guidelines = "\n" + VISION_SUMMARIZATION_GUIDELINES
+        if "links" in fields:
+            guidelines += VISION_LINK_GUIDELINES if vision else TEXT_LINK_GUIDELINES.lstrip("\n") + "\n"
+    return (
+        "You are an expert resume parser. Extract ONLY the following fields from the resume "
+        "(the other fields are extracted separately):\n"
+        + field_list_prompt(fields)
+        + guidelines +
+        "Return the data as valid JSON with exactly these keys. " + MISSING_DATA_INSTRUCTION
+    )
+
+def extract_resume_sections_with_azure(source: str, vision: bool, cancel_token: CancelToken = None,
+                                       tier: str = "large", known_fields: tuple = ()) -> dict:
+    """Parse a resume with one concurrent request per section of RESUME_SECTIONS and merge the JSON.
+
+    `source` is the path of a PDF for vision, or the resume text. Page images
+    are rendered and encoded once and copied into each section's request body.
+    Returns the merged parse in the usual field order, with None for
+    `known_fields`; any section failing fails the whole parse (and cancels the
+    others).
+    """
+    kind = "vision" if vision else "text"
+    token = cancel_token or CancelToken()
+    sections = [section for section in RESUME_SECTIONS if any(field not in known_fields for field in RESUME_SECTIONS[section])]
+
+    def payload_for(section: str) -> dict:
+        if vision:
+            content = [{"type": "text", "text": "Parse this resume. The attached images are ALL its pages."}]
+        else:
+            content = f"Resume Text:\n{source}"
+        budget = max_tokens(tier, kind) if section == "experience" else min(SECTION_MAX_TOKENS[section], max_tokens(tier, kind))
+        if section == "profile":
+            budget -= sum(CONTACT_FIELD_TOKENS.get(field, 0) for field in known_fields)
+        return {
+            "messages": [
+                {"role": "system", "content": section_system_prompt(section, vision, known_fields)},
+                {"role": "user", "content": content}
+            ],
+            "temperature": 0.05,
+            "max_tokens": budget
+        }
+
+    with contextlib.ExitStack() as stack:
+        body_files = {}
+        if vision:
+            images_file = stack.enter_context(tempfile.TemporaryFile())
+            pages = write_page_images(images_file, iter_pdf_page_png(source, max_pages=VISION_MAX_PAGES, cancel_token=cancel_token))
+            logger.debug(f"Section requests: {len(sections)} sections, {pages} pages, {images_file.tell()} bytes of images each")
+            for section in sections:
+                body_files[section] = stack.enter_context(tempfile.TemporaryFile())
+                write_request_body_with_images(body_files[section], payload_for(section), images_file)
+
+        def request(section: str):
+            def call(section_token: CancelToken) -> dict:
+                content = post_chat_completion(
+                    payload_for(section), timeout=180.0 if vision else 50.0, method=f"{kind}_sections",
+                    body_file=body_files.get(section), cancel_token=section_token, tier=tier
+                )
+                return clean_json_string(content)
+            return call
+
+        results = gather({section: request(section) for section in sections}, token)
+
+    parsed = {}
+    for field in RESUME_FIELD_PROMPTS:
+        if field in known_fields:
+            parsed[field] = None  # keeps the field order; the caller fills it in
+            continue
+        section = next(section for section in sections if field in RESUME_SECTIONS[section])
+        parsed[field] = results[section].get(field, "Not available")
+    logger.info(f"Merged {len(sections)} section responses ({kind})")
+    return parsed
+
+def update_resume_details_with_azure(previous: dict, removed_lines: list, added_lines: list, cancel_token: CancelToken = None,
+                                     tier: str = "large") -> str:
+    """Re-parse only what changed: apply a text diff to the JSON extracted from an earlier version.
+
+    The request carries the previous result and the changed lines instead of the
+    whole document, so its cost follows the size of the change.
+    """
+    system_prompt = (
+        "You are an expert resume parser. You are given the structured JSON extracted from a previous "
+        "version of a resume, and the lines that were removed from and added to the resume's text in "
+        "its new version.\n"
+        "Apply the changes and return the complete updated JSON with exactly the same keys and structure. "
+        "Leave everything the changes don't affect exactly as it is. If a removed line and an added line "
+        "are two versions of the same line, update the corresponding value rather than adding a new entry.\n"
+        "The professional_experience field MUST stay within 1000 characters total.\n"
+        "Return the data as valid JSON."
+    )
+
+    user_prompt = (
+        f"Previous JSON:\n{json.dumps(previous, ensure_ascii=False)}\n\n"
+        "Removed lines:\n" + ("\n".join(removed_lines) or "(none)") + "\n\n"
+        "Added lines:\n" + ("\n".join(added_lines) or "(none)")
+    )
+
+    payload = {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": 0.05,
+        "max_tokens": max_tokens(tier, "text")
+    }
+
+    return post_chat_completion(payload, timeout=50.0, method="delta", cancel_token=cancel_token, tier=tier)
+
+def update_resume_pages_with_azure_vision(pdf_path: str, previous: dict, changed_pages: list, previous_page_texts: dict,
+                                          cancel_token: CancelToken = None, tier: str = "large") -> str:
+    """Re-extract only the changed pages of a new version and merge them into the previous JSON.
+
+    `changed_pages` are 0-based page numbers of `pdf_path`; only those are
+    rendered and sent. `previous_page_texts` maps a page number to the text that
+    page had in the previous version (missing for pages that are new).
+    """
+    system_prompt = (
+        "You are an expert resume parser. You are given the structured JSON extracted from a previous "
+        "version of a resume, and images of the pages that changed in its new version. Every other page "
+        "is unchanged.\n"
+        "Replace the information that came from the previous version of each changed page with what the "
+        "attached page shows, and return the complete updated JSON with exactly the same keys and structure. "
+        "Leave everything that came from unchanged pages exactly as it is.\n"
+        "- Extract EVERY row of experience tables on the attached pages as a separate experience_data entry, "
+        "including rows continuing a table from an earlier page\n"
+        "- The professional_experience field MUST stay within 1000 characters total\n"
+        "Return the data as valid JSON."
+    )
+
+    page_notes = []
+    for page_num in changed_pages:
+        old_text = previous_page_texts.get(page_num)
+        if old_text is None:
+            page_notes.append(f"Page {page_num + 1} is new.")
+        else:
+            page_notes.append(f"Previous text of page {page_num + 1}:\n{old_text or '(no text layer)'}")
+    content = [{"type": "text", "text": (
+        f"Previous JSON:\n{json.dumps(previous, ensure_ascii=False)}\n\n"
+        f"The attached images are pages {', '.join(str(page_num + 1) for page_num in changed_pages)} of the new version.\n\n"
+        + "\n\n".join(page_notes)
+    )}]
+
+    payload = {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": content}
+        ],
+        "temperature": 0.05,
+        "max_tokens": max_tokens(tier, "vision")
+    }
+
+    png_pages = iter_pdf_page_png(pdf_path, cancel_token=cancel_token, page_numbers=changed_pages)
+    with tempfile.TemporaryFile() as body_file:
+        pages = write_vision_request_body(body_file, payload, png_pages)
+        logger.debug(f"Page update request body: {pages} pages, {body_file.tell()} bytes")
+        return post_chat_completion(payload, timeout=180.0, method="vision_pages", body_file=body_file, cancel_token=cancel_token,
+                                    tier=tier)
 
 def clean_json_string(raw: str):
     # Remove triple backticks and language hint (```json)
@@ -367,7 +866,7 @@ def validate_professional_experience_length(data: dict) -> dict:
         total_length = sum(len(str(item)) for item in data['professional_experience'])
         
         if total_length > 1000:
-            print(f"Professional experience too long ({total_length} chars), truncating to 1000 chars")
+            logger.info(f"Professional experience too long ({total_length} chars), truncating to 1000 chars")
             
             # Truncate items to fit within 1000 characters
             truncated_items = []
@@ -387,7 +886,7 @@ def validate_professional_experience_length(data: dict) -> dict:
                     break
             
             data['professional_experience'] = truncated_items
-            print(f"Truncated to {len(truncated_items)} items, total length: {sum(len(str(item)) for item in truncated_items)} chars")
+            logger.debug(f"Truncated to {len(truncated_items)} items, total length: {sum(len(str(item)) for item in truncated_items)} chars")
     
     # Validate and clean links
     if 'links' in data and isinstance(data['links'], list):
@@ -410,52 +909,57 @@ def validate_professional_experience_length(data: dict) -> dict:
                     })
         
         data['links'] = validated_links
-        print(f"Validated {len(validated_links)} links")
+        logger.debug(f"Validated {len(validated_links)} links")
     
     return data
 
 # New function for processing multiple files
 def process_multiple_files(file_paths: list, use_vision: bool = True) -> list:
-    """Process multiple resume files and return combined results"""
+    """Process multiple resume files and return combined results.
+
+    Each file starts from `use_vision`; a fallback to text only applies to the file it happened on.
+    """
     results = []
     
     for file_path in file_paths:
+        file_use_vision = use_vision
         try:
             file_extension = os.path.splitext(file_path)[1].lower()
             converted_pdf_path = None
             
             # Convert DOCX to PDF if using vision processing
-            if file_extension in ['.doc', '.docx'] and use_vision:
+            if file_extension in ['.doc', '.docx'] and file_use_vision:
                 try:
                     converted_pdf_path = convert_docx_to_pdf(file_path)
                     file_extension = '.pdf'
                     processing_path = converted_pdf_path
                 except Exception as e:
-                    print(f"DOCX to PDF conversion failed for {file_path}, falling back to text-based processing: {str(e)}")
-                    use_vision = False
+                    logger.warning(f"DOCX to PDF conversion failed for {file_path}, falling back to text-based processing: {str(e)}")
+                    file_use_vision = False
                     processing_path = file_path
             else:
                 processing_path = file_path
             
             # Process using vision or text-based approach
-            if use_vision and file_extension == '.pdf':
+            if file_use_vision and file_extension == '.pdf':
                 try:
-                    images = convert_pdf_to_images(processing_path)
-                    extracted = extract_resume_details_with_azure_vision(images)
+                    extracted = extract_resume_details_with_azure_vision(processing_path)
                     parsed = clean_json_string(extracted)
                     parsed = validate_professional_experience_length(parsed)
                     processing_method = "vision"
                 except Exception as e:
-                    print(f"Vision processing failed for {file_path}, falling back to text-based: {str(e)}")
-                    use_vision = False
+                    logger.warning(f"Vision processing failed for {file_path}, falling back to text-based: {str(e)}")
+                    file_use_vision = False
             
-            if not use_vision:
-                if file_extension == '.pdf':
+            if not file_use_vision:
+                # Read the original file, not the converted PDF
+                original_extension = os.path.splitext(file_path)[1].lower()
+                if original_extension == '.pdf':
                     text = extract_text_from_pdf(file_path)
-                elif file_extension in ['.doc', '.docx']:
+                elif original_extension in ['.doc', '.docx']:
                     text = extract_text_from_docx(file_path)
                 else:
-                    raise Exception(f"Unsupported file type: {file_extension}")
+                    raise Exception(f"Unsupported file type: {original_extension}")
                 
                 extracted = extract_resume_details_with_azure(text)
                 parsed = clean_json_string(extracted)
@@ -472,7 +976,7 @@ def process_multiple_files(file_paths: list, use_vision: bool = True) -> list:
                 os.remove(converted_pdf_path)
                 
         except Exception as e:
-            print(f"Error processing file {file_path}: {str(e)}")
+            logger.error(f"Error processing file {file_path}: {str(e)}")
             results.append({
                 'filename': os.path.basename(file_path),
                 'error': str(e),
@@ -0,0 +1,187 @@
+"""In-process task scheduler: a bounded thread pool with priority lanes and per-user fairness.
+
+Work is submitted to a lane ("interactive" for single uploads, "bulk" for the
+files of a batch). When a thread frees up, lanes are picked by stride
+scheduling using their weights, and within a lane the user with the least
+service so far goes next. So one user's 100-file batch is interleaved with
+other users' files instead of running ahead of them. Bulk work may never
+occupy the slots reserved for the interactive lane.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Set
+
+from app.config import (
+    SCHEDULER_BULK_WEIGHT,
+    SCHEDULER_INTERACTIVE_WEIGHT,
+    SCHEDULER_RESERVED_INTERACTIVE,
+    SCHEDULER_USER_WEIGHTS,
+    SCHEDULER_WORKERS
+)
+from app.services.metrics import Gauge, STAGE_DURATION
+from utils.logger import get_logger
+
+logger = get_logger("scheduler")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+SCHEDULER_QUEUE_DEPTH = Gauge("resume_scheduler_queue_depth", "Work items waiting in each scheduler lane", ("lane",))
+SCHEDULER_RUNNING = Gauge("resume_scheduler_running", "Work items running in each scheduler lane", ("lane",))
+
+
+class _WorkItem:
+    __slots__ = ("function", "args", "future", "user_id", "lane", "tag", "enqueued_at")
+
+    def __init__(self, function, args, lane, user_id, tag):
+        self.function = function
+        self.args = args
+        self.future = Future()
+        self.lane = lane
+        self.user_id = user_id
+        self.tag = tag
+        self.enqueued_at = time.perf_counter()
+
+
+class _Lane:
+    """Per-user FIFO queues served in order of each user's virtual time"""
+
+    def __init__(self, name: str, weight: float, max_running: int):
+        self.name = name
+        self.weight = weight
+        self.max_running = max_running
+        self.running = 0
+        self.pass_value = 0.0  # the lane's position in the cross-lane stride schedule
+        self.queues: Dict[str, deque] = {}
+        self.user_pass: Dict[str, float] = {}
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def push(self, item: _WorkItem):
+        if item.user_id not in self.queues:
+            # A user joining (or returning) starts level with the least-served active
+            # user, so idle time can't be banked and spent as a burst later
+            self.user_pass[item.user_id] = min(self.user_pass.values(), default=0.0)
+            self.queues[item.user_id] = deque()
+        self.queues[item.user_id].append(item)
+
+    def pop(self, user_weights: Dict[str, float]) -> _WorkItem:
+        user_id = min(self.queues, key=lambda user: self.user_pass[user])
+        queue = self.queues[user_id]
+        item = queue.popleft()
+        self.user_pass[user_id] += 1.0 / user_weights.get(user_id, 1.0)
+        if not queue:
+            del self.queues[user_id]
+            del self.user_pass[user_id]
+        return item
+
+    def remove(self, predicate: Callable[[_WorkItem], bool]) -> list:
+        removed = []
+        for user_id in list(self.queues):
+            queue = self.queues[user_id]
+            kept = deque(item for item in queue if not predicate(item))
+            removed.extend(item for item in queue if predicate(item))
+            if kept:
+                self.queues[user_id] = kept
+            else:
+                del self.queues[user_id]
+                del self.user_pass[user_id]
+        return removed
+
+
+class FairScheduler:
+    def __init__(self, workers: int, lane_weights: Dict[str, float], reserved_interactive: int = 1,
+                 user_weights: Optional[Dict[str, float]] = None):
+        self.workers = workers
+        self.user_weights = user_weights or {}
+        bulk_slots = max(1, workers - reserved_interactive)
+        self.lanes = {
+            INTERACTIVE: _Lane(INTERACTIVE, lane_weights.get(INTERACTIVE, 1.0), workers),
+            BULK: _Lane(BULK, lane_weights.get(BULK, 1.0), bulk_slots),
+        }
+        self._condition = threading.Condition()
+        self._threads = []
+        for lane in self.lanes.values():
+            SCHEDULER_QUEUE_DEPTH.set(0, lane=lane.name)
+            SCHEDULER_RUNNING.set(0, lane=lane.name)
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"scheduler-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, lane: str, user_id: Optional[str], function: Callable, *args, tag: Hashable = None) -> Future:
+        """Queue `function(*args)`; `tag` (e.g. the task_id) lets queued work be withdrawn"""
+        item = _WorkItem(function, args, lane, user_id or "anonymous", tag)
+        with self._condition:
+            self._ensure_started()
+            target = self.lanes[lane]
+            if not len(target):
+                # A lane that sat idle rejoins level with the busy lanes instead of
+                # catching up on the turns it didn't need
+                busy = [other.pass_value for other in self.lanes.values() if len(other)]
+                target.pass_value = max(target.pass_value, min(busy, default=target.pass_value))
+            target.push(item)
+            SCHEDULER_QUEUE_DEPTH.set(len(target), lane=lane)
+            self._condition.notify()
+        return item.future
+
+    def withdraw(self, tags: Set[Hashable]) -> list:
+        """Drop queued (not yet started) work whose tag is in `tags`; returns the dropped tags"""
+        with self._condition:
+            removed = []
+            for lane in self.lanes.values():
+                removed.extend(lane.remove(lambda item: item.tag in tags))
+                SCHEDULER_QUEUE_DEPTH.set(len(lane), lane=lane.name)
+        for item in removed:
+            item.future.cancel()
+        return [item.tag for item in removed]
+
+    def _next_item(self) -> Optional[_WorkItem]:
+        """Pick from the runnable lane with the lowest stride pass (caller holds the lock)"""
+        runnable = [lane for lane in self.lanes.values() if len(lane) and lane.running < lane.max_running]
+        if not runnable:
+            return None
+        lane = min(runnable, key=lambda candidate: candidate.pass_value)
+        lane.pass_value += 1.0 / lane.weight
+        lane.running += 1
+        item = lane.pop(self.user_weights)
+        SCHEDULER_QUEUE_DEPTH.set(len(lane), lane=lane.name)
+        SCHEDULER_RUNNING.set(lane.running, lane=lane.name)
+        return item
+
+    def _run(self):
+        while True:
+            with self._condition:
+                item = self._next_item()
+                while item is None:
+                    self._condition.wait()
+                    item = self._next_item()
+
+            STAGE_DURATION.observe(time.perf_counter() - item.enqueued_at, stage="scheduler_wait", method=item.lane)
+            try:
+                if item.future.set_running_or_notify_cancel():
+                    item.future.set_result(item.function(*item.args))
+            except BaseException as e:
+                logger.exception("Scheduled work failed", extra={"task_id": item.tag, "lane": item.lane})
+                item.future.set_exception(e)
+            finally:
+                with self._condition:
+                    lane = self.lanes[item.lane]
+                    lane.running -= 1
+                    SCHEDULER_RUNNING.set(lane.running, lane=lane.name)
+                    self._condition.notify()
+
+
+scheduler = FairScheduler(
+    SCHEDULER_WORKERS,
+    {INTERACTIVE: SCHEDULER_INTERACTIVE_WEIGHT, BULK: SCHEDULER_BULK_WEIGHT},
+    reserved_interactive=SCHEDULER_RESERVED_INTERACTIVE,
+    user_weights=SCHEDULER_USER_WEIGHTS,
+)
@@ -0,0 +1,126 @@
+"""Warm-up of the slow-to-initialize dependencies, run in the background after startup.
+
+The heavy libraries are imported lazily (see resume_parser), so the process
+starts serving quickly; this loads them and initializes the database
+connection, the PDF renderer, the HTTP client and the DOCX converter before the
+first upload needs them. Readiness reports which components are done, so a
+load balancer can hold traffic back until the first request won't pay for
+them (GET /ready).
+"""
+import platform
+import shutil
+import threading
+import time
+from typing import Callable, Dict
+
+from sqlalchemy import text
+
+from app.services.metrics import Gauge
+from utils.logger import get_logger
+
+logger = get_logger("warmup")
+
+WARMUP_SECONDS = Gauge("resume_warmup_seconds", "Time taken to warm up each component at startup", ("component",))
+
+# The converter is optional: DOCX uploads fall back to text extraction without it
+OPTIONAL_COMPONENTS = {"converter"}
+
+_state: Dict[str, dict] = {}
+_lock = threading.Lock()
+_thread = None
+
+
+def _warm_database():
+    from app.database import engine
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+def _warm_pdf():
+    import fitz  # PyMuPDF
+    import PyPDF2  # noqa: F401
+    from docx import Document  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+    # Rendering one page initializes MuPDF's fonts and colorspaces
+    document = fitz.open()
+    try:
+        page = document.new_page(width=72, height=72)
+        page.insert_text((10, 40), "warm-up")
+        page.get_pixmap().tobytes("png")
+    finally:
+        document.close()
+
+
+def _warm_http():
+    from app.services import http_client
+
+    http_client.shared_client()
+
+
+def _warm_converter() -> str:
+    from app.services.resume_parser import _load_aspose_words
+
+    try:
+        _load_aspose_words()
+        return "aspose"
+    except ImportError:
+        pass
+    if platform.system().lower() == "linux" and shutil.which("libreoffice"):
+        return "libreoffice"
+    raise RuntimeError("No DOCX to PDF converter available")
+
+
+COMPONENTS: Dict[str, Callable] = {
+    "database": _warm_database,
+    "pdf": _warm_pdf,
+    "http": _warm_http,
+    "converter": _warm_converter,
+}
+
+
+def run():
+    """Warm up every component in turn, recording the outcome and time of each"""
+    for name, warm in COMPONENTS.items():
+        with _lock:
+            _state[name] = {"status": "warming"}
+        started = time.perf_counter()
+        try:
+            detail = warm()
+            record = {"status": "ready"}
+            if detail:
+                record["detail"] = detail
+        except Exception as e:
+            level = logger.info if name in OPTIONAL_COMPONENTS else logger.error
+            level(f"Warm-up of {name} failed: {e}")
+            record = {"status": "unavailable" if name in OPTIONAL_COMPONENTS else "failed", "detail": str(e)}
+        seconds = time.perf_counter() - started
+        record["seconds"] = round(seconds, 4)
+        WARMUP_SECONDS.set(seconds, component=name)
+        with _lock:
+            _state[name] = record
+    logger.info("Warm-up finished", extra={"components": status()["components"]})
+
+
+def start():
+    """Run the warm-up in a background thread (once per process)"""
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        for name in COMPONENTS:
+            _state[name] = {"status": "pending"}
+        _thread = threading.Thread(target=run, name="warmup", daemon=True)
+    _thread.start()
+
+
+def status() -> dict:
+    """{"ready": bool, "components": {...}}; ready once every required component is warmed"""
+    with _lock:
+        components = {name: dict(record) for name, record in _state.items()}
+    ready = bool(components) and all(
+        record["status"] == "ready" or (name in OPTIONAL_COMPONENTS and record["status"] == "unavailable")
+        for name, record in components.items()
+    )
+    return {"ready": ready, "components": components}
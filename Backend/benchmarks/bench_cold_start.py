@@ -0,0 +1,120 @@
+"""Cold-start cost: importing the app, and time until the server answers and is warm.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_cold_start --runs 5
+
+"import" is the wall time of `import main` in a fresh interpreter (median of
+--runs), followed by the slowest modules from `python -X importtime`.
+"first response" spawns uvicorn and measures until GET /metrics first returns
+200 (the app is serving) and until GET /ready does (the warm-up is done).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_seconds() -> float:
+    code = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=BACKEND_DIR)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def _top_imports(limit: int) -> list:
+    """(cumulative ms, module) of the slowest first-level-or-app imports under `import main`"""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            capture_output=True, text=True, check=True, cwd=BACKEND_DIR).stderr
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_200(url: str, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def _first_response(timeout: float) -> dict:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        result = {}
+        for name, path in (("serving_seconds", "/metrics"), ("ready_seconds", "/ready")):
+            ok = _wait_for_200(f"http://127.0.0.1:{port}{path}", started + timeout)
+            result[name] = round(time.perf_counter() - started, 3) if ok else None
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1) as response:
+                result["components"] = json.loads(response.read())["components"]
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="how many of the slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    import_runs = [_import_seconds() for _ in range(args.runs)]
+    results = {"import_median_seconds": round(statistics.median(import_runs), 3),
+               "import_runs": [round(seconds, 3) for seconds in import_runs]}
+    print(f"import main      median {results['import_median_seconds'] * 1000:.0f} ms over {args.runs} runs")
+
+    results["top_imports"] = _top_imports(args.top)
+    for milliseconds, name in results["top_imports"]:
+        print(f"  {milliseconds:>8.1f} ms  {name}")
+
+    first = [_first_response(args.timeout) for _ in range(args.runs)]
+    for key, label in (("serving_seconds", "first 200 /metrics"), ("ready_seconds", "first 200 /ready")):
+        values = [run[key] for run in first if run.get(key) is not None]
+        results[key] = round(statistics.median(values), 3) if values else None
+        print(f"{label:<16} median {results[key] * 1000:.0f} ms" if values else f"{label:<16} timed out")
+    results["components"] = first[-1].get("components")
+    if results["components"]:
+        for name, record in results["components"].items():
+            print(f"  {name:<10} {record['status']:<12} {record.get('seconds', 0) * 1000:>7.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
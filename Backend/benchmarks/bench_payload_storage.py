@@ -0,0 +1,99 @@
+"""Database size and scan time with resume_data inline vs in compressed resume_payloads.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_payload_storage --rows 2000
+
+Builds a scratch SQLite database with --rows history rows in the old layout,
+where the parsed JSON (synthetic, shaped like real output) is inline in
+resume_history. Then measures:
+- the file size
+- a scan of the history list (every row, as GET /history loads them)
+- opening --details rows one by one (the detail view, which reads resume_data)
+It then runs the payload migration and VACUUM, and measures the same again.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import ResumeHistory
+from app.services import payloads
+from benchmarks.corpus import synthetic_llm_output
+
+
+def _fill(session, rows: int):
+    for index in range(rows):
+        text = synthetic_llm_output(experience_entries=2 + index % 6, seed=index)
+        parsed = json.loads(text.strip("`").removeprefix("json"))
+        session.add(ResumeHistory(filename=f"resume_{index}.pdf", inline_data=parsed, file_size=50_000 + index,
+                                  status="completed", original_file_type=".pdf", processing_method="text"))
+        if index % 500 == 499:
+            session.commit()
+    session.commit()
+
+
+def _measure(Session, path: str, ids: list, details: int) -> dict:
+    session = Session()
+    started = time.perf_counter()
+    listed = session.query(ResumeHistory).order_by(ResumeHistory.processed_at.desc()).all()
+    scan = time.perf_counter() - started
+    session.close()
+
+    session = Session()
+    started = time.perf_counter()
+    for resume_id in random.Random(0).sample(ids, min(details, len(ids))):
+        session.get(ResumeHistory, resume_id).resume_data
+    detail = time.perf_counter() - started
+    session.close()
+    return {"file_bytes": os.path.getsize(path), "rows": len(listed),
+            "scan_seconds": round(scan, 4), "detail_seconds": round(detail, 4)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--details", type=int, default=200, help="how many detail views to time")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "payloads.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        session = Session()
+        _fill(session, args.rows)
+        ids = [row.id for row in session.query(ResumeHistory.id)]
+        session.close()
+
+        results = {"codec": payloads.codec(), "inline": _measure(Session, path, ids, args.details)}
+        session = Session()
+        results["migration"] = payloads.migrate(session)
+        session.close()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("VACUUM")
+        results["compressed"] = _measure(Session, path, ids, args.details)
+        engine.dispose()
+
+    print(f"{args.rows} rows, codec {results['codec']}")
+    print(f"{'':<12}{'file MB':>10}{'list scan ms':>15}{f'{args.details} details ms':>18}")
+    for key in ("inline", "compressed"):
+        run = results[key]
+        print(f"{key:<12}{run['file_bytes'] / 1e6:>10.2f}{run['scan_seconds'] * 1000:>15.1f}{run['detail_seconds'] * 1000:>18.1f}")
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Peak RSS of building the vision request body: all pages at once vs streamed.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_vision_memory --pages 1 5 10
+
+Each variant runs in a fresh subprocess so its RSS high-water mark is not
+polluted by the other. "materialized" reproduces the previous pipeline: a list
+of 300-DPI PIL images, a base64 string per page and the whole JSON payload in
+memory. "streamed" is write_vision_request_body over iter_pdf_page_png.
+
+Peak RSS over the import baseline on the benchmark corpus (Linux, PyMuPDF 1.28):
+    pages   text: materialized  streamed   scanned: materialized  streamed
+      1              +89 MB      +55 MB               +92 MB      +57 MB
+      5             +237 MB      +55 MB              +240 MB      +63 MB
+     10             +397 MB      +55 MB              +444 MB      +63 MB
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.corpus import build_corpus
+from benchmarks.run_benchmarks import DEFAULT_CORPUS_DIR, _peak_rss_mb
+
+
+def _materialized(path: str) -> int:
+    from app.services.resume_parser import convert_pdf_to_images, image_to_base64
+
+    images = convert_pdf_to_images(path)
+    content = [{"type": "text", "text": "Parse this complete resume."}]
+    for image in images[:10]:
+        content.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_to_base64(image)}"}})
+    body = json.dumps({"messages": [{"role": "user", "content": content}], "max_tokens": 12000}).encode("utf-8")
+    return len(body)
+
+
+def _streamed(path: str) -> int:
+    from app.services.resume_parser import iter_pdf_page_png, write_vision_request_body
+
+    payload = {"messages": [{"role": "user", "content": [{"type": "text", "text": "Parse this complete resume."}]}], "max_tokens": 12000}
+    with tempfile.TemporaryFile() as handle:
+        write_vision_request_body(handle, payload, iter_pdf_page_png(path, max_pages=10))
+        return handle.tell()
+
+
+VARIANTS = {"materialized": _materialized, "streamed": _streamed}
+
+
+def _child(variant: str, path: str):
+    import logging
+    logging.getLogger("resume").setLevel(logging.WARNING)
+    baseline = _peak_rss_mb()
+    body_bytes = VARIANTS[variant](path)
+    print(json.dumps({"baseline_rss_mb": baseline, "peak_rss_mb": _peak_rss_mb(), "body_bytes": body_bytes}))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--shape", default="text", choices=["text", "table", "scanned"])
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(*args.child)
+        return 0
+
+    cases = {case["pages"]: case["path"] for case in build_corpus(args.corpus_dir)
+             if case["format"] == "pdf" and case["shape"] == args.shape}
+    results = []
+    for pages in args.pages:
+        for variant in VARIANTS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_vision_memory", "--child", variant, cases[pages]],
+                capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            ).stdout.strip().splitlines()[-1]
+            result = {"pages": pages, "variant": variant, **json.loads(output)}
+            result["delta_rss_mb"] = round(result["peak_rss_mb"] - result["baseline_rss_mb"], 2)
+            results.append(result)
+            print(f"{pages:>3} pages  {variant:<13} peak {result['peak_rss_mb']:>8.1f} MB  "
+                  f"(+{result['delta_rss_mb']:.1f} MB over import)  body {result['body_bytes'] / 1e6:.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
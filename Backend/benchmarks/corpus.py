@@ -0,0 +1,173 @@
+"""Deterministic synthetic resume corpus for the benchmarks.
+
+Generates PDFs and DOCX files in the shapes we see in production: plain text,
+table-heavy experience sections and scanned (image-only) pages, at 1-20 pages.
+"""
+import json
+import os
+import random
+
+import fitz  # PyMuPDF
+from docx import Document
+
+PAGE_COUNTS = (1, 5, 10, 20)
+
+# Sentences that still fit on a letter page at fontsize 9 inside TEXT_RECT
+SENTENCES_PER_PAGE = 24
+TEXT_RECT = fitz.Rect(54, 54, 558, 738)
+
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Stark Industries", "Wayne Enterprises", "Hooli", "Vandelay"]
+ROLES = ["Software Engineer", "Senior Consultant", "Data Analyst", "Tech Lead", "Solutions Architect", "QA Engineer"]
+SKILLS = ["Python", "Java", "AWS", "Azure", "Docker", "Kubernetes", "SQL", "React", "Terraform", "Spark"]
+WORDS = (
+    "designed implemented delivered migrated optimized automated led mentored platform pipeline service "
+    "latency throughput reliability customers stakeholders reporting dashboards integration cloud data"
+).split()
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _experience_rows(rng: random.Random, count: int):
+    for index in range(count):
+        start = 2005 + index % 18
+        yield [
+            rng.choice(COMPANIES),
+            rng.choice(ROLES),
+            f"{start}-01",
+            f"{start + 1}-12",
+            _sentence(rng, 10),
+        ]
+
+
+def _insert_text(page, rect: fitz.Rect, text: str, fontsize: float):
+    """insert_textbox() draws nothing at all when the text overflows, so fail loudly instead"""
+    spare = page.insert_textbox(rect, text, fontsize=fontsize)
+    if spare < 0:
+        raise ValueError(f"Text overflows its box by {-spare:.1f}pt; write less per page")
+
+
+def _text_page(page, rng: random.Random, header: list):
+    _insert_text(page, TEXT_RECT, "\n".join(header + [_sentence(rng) for _ in range(SENTENCES_PER_PAGE)]), 9)
+    if not page.get_text().strip():
+        raise ValueError("Generated text page has no text layer")
+
+
+def _text_pdf(path: str, pages: int, rng: random.Random):
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page()
+        _text_page(page, rng, [f"Jane Candidate - page {page_number + 1}", "jane.candidate@example.com | +1 555 010 0199", ""])
+    document.save(path)
+    document.close()
+
+
+def _table_pdf(path: str, pages: int, rng: random.Random):
+    document = fitz.open()
+    columns = (54, 150, 260, 320, 380, 558)
+    for _ in range(pages):
+        page = document.new_page()
+        y = 54
+        for row in _experience_rows(rng, 18):
+            for left, right, cell in zip(columns, columns[1:], row):
+                rect = fitz.Rect(left, y, right, y + 36)
+                page.draw_rect(rect, width=0.5)
+                _insert_text(page, rect + (2, 2, -2, -2), cell, 7)
+            y += 36
+    document.save(path)
+    document.close()
+
+
+def _scanned_pdf(path: str, pages: int, rng: random.Random):
+    """Render text pages to bitmaps and embed them, so the PDF has no text layer"""
+    source = fitz.open()
+    text_page = source.new_page()
+    _text_page(text_page, rng, [])
+    scan = text_page.get_pixmap(matrix=fitz.Matrix(2, 2), colorspace=fitz.csGRAY).tobytes("png")
+    source.close()
+
+    document = fitz.open()
+    for _ in range(pages):
+        page = document.new_page()
+        page.insert_image(page.rect, stream=scan)
+    document.save(path)
+    document.close()
+
+
+def _text_docx(path: str, pages: int, rng: random.Random):
+    document = Document()
+    document.add_heading("Jane Candidate", 0)
+    for _ in range(pages * 40):
+        document.add_paragraph(_sentence(rng))
+    document.save(path)
+
+
+def _table_docx(path: str, pages: int, rng: random.Random):
+    document = Document()
+    document.add_heading("Professional Experience", 1)
+    table = document.add_table(rows=1, cols=5)
+    for cell, title in zip(table.rows[0].cells, ("Company", "Role", "Start", "End", "Key Projects")):
+        cell.text = title
+    for row in _experience_rows(rng, pages * 18):
+        for cell, value in zip(table.add_row().cells, row):
+            cell.text = value
+    document.save(path)
+
+
+GENERATORS = {
+    ("pdf", "text"): _text_pdf,
+    ("pdf", "table"): _table_pdf,
+    ("pdf", "scanned"): _scanned_pdf,
+    ("docx", "text"): _text_docx,
+    ("docx", "table"): _table_docx,
+}
+
+
+def synthetic_llm_output(experience_entries: int, seed: int = 0) -> str:
+    """A fenced JSON document shaped like the model's response"""
+    rng = random.Random(seed)
+    data = {
+        "name": "Jane Candidate",
+        "email": "jane.candidate@example.com",
+        "mobile": "+1 555 010 0199",
+        "links": [{"type": "GitHub", "url": "github.com/jane"}, {"type": "LinkedIn", "url": "www.linkedin.com/in/jane"}],
+        "skills": [{"Languages": rng.sample(SKILLS, 4)}, {"Cloud": rng.sample(SKILLS, 3)}],
+        "education": "B.Sc. Computer Science",
+        "professional_experience": [_sentence(rng, 30) for _ in range(12)],
+        "certifications": ["Microsoft Certified: Azure Developer Associate"],
+        "experience_data": [
+            {
+                "company": row[0], "startDate": row[2], "endDate": row[3], "role": row[1],
+                "clientEngagement": "Not available", "program": "Not available",
+                "responsibilities": [_sentence(rng) for _ in range(5)],
+            }
+            for row in _experience_rows(rng, experience_entries)
+        ],
+        "summary": _sentence(rng, 40),
+    }
+    return "```json\n" + json.dumps(data, indent=2) + "\n```"
+
+
+def _valid(path: str, extension: str, shape: str) -> bool:
+    """Every page of a text or table PDF has a text layer"""
+    if extension != "pdf" or shape == "scanned":
+        return True
+    with fitz.open(path) as document:
+        return all(page.get_text().strip() for page in document)
+
+
+def build_corpus(directory: str, seed: int = 1234) -> list:
+    """Generate every (format, shape, page count) combination; returns case dicts"""
+    os.makedirs(directory, exist_ok=True)
+    cases = []
+    for (extension, shape), generator in GENERATORS.items():
+        for pages in PAGE_COUNTS:
+            path = os.path.join(directory, f"{shape}_{pages}p.{extension}")
+            # Files left by older versions of this module may have blank text pages
+            if not os.path.exists(path) or not _valid(path, extension, shape):
+                generator(path, pages, random.Random(f"{seed}-{extension}-{shape}-{pages}"))
+                if not _valid(path, extension, shape):
+                    raise ValueError(f"Generated {path} has a page without a text layer")
+            cases.append({"path": path, "format": extension, "shape": shape, "pages": pages})
+    return cases
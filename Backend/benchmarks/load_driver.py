@@ -0,0 +1,143 @@
+"""Drive /resume/upload and /resume/upload-multiple with N concurrent users.
+
+Run the API against benchmarks.mock_azure, then e.g.
+    python -m benchmarks.load_driver --users 20 --uploads-per-user 5
+    python -m benchmarks.load_driver --users 5 --batch-size 10 --output load.json
+
+Every virtual user logs in, uploads, polls /resume/progress until the task
+finishes and records the time to completion. The report covers throughput,
+p50/p95/p99 time-to-complete and error rates.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+
+from benchmarks.corpus import build_corpus
+from benchmarks.run_benchmarks import DEFAULT_CORPUS_DIR
+
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+async def get_token(client: httpx.AsyncClient, username: str, password: str) -> str:
+    credentials = {"username": username, "password": password}
+    await client.post("/auth/register", json=credentials)  # 400 when the user already exists
+    response = await client.post("/auth/login", json=credentials)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def wait_for_task(client, headers, task_id: str, poll_interval: float, timeout: float) -> dict:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        response = await client.get(f"/resume/progress/{task_id}", headers=headers)
+        response.raise_for_status()
+        progress = response.json()
+        if progress["status"] in ("completed", "failed"):
+            return progress
+        await asyncio.sleep(poll_interval)
+    return {"status": "timeout"}
+
+
+async def virtual_user(index: int, args, files: list, token: str, samples: list):
+    rng = random.Random(index)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.request_timeout) as client:
+        for _ in range(args.uploads_per_user):
+            chosen = rng.sample(files, min(len(files), max(1, args.batch_size)))
+            uploads = [
+                ("files" if args.batch_size else "file",
+                 (os.path.basename(path), open(path, "rb").read(), MIME_TYPES[os.path.splitext(path)[1]]))
+                for path in chosen
+            ]
+            endpoint = "/resume/upload-multiple" if args.batch_size else "/resume/upload"
+            started = time.perf_counter()
+            sample = {"user": index, "files": len(uploads)}
+            try:
+                response = await client.post(endpoint, headers=headers, files=uploads, params={"use_vision": args.use_vision})
+                response.raise_for_status()
+                progress = await wait_for_task(client, headers, response.json()["task_id"], args.poll_interval, args.task_timeout)
+                sample["status"] = progress["status"]
+            except httpx.HTTPError as error:
+                sample["status"] = "http_error"
+                sample["error"] = str(error)
+            sample["seconds"] = time.perf_counter() - started
+            samples.append(sample)
+
+
+async def run(args) -> dict:
+    files = [case["path"] for case in build_corpus(args.corpus_dir) if case["pages"] <= args.max_pages]
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.request_timeout) as client:
+        token = await get_token(client, args.username, args.password)
+
+    samples = []
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(index, args, files, token, samples) for index in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    completed = [sample["seconds"] for sample in samples if sample["status"] == "completed"]
+    by_status = {}
+    for sample in samples:
+        by_status[sample["status"]] = by_status.get(sample["status"], 0) + 1
+    files_completed = sum(sample["files"] for sample in samples if sample["status"] == "completed")
+    return {
+        "users": args.users,
+        "uploads": len(samples),
+        "batch_size": args.batch_size,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_tasks_per_second": round(len(completed) / elapsed, 3) if elapsed else None,
+        "throughput_files_per_second": round(files_completed / elapsed, 3) if elapsed else None,
+        "time_to_complete_seconds": {
+            "p50": percentile(completed, 0.50),
+            "p95": percentile(completed, 0.95),
+            "p99": percentile(completed, 0.99),
+            "max": round(max(completed), 3) if completed else None,
+        },
+        "status_counts": by_status,
+        "error_rate": round(1 - len(completed) / len(samples), 4) if samples else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--uploads-per-user", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=0, help="files per /upload-multiple call; 0 uses /upload")
+    parser.add_argument("--use-vision", default="true", choices=["true", "false"])
+    parser.add_argument("--max-pages", type=int, default=5)
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--username", default="loadtest")
+    parser.add_argument("--password", default="loadtest")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--task-timeout", type=float, default=900.0)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
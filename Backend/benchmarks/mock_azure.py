@@ -0,0 +1,142 @@
+"""Local stand-in for the Azure OpenAI chat-completions endpoint.
+
+Point the API at it instead of real Azure, e.g.
+    python -m benchmarks.mock_azure --port 8001 --latency lognormal:1.5,0.4 --rate-429 0.05
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8001/openai/deployments/mock/chat/completions uvicorn main:app
+
+Latency specs: fixed:<s>, uniform:<low>,<high>, lognormal:<mu>,<sigma> (of ln seconds).
+Error injection rates are independent probabilities per request. Answers longer
+than the request's max_tokens (at 4 characters per token) are cut off with
+finish_reason "length", and a continuation request gets the rest.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.corpus import synthetic_llm_output
+
+
+class MockSettings:
+    latency = "fixed:0.5"
+    rate_429 = 0.0
+    rate_5xx = 0.0
+    response_content = synthetic_llm_output(12)
+    seed = None
+
+
+settings = MockSettings()
+rng = random.Random()
+stats = {"requests": 0, "429": 0, "5xx": 0, "ok": 0, "truncated": 0, "started_at": time.time()}
+
+app = FastAPI()
+
+
+def parse_latency(spec: str):
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def sample_latency() -> float:
+    return max(0.0, parse_latency(settings.latency)())
+
+
+def _estimate_prompt_tokens(body: dict) -> int:
+    tokens = 0
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content) // 4
+        elif isinstance(content, list):
+            for part in content:
+                # Azure bills high-detail images at roughly 765 tokens per page
+                tokens += 765 if part.get("type") == "image_url" else len(part.get("text", "")) // 4
+    return tokens
+
+
+@app.post("/{path:path}")
+async def chat_completions(path: str, request: Request):
+    stats["requests"] += 1
+    body = json.loads(await request.body() or b"{}")
+    await asyncio.sleep(sample_latency())
+
+    roll = rng.random()
+    if roll < settings.rate_429:
+        stats["429"] += 1
+        return JSONResponse(
+            {"error": {"code": "429", "message": "Rate limit is exceeded. Try again later."}},
+            status_code=429,
+            headers={"Retry-After": "1"},
+        )
+    if roll < settings.rate_429 + settings.rate_5xx:
+        stats["5xx"] += 1
+        return JSONResponse({"error": {"code": "InternalServerError", "message": "Injected failure"}}, status_code=500)
+
+    stats["ok"] += 1
+    content = settings.response_content
+    messages = body.get("messages", [])
+    if len(messages) >= 2 and messages[-2].get("role") == "assistant":
+        # A continuation: answer with the rest of the document after what was already sent
+        content = content[len(messages[-2].get("content", "")):]
+    finish_reason = "stop"
+    max_chars = body.get("max_tokens", 0) * 4
+    if max_chars and len(content) > max_chars:
+        stats["truncated"] += 1
+        content, finish_reason = content[:max_chars], "length"
+    return {
+        "id": f"mock-{stats['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "mock",
+        "choices": [{"index": 0, "finish_reason": finish_reason, "message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": _estimate_prompt_tokens(body),
+            "completion_tokens": len(content) // 4,
+            "total_tokens": _estimate_prompt_tokens(body) + len(content) // 4,
+        },
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default=settings.latency)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--response-file", help="canned JSON document returned as the message content")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    parse_latency(args.latency)  # fail fast on a bad spec
+    settings.latency = args.latency
+    settings.rate_429 = args.rate_429
+    settings.rate_5xx = args.rate_5xx
+    if args.response_file:
+        with open(args.response_file) as handle:
+            settings.response_content = handle.read()
+    if args.seed is not None:
+        rng.seed(args.seed)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
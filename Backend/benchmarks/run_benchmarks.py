@@ -0,0 +1,190 @@
+"""Benchmarks for the resume_parser hot paths.
+
+Usage (from Backend/):
+    python -m benchmarks.run_benchmarks                      # full suite
+    python -m benchmarks.run_benchmarks --quick              # 1 and 5 page documents only
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/baseline.json
+
+Each case records wall time (min/median over --repeat runs), the peak Python
+heap seen by tracemalloc and, on Linux, the peak RSS of the run. Native buffers
+held by PyMuPDF/PIL are only visible in the RSS figure. Results are written as
+JSON so consecutive runs can be diffed and regressions caught before deploy.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.corpus import build_corpus, synthetic_llm_output
+from app.services.resume_parser import (
+    clean_json_string,
+    convert_pdf_to_images,
+    extract_text_from_docx,
+    extract_text_from_pdf,
+    image_to_base64,
+    validate_professional_experience_length,
+)
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+REGRESSION_THRESHOLD = 1.2  # flag cases that got 20% slower or hungrier
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark for this process (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as handle:
+            handle.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        pass
+    return None
+
+
+def measure(function, *args, repeat: int = 3) -> dict:
+    """Time `function(*args)` and record its peak memory"""
+    timings = []
+    peak_heap = 0
+    peak_rss = None
+    for _ in range(repeat):
+        rss_supported = _reset_peak_rss()
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - started)
+        peak_heap = max(peak_heap, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        if rss_supported:
+            peak_rss = max(peak_rss or 0, _peak_rss_mb() or 0)
+        del result
+    return {
+        "min_ms": round(min(timings) * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "peak_heap_mb": round(peak_heap / (1024 * 1024), 3),
+        "peak_rss_mb": peak_rss,
+        "repeat": repeat,
+    }
+
+
+def _render_and_encode(path: str):
+    return [image_to_base64(image) for image in convert_pdf_to_images(path)]
+
+
+def run_suite(corpus_dir: str, repeat: int, quick: bool) -> list:
+    cases = build_corpus(corpus_dir)
+    if quick:
+        cases = [case for case in cases if case["pages"] <= 5]
+
+    results = []
+
+    def record(function_name: str, case: dict, stats: dict):
+        entry = {"function": function_name, "case": os.path.basename(case["path"]), **stats}
+        results.append(entry)
+        print(f"{function_name:<42} {entry['case']:<22} {stats['median_ms']:>10.1f} ms  "
+              f"heap {stats['peak_heap_mb']:>8.2f} MB  rss {stats['peak_rss_mb']} MB")
+
+    for case in cases:
+        if case["format"] == "pdf":
+            record("extract_text_from_pdf", case, measure(extract_text_from_pdf, case["path"], repeat=repeat))
+            # Rendering at 300 DPI dominates everything else, so run it once per case
+            record("convert_pdf_to_images", case, measure(convert_pdf_to_images, case["path"], repeat=1))
+            if case["pages"] == 1:
+                image = convert_pdf_to_images(case["path"])[0]
+                record("image_to_base64", case, measure(image_to_base64, image, repeat=repeat))
+                del image
+            if case["pages"] <= 5:
+                record("convert_pdf_to_images+image_to_base64", case, measure(_render_and_encode, case["path"], repeat=1))
+        else:
+            record("extract_text_from_docx", case, measure(extract_text_from_docx, case["path"], repeat=repeat))
+
+    for entries in (5, 40, 200):
+        raw = synthetic_llm_output(entries)
+        case = {"path": f"llm_output_{entries}_entries"}
+        record("clean_json_string", case, measure(clean_json_string, raw, repeat=repeat * 5))
+        parsed = clean_json_string(raw)
+        # validate mutates its argument, so give every run a fresh copy
+        record(
+            "validate_professional_experience_length",
+            case,
+            measure(lambda: validate_professional_experience_length(json.loads(json.dumps(parsed))), repeat=repeat * 5),
+        )
+
+    return results
+
+
+def compare(results: list, baseline_path: str) -> list:
+    """Return the cases that regressed against a previous results file"""
+    with open(baseline_path) as handle:
+        baseline = {(entry["function"], entry["case"]): entry for entry in json.load(handle)["results"]}
+
+    regressions = []
+    for entry in results:
+        previous = baseline.get((entry["function"], entry["case"]))
+        if not previous:
+            continue
+        for metric in ("median_ms", "peak_heap_mb"):
+            if previous[metric] and entry[metric] > previous[metric] * REGRESSION_THRESHOLD:
+                regressions.append({
+                    "function": entry["function"],
+                    "case": entry["case"],
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": entry[metric],
+                })
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="skip the 10 and 20 page documents")
+    parser.add_argument("--compare", help="baseline results file; exit non-zero on regressions")
+    args = parser.parse_args(argv)
+
+    # Per-page INFO logging would otherwise drown the table
+    logging.getLogger("resume").setLevel(logging.WARNING)
+
+    results = run_suite(args.corpus_dir, args.repeat, args.quick)
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump({
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": results,
+        }, handle, indent=2)
+    print(f"\nWrote {len(results)} results to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        for regression in regressions:
+            print(f"REGRESSION {regression['function']} [{regression['case']}] {regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['current']}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
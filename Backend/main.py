@@ -3,7 +3,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from auth.user_routes import router as auth_router
 from utils.logger import logger
 from app.database import init_db
+from app.services.job_queue import init_queue
 from app.resume_router import router as resume_router
+from app.metrics_router import router as metrics_router
+from app.health_router import router as health_router
+from app.services import warmup
 
 app = FastAPI()
 
@@ -17,6 +21,8 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    init_queue()
+    warmup.start()
     logger.info("Server started successfully")
 
 @app.on_event("shutdown")
@@ -25,3 +31,5 @@ async def shutdown_event():
 
 app.include_router(auth_router, prefix="/auth")
 app.include_router(resume_router, prefix="/resume", tags=["resume"])
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(health_router, tags=["health"])
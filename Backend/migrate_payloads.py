@@ -0,0 +1,54 @@
+"""Move the parsed JSON of existing resume_history rows into resume_payloads, compressed.
+
+Safe to run while the API is up and to run again: rows that already have a
+payload are skipped. SQLite doesn't give the freed pages back to the file
+system by itself; --vacuum rebuilds the file afterwards, which needs as much
+free disk as the database's size and locks it while it runs.
+    python migrate_payloads.py --batch-size 500 --vacuum
+"""
+import argparse
+import os
+
+from utils.logger import get_logger
+from app.database import SQLALCHEMY_DATABASE_URL, SessionLocal, engine, init_db
+from app.services import payloads
+
+logger = get_logger("migrate_payloads")
+
+
+def _database_bytes() -> int:
+    path = SQLALCHEMY_DATABASE_URL.replace("sqlite:///", "", 1)
+    return sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+
+
+def vacuum():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("VACUUM")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move resume_data payloads to compressed storage")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="shrink the database file afterwards")
+    args = parser.parse_args(argv)
+
+    init_db()
+    before = _database_bytes()
+    db = SessionLocal()
+    try:
+        totals = payloads.migrate(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    if args.vacuum:
+        vacuum()
+    after = _database_bytes()
+
+    ratio = totals["stored_bytes"] / totals["raw_bytes"] if totals["raw_bytes"] else 0
+    print(f"codec            {payloads.codec()}")
+    print(f"rows migrated    {totals['rows']}")
+    print(f"payload bytes    {totals['raw_bytes']} -> {totals['stored_bytes']} ({ratio:.0%})")
+    print(f"database bytes   {before} -> {after}" + ("" if args.vacuum else " (run with --vacuum to shrink the file)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import random
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Run from Backend/ or the repository root alike
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base  # noqa: E402
+from app import models  # noqa: E402,F401  (registers the tables)
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory database with every table created"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+WORDS = "python java cloud data pipeline platform service team delivered migrated designed latency customers".split()
+
+
+@pytest.fixture
+def resume_text():
+    """Factory for seeded random resume text: the same seed gives the same text, different seeds unrelated texts"""
+
+    def make(seed: int, lines: int = 1, words: int = 120) -> str:
+        rng = random.Random(seed)
+        return "\n".join(" ".join(rng.choice(WORDS) + str(rng.randrange(1000)) for _ in range(words)) for _ in range(lines))
+
+    return make
+
+
+@pytest.fixture
+def history_row(db):
+    """Factory for a completed resume_history row, committed so it has an id"""
+
+    def make(filename: str = "jane.pdf", user_id: str = "alice") -> models.ResumeHistory:
+        resume = models.ResumeHistory(filename=filename, resume_data={"name": filename}, user_id=user_id, status="completed")
+        db.add(resume)
+        db.commit()
+        return resume
+
+    return make
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from app.services.artifacts import FileArtifacts
+
+
+def test_concurrent_requests_produce_an_artifact_once():
+    artifacts = FileArtifacts("resume.pdf", ".pdf")
+    calls = []
+
+    def produce():
+        calls.append(1)
+        time.sleep(0.05)
+        return "text"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(artifacts._get("text", produce))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["text"] * 8
+
+
+def test_failure_is_remembered():
+    artifacts = FileArtifacts("resume.docx", ".docx")
+    calls = []
+
+    def produce():
+        calls.append(1)
+        raise RuntimeError("conversion failed")
+
+    for _ in range(2):
+        try:
+            artifacts._get("pdf", produce)
+        except RuntimeError:
+            pass
+    assert len(calls) == 1
+    assert not artifacts.has_pdf()
+
+
+def test_producer_may_use_another_artifact():
+    artifacts = FileArtifacts("resume.pdf", ".pdf")
+    artifacts._values["text"] = "jane@example.com"
+
+    assert artifacts._get("contacts", lambda: {"email": artifacts._get("text", lambda: "")}) == {"email": "jane@example.com"}
@@ -0,0 +1,51 @@
+import fitz  # PyMuPDF
+
+from app.services import contact_extraction
+
+
+def test_contacts_are_found_in_text():
+    text = (
+        "Jane Candidate\n"
+        "jane.doe@example.com | +1 (555) 123-4567 | linkedin.com/in/janedoe\n"
+        "github.com/janedoe, www.janedoe.dev.\n"
+    )
+
+    assert contact_extraction.extract("resume.txt", ".txt", text) == {
+        "email": "jane.doe@example.com",
+        "mobile": "+1 (555) 123-4567",
+        "links": [
+            {"type": "LinkedIn", "url": "https://linkedin.com/in/janedoe"},
+            {"type": "GitHub", "url": "https://github.com/janedoe"},
+            {"type": "Website", "url": "https://www.janedoe.dev"},
+        ],
+    }
+
+
+def test_years_are_not_phone_numbers():
+    assert contact_extraction.extract("resume.txt", ".txt", "Acme 2015 2016 2017 2018 2019 2020") == {}
+    assert contact_extraction.extract("resume.txt", ".txt", "555-123-4567 2019 - 2021") == {"mobile": "555-123-4567"}
+
+
+def test_email_domain_is_not_a_link():
+    fields = contact_extraction.extract("resume.txt", ".txt", "jane@gitlab.com/x, https://janedoe.dev and janedoe.dev/")
+
+    assert fields["email"] == "jane@gitlab.com"
+    assert fields["links"] == [{"type": "Website", "url": "https://janedoe.dev"}]
+
+
+def test_pdf_hyperlinks_are_used(tmp_path):
+    path = str(tmp_path / "resume.pdf")
+    text = "Email me  Call me  Portfolio"
+    with fitz.open() as document:
+        page = document.new_page()
+        page.insert_text((72, 72), text)
+        page.insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(72, 60, 120, 75), "uri": "mailto:jane%40example.com?subject=Hi"})
+        page.insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(130, 60, 180, 75), "uri": "tel:+15551234567"})
+        page.insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(190, 60, 250, 75), "uri": "https://github.com/janedoe"})
+        document.save(path)
+
+    assert contact_extraction.extract(path, ".pdf", text) == {
+        "email": "jane@example.com",
+        "mobile": "+15551234567",
+        "links": [{"type": "GitHub", "url": "https://github.com/janedoe"}],
+    }
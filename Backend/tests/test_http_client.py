@@ -0,0 +1,78 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services import http_client
+from app.services.cancellation import CancelToken, TaskCancelled
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = set()
+
+    def do_GET(self):
+        _Handler.connections.add(self.client_address)
+        if self.path == "/slow":
+            time.sleep(5)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.connections = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client():
+    client = httpx.Client(transport=http_client._CancellableTransport(http_client.ssl_context()))
+    yield client
+    client.close()
+
+
+def test_cancellable_requests_reuse_one_connection(server, client):
+    for _ in range(3):
+        response = client.get(server + "/", extensions={"cancel_token": CancelToken()})
+        assert response.text == "ok"
+    assert len(_Handler.connections) == 1
+
+
+def test_cancel_aborts_request_in_flight(server, client):
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+    started = time.perf_counter()
+    with pytest.raises(httpx.TransportError):
+        client.get(server + "/slow", extensions={"cancel_token": token}, timeout=10)
+    assert time.perf_counter() - started < 2
+
+
+def test_cancel_after_request_leaves_pooled_connection_alone(server, client):
+    token = CancelToken()
+    assert client.get(server + "/", extensions={"cancel_token": token}).text == "ok"
+    token.cancel()
+
+    assert client.get(server + "/", extensions={"cancel_token": CancelToken()}).text == "ok"
+    assert len(_Handler.connections) == 1
+
+
+def test_already_cancelled_token_sends_nothing(server, client):
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(TaskCancelled):
+        client.get(server + "/", extensions={"cancel_token": token})
+    assert not _Handler.connections
@@ -0,0 +1,68 @@
+import pytest
+
+from app.services import near_duplicate
+
+
+@pytest.fixture
+def text(resume_text):
+    return lambda seed: resume_text(seed, lines=30, words=8)
+
+
+@pytest.fixture
+def store(db, history_row):
+    """Save a completed resume with the given text in the near-duplicate index"""
+
+    def make(text: str):
+        resume = history_row()
+        assert near_duplicate.index_resume(db, resume.id, resume.user_id, text)
+        return resume
+
+    return make
+
+
+def test_short_text_has_no_signature():
+    assert near_duplicate.signature("Jane Candidate, python developer") is None
+
+
+def test_similarity_follows_the_size_of_the_edit(text):
+    original_text = text(1)
+    edited = original_text.replace(original_text.splitlines()[5], "led the platform team")
+
+    original = near_duplicate.signature(original_text)
+    assert near_duplicate.similarity(original, near_duplicate.signature(original_text)) == 1.0
+    assert near_duplicate.similarity(original, near_duplicate.signature(edited)) > 0.85
+    assert near_duplicate.similarity(original, near_duplicate.signature(text(2))) < 0.2
+
+
+def test_changed_lines_ignore_whitespace():
+    removed, added = near_duplicate.changed_lines("Jane\n\nPython   developer\nAcme", "Jane\nPython developer\nGlobex")
+
+    assert (removed, added) == (["Acme"], ["Globex"])
+
+
+def test_identical_text_is_matched(db, store, text):
+    resume = store(text(1))
+
+    match = near_duplicate.find_match(db, "  " + text(1).replace("\n", "\n\n"), "alice")
+
+    assert match is not None and match.resume.id == resume.id
+    assert match.identical and match.similarity == 1.0
+
+
+def test_edited_text_is_matched_with_its_changes(db, store, text):
+    resume = store(text(1))
+    old_line = text(1).splitlines()[5]
+    edited = text(1).replace(old_line, "led the platform team")
+
+    match = near_duplicate.find_match(db, edited, "alice")
+
+    assert match is not None and match.resume.id == resume.id
+    assert not match.identical
+    assert near_duplicate.changed_lines(match.text, edited) == ([old_line], ["led the platform team"])
+
+
+def test_unrelated_text_and_other_users_are_not_matched(db, store, text):
+    store(text(1))
+
+    assert near_duplicate.find_match(db, text(2), "alice") is None
+    assert near_duplicate.find_match(db, text(1), "bob") is None
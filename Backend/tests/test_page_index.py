@@ -0,0 +1,78 @@
+import pytest
+
+from app.services import page_index
+from app.services.page_index import PageFingerprint
+
+
+@pytest.fixture
+def text_page(resume_text):
+    return lambda seed: PageFingerprint(f"t:{seed:032x}", resume_text(seed))
+
+
+def image_page(seed: int) -> PageFingerprint:
+    return PageFingerprint(f"i:{seed:032x}", "")
+
+
+@pytest.fixture
+def store(db, history_row):
+    """Save a completed resume with the given pages in the page index"""
+
+    def make(filename: str, pages: list):
+        resume = history_row(filename)
+        page_index.index_pages(db, resume.id, pages)
+        return resume
+
+    return make
+
+
+def test_page_wise_edit_of_same_file_matches(db, store, text_page):
+    old = [text_page(1), text_page(2), text_page(3)]
+    resume = store("jane.pdf", old)
+
+    found = page_index.find_previous_version(db, [old[0], text_page(20), old[2]], "alice", 2, "jane.pdf")
+
+    assert found is not None
+    assert found.resume.id == resume.id
+    assert found.changed_pages == [1]
+    assert found.page_texts == {1: old[1].text}
+
+
+def test_renamed_edit_matches_on_text_similarity(db, store, text_page):
+    old = [text_page(1), text_page(2), text_page(3), text_page(4)]
+    resume = store("jane_2023.pdf", old)
+
+    found = page_index.find_previous_version(db, old[:3] + [text_page(40)], "alice", 2, "jane_2024.pdf")
+
+    assert found is not None and found.resume.id == resume.id
+
+
+def test_unrelated_resume_sharing_a_cover_page_does_not_match(db, store, text_page):
+    cover = text_page(99)
+    store("bob.pdf", [cover, text_page(2)])
+
+    upload = [cover, text_page(10), text_page(11)]
+    assert page_index.find_previous_version(db, upload, "alice", 2, "carol.pdf") is None
+
+
+def test_majority_of_previous_pages_must_be_kept(db, store, text_page):
+    cover = text_page(99)
+    store("resume.pdf", [cover, text_page(2)])
+
+    # Same (generic) file name, but only the cover page is shared
+    assert page_index.find_previous_version(db, [cover, text_page(10), text_page(11)], "alice", 2, "resume.pdf") is None
+
+
+def test_matches_on_image_pages_only_are_rejected(db, store):
+    old = [image_page(1), image_page(2), image_page(3)]
+    store("scan.pdf", old)
+
+    assert page_index.find_previous_version(db, [old[0], old[1], image_page(30)], "alice", 2, "scan.pdf") is None
+
+
+def test_identical_document_matches_under_another_name(db, store):
+    pages = [PageFingerprint("t:" + "a" * 32, "John Doe page 0"), PageFingerprint("t:" + "b" * 32, "John Doe page 1")]
+    resume = store("x.pdf", pages)
+
+    found = page_index.find_previous_version(db, pages, "alice", 2, "y.pdf")
+
+    assert found is not None and found.resume.id == resume.id and found.changed_pages == []
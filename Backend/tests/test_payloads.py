@@ -0,0 +1,36 @@
+from app.models import ResumeHistory
+from app.services import payloads
+
+
+def test_payload_is_decoded_once_per_instance(db, history_row, monkeypatch):
+    resume = history_row()
+    decoded = []
+    decode = payloads.decode
+    monkeypatch.setattr(payloads, "decode", lambda *args: decoded.append(1) or decode(*args))
+
+    for _ in range(3):
+        assert resume.resume_data == {"name": "jane.pdf"}
+    assert len(decoded) == 1
+
+
+def test_in_place_edits_are_kept_until_reassigned(db, history_row):
+    resume = history_row()
+    resume.resume_data["email"] = "jane@example.com"
+
+    assert resume.resume_data["email"] == "jane@example.com"
+
+    resume.resume_data = {"name": "Jane Candidate"}
+    db.commit()
+    db.expire_all()
+
+    assert db.get(ResumeHistory, resume.id).resume_data == {"name": "Jane Candidate"}
+
+
+def test_replaced_payload_is_decoded_again(db, history_row):
+    resume = history_row()
+    assert resume.resume_data == {"name": "jane.pdf"}
+
+    db.get(ResumeHistory, resume.id).payload.data = payloads.encode({"name": "updated"})[1]
+    db.commit()
+
+    assert resume.resume_data == {"name": "updated"}
@@ -0,0 +1,56 @@
+import json
+
+from app.services.resume_parser import close_truncated_json, join_continuation
+
+
+def test_truncated_string_is_dropped():
+    raw = '{"name": "Jane Candidate", "summary": "Led the migration of bill'
+
+    assert json.loads(close_truncated_json(raw)) == {"name": "Jane Candidate"}
+
+
+def test_truncated_nested_objects_are_closed():
+    raw = '```json\n{"experience_data": [{"company": "Acme"}, {"company": "Globex", "skills": ["python", "ja'
+
+    assert json.loads(close_truncated_json(raw)) == {
+        "experience_data": [{"company": "Acme"}, {"company": "Globex", "skills": ["python"]}]
+    }
+
+
+def test_brackets_and_commas_inside_strings_are_ignored():
+    raw = '{"title": "Lead [platform], {data}", "company": "Ac'
+
+    assert json.loads(close_truncated_json(raw)) == {"title": "Lead [platform], {data}"}
+
+
+def test_escaped_quote_does_not_end_a_string():
+    raw = '{"quote": "said \\"ship it\\", then left", "next": "tr'
+
+    assert json.loads(close_truncated_json(raw)) == {"quote": 'said "ship it", then left'}
+
+
+def test_complete_json_is_unchanged():
+    raw = '{"name": "Jane", "skills": ["python"]}'
+
+    assert close_truncated_json(raw) == raw
+
+
+def test_continuation_is_appended():
+    assert join_continuation('{"name": "Jane", ', '"email": "jane@example.com"}') == (
+        '{"name": "Jane", "email": "jane@example.com"}'
+    )
+
+
+def test_continuation_overlap_is_kept_once():
+    content = '{"summary": "Led the migration of billing services'
+    more = '```json\nthe migration of billing services to Kubernetes"}\n```'
+
+    joined = join_continuation(content, more)
+
+    assert joined.startswith('{"summary": "Led the migration of billing services to Kubernetes"}')
+    assert joined.count("billing services") == 1
+
+
+def test_short_overlap_is_not_treated_as_a_repeat():
+    # "1, " could be a genuine repeat of the next value; too short to tell
+    assert join_continuation('{"a": 1, ', '1, "b": 2}') == '{"a": 1, 1, "b": 2}'
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from app.services.scheduler import BULK, INTERACTIVE, FairScheduler
+
+
+def blocked_scheduler():
+    """A one-thread scheduler that is busy until the returned event is set, so submitted work queues up"""
+    scheduler = FairScheduler(1, {INTERACTIVE: 4, BULK: 1})
+    release = threading.Event()
+    scheduler.submit(INTERACTIVE, "admin", release.wait, 5)
+    return scheduler, release
+
+
+def test_users_take_turns_within_a_lane():
+    scheduler, release = blocked_scheduler()
+    order = []
+    futures = [scheduler.submit(BULK, "alice", order.append, f"a{index}") for index in range(4)]
+    futures += [scheduler.submit(BULK, "bob", order.append, f"b{index}") for index in range(2)]
+
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert order == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+def test_bulk_work_leaves_the_reserved_slot_free():
+    scheduler = FairScheduler(2, {INTERACTIVE: 4, BULK: 1}, reserved_interactive=1)
+    release = threading.Event()
+    first_started = threading.Event()
+    started = []
+
+    def bulk(name):
+        started.append(name)
+        first_started.set()
+        release.wait(5)
+
+    bulk_futures = [scheduler.submit(BULK, "alice", bulk, name) for name in ("first", "second")]
+    assert first_started.wait(5)
+    interactive = scheduler.submit(INTERACTIVE, "bob", lambda: "parsed")
+
+    assert interactive.result(timeout=5) == "parsed"
+    assert started == ["first"]
+    release.set()
+    for future in bulk_futures:
+        future.result(timeout=5)
+
+
+def test_withdrawn_work_never_runs():
+    scheduler, release = blocked_scheduler()
+    ran = []
+    withdrawn = [scheduler.submit(BULK, "alice", ran.append, "cancelled", tag="task-1") for _ in range(2)]
+    kept = scheduler.submit(BULK, "alice", ran.append, "kept", tag="task-2")
+
+    assert scheduler.withdraw({"task-1"}) == ["task-1", "task-1"]
+    release.set()
+    kept.result(timeout=5)
+
+    assert ran == ["kept"]
+    assert all(future.cancelled() for future in withdrawn)
+
+
+def test_failure_is_reported_through_the_future():
+    scheduler = FairScheduler(1, {INTERACTIVE: 4, BULK: 1})
+
+    def fail():
+        raise ValueError("bad file")
+
+    with pytest.raises(ValueError):
+        scheduler.submit(BULK, "alice", fail).result(timeout=5)
+    assert scheduler.submit(BULK, "alice", lambda: "next").result(timeout=5) == "next"
@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from app.config import RESPONSE_COMPRESSION_MIN_BYTES
+
+# orjson and brotli are optional; fall back to the standard library without them
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize a payload to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def compute_etag(body: bytes) -> str:
+    """Weak ETag so the same value is valid for every content-encoding of the body"""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def build_json_body(payload: Any) -> Tuple[bytes, str]:
+    """Serialize a payload once and return the body together with its ETag"""
+    body = dumps(payload)
+    return body, compute_etag(body)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def json_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    compressed_cache: Optional[Dict[str, bytes]] = None,
+) -> Response:
+    """Return a pre-serialized JSON body with conditional GET and compression.
+
+    A matching If-None-Match short-circuits to 304 with no body. Bodies above
+    RESPONSE_COMPRESSION_MIN_BYTES are compressed with the best encoding the
+    client accepts; pass compressed_cache to reuse compressed bytes across polls.
+    """
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in candidates or etag in candidates or etag[2:] in candidates:
+            return Response(status_code=304, headers=headers)
+
+    if len(body) >= RESPONSE_COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            if compressed_cache is not None and encoding in compressed_cache:
+                body = compressed_cache[encoding]
+            else:
+                compressed = compress(body, encoding)
+                if compressed_cache is not None:
+                    compressed_cache[encoding] = compressed
+                body = compressed
+            headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type="application/json", headers=headers)
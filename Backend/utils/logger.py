@@ -1,13 +1,55 @@
+import atexit
+import copy
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 LOG_DIR = "logs"
 LOG_FILE = "app.log"
 os.makedirs(LOG_DIR, exist_ok=True)
 log_path = os.path.join(LOG_DIR, LOG_FILE)
 
-formatter = logging.Formatter(
+# Root level plus optional per-logger overrides,
+# e.g. LOG_LEVELS="resume.parser=DEBUG,httpx=WARNING"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formatter that appends fields passed via `extra` as key=value pairs"""
+
+    def formatMessage(self, record):
+        message = super().formatMessage(record)
+        fields = [
+            f"{key}={value}"
+            for key, value in record.__dict__.items()
+            if key not in _RESERVED_ATTRS and not key.startswith("_")
+        ]
+        if fields:
+            message = f"{message} | {' '.join(fields)}"
+        return message
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that resolves the message on the calling thread but keeps
+    structured fields on the record, so the listener thread does the layout"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+formatter = StructuredFormatter(
     "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
@@ -19,9 +61,37 @@ file_handler.setFormatter(formatter)
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
 
+# Worker threads only enqueue records; file and console I/O happen on the
+# listener's background thread
+log_queue = queue.SimpleQueue()
+queue_handler = NonBlockingQueueHandler(log_queue)
+listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+
 logging.basicConfig(
-    level=logging.INFO,
-    handlers=[file_handler, console_handler]
+    level=LOG_LEVEL,
+    handlers=[queue_handler]
 )
 
+for override in filter(None, (item.strip() for item in LOG_LEVELS.split(","))):
+    name, _, level = override.partition("=")
+    logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer thread"""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+atexit.register(stop_logging)
+
 logger = logging.getLogger("resume")
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Child of the `resume` logger, so per-module levels can be set as resume.<name>"""
+    return logger.getChild(name)
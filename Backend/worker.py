@@ -0,0 +1,216 @@
+"""Standalone worker: claims jobs from the durable queue and runs the resume pipeline.
+
+Run the API with TASK_EXECUTION_MODE=queue and start one or more workers per
+node (uploads are written to the node's temp directory):
+    python worker.py --concurrency 2 --metrics-port 9101
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.logger import get_logger
+from app.config import JOB_LEASE_SECONDS
+from app.database import SessionLocal, init_db
+from app.services import cancellation, job_queue, warmup
+from app.services.metrics import render_prometheus
+from app.resume_router import (
+    BATCH_LOCK,
+    TASKS,
+    TaskStatus,
+    process_resume_sync,
+    process_multiple_resumes_sync,
+    process_reprocess_sync,
+    run_task
+)
+
+logger = get_logger("worker")
+
+PROCESSORS = {
+    "single": process_resume_sync,
+    "batch": process_multiple_resumes_sync,
+    "reprocess": process_reprocess_sync,
+}
+
+# Final task status -> job status
+JOB_STATUS = {
+    TaskStatus.COMPLETED: job_queue.JobStatus.COMPLETED,
+    TaskStatus.CANCELLED: job_queue.JobStatus.CANCELLED,
+}
+
+# How often a running job checks for cancel requests and publishes batch results
+CANCEL_POLL_SECONDS = 1.0
+
+
+class Worker:
+    def __init__(self, concurrency: int = 1, poll_interval: float = 1.0, lease_seconds: int = JOB_LEASE_SECONDS):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.stopping = threading.Event()
+
+    def run(self):
+        logger.info(f"Worker {self.worker_id} started with concurrency {self.concurrency}")
+        threads = [
+            threading.Thread(target=self._loop, name=f"job-worker-{index}")
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def stop(self, *_):
+        """Stop claiming new jobs; jobs already running are finished first"""
+        logger.info("Shutdown requested, finishing in-flight jobs")
+        self.stopping.set()
+
+    def _loop(self):
+        while not self.stopping.is_set():
+            try:
+                job = job_queue.claim(self.worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception("Failed to claim a job")
+                job = None
+            if job is None:
+                self.stopping.wait(self.poll_interval)
+                continue
+            self._run_job(job)
+
+    def _run_job(self, job: dict):
+        task_id = job["id"]
+        lease_token = job["lease_token"]
+        task = dict(job["payload"])
+        task["status"] = TaskStatus.PENDING
+        task["started_at"] = time.perf_counter()  # perf_counter values don't carry across processes
+        TASKS[task_id] = task
+        logger.info(f"Claimed {job['kind']} job (attempt {job['attempts']})", extra={"task_id": task_id})
+
+        def apply_cancel_requests():
+            cancel_job, cancelled_files = job_queue.get_cancel_requests(task_id)
+            if cancel_job:
+                cancellation.token_for(task_id).cancel()
+            for file_index in cancelled_files:
+                cancellation.token_for(task_id, file_index).cancel()
+
+        apply_cancel_requests()
+
+        # Keep the lease alive and publish progress while the pipeline runs,
+        # and pick up cancel requests made through the API
+        done = threading.Event()
+
+        published = 0
+
+        def publish_batch_results():
+            # Per-file results of a batch become visible through /progress?since=N
+            nonlocal published
+            finished = len(task.get("completed_order") or [])
+            if finished == published or "results" not in task:
+                return
+            with BATCH_LOCK:
+                partial = {"results": list(task["results"]), "completed_order": list(task["completed_order"])}
+            job_queue.publish_results(task_id, lease_token, partial)
+            published = finished
+
+        def beat():
+            last_heartbeat = time.monotonic()
+            while not done.wait(CANCEL_POLL_SECONDS):
+                try:
+                    apply_cancel_requests()
+                    publish_batch_results()
+                    if time.monotonic() - last_heartbeat < self.lease_seconds / 3:
+                        continue
+                    lease_held = job_queue.heartbeat(task_id, lease_token, task["stage"], task["progress"],
+                                                     task.get("processed_files"), self.lease_seconds)
+                    last_heartbeat = time.monotonic()
+                except Exception:
+                    # e.g. the database is locked; the thread must outlive it, or the lease expires
+                    logger.exception("Heartbeat failed, retrying", extra={"task_id": task_id})
+                    continue
+                if not lease_held:
+                    # Another worker may have reclaimed the job; stop working on it rather
+                    # than run it twice (finish() is a no-op without the lease)
+                    logger.warning("Lost the job lease, cancelling the job", extra={"task_id": task_id})
+                    cancellation.token_for(task_id).cancel()
+                    return
+
+        heartbeat_thread = threading.Thread(target=beat, name=f"heartbeat-{task_id[:8]}", daemon=True)
+        heartbeat_thread.start()
+
+        db = SessionLocal()
+        try:
+            run_task(PROCESSORS[job["kind"]], task_id, db)
+        except Exception as e:
+            logger.exception("Job crashed", extra={"task_id": task_id})
+            task["status"] = TaskStatus.FAILED
+            task["error"] = str(e)
+        finally:
+            db.close()
+            done.set()
+            heartbeat_thread.join()
+            TASKS.pop(task_id, None)
+            cancellation.discard(task_id)
+
+        status = JOB_STATUS.get(task["status"], job_queue.JobStatus.FAILED)
+        job_queue.finish(
+            task_id,
+            lease_token,
+            status=status,
+            stage=task["stage"],
+            progress=task["progress"],
+            processed_files=task.get("processed_files"),
+            result={
+                "data": task.get("data"),
+                "profile_report": task.get("profile_report"),
+                "completed_order": task.get("completed_order"),
+            },
+            error=task.get("error"),
+        )
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resume processing worker")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "1")))
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--metrics-port", type=int, help="serve this worker's /metrics on the given port")
+    args = parser.parse_args(argv)
+
+    init_db()
+    job_queue.init_queue()
+    # Load the parser's libraries before claiming, so a job's lease isn't spent on imports
+    warmup.run()
+
+    if args.metrics_port:
+        server = ThreadingHTTPServer(("0.0.0.0", args.metrics_port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+
+    worker = Worker(concurrency=args.concurrency, poll_interval=args.poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()